@@ -1 +0,0 @@
-type NUL > iptv_checker\__init__.py
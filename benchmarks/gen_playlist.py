@@ -0,0 +1,77 @@
+# benchmarks/gen_playlist.py
+import argparse
+import random
+from pathlib import Path
+from typing import List, Optional
+
+# Stream paths served by benchmarks/stream_server.py, with relative weights
+DEFAULT_MIX = {"live.ts": 70, "black.ts": 5, "slow.ts": 5, "missing.ts": 15, "hang.ts": 5}
+
+_WORDS = ("Blue Red Night Day Last First Great Little Dark Lost City River Star "
+          "King Queen Road House Game Storm Winter Summer Silent Golden Iron").split()
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.sample(_WORDS, rng.randint(1, 3)))
+
+
+def generate_playlist(path: Path, entries: int, groups: int = 10, dup_ratio: float = 0.0,
+                      stream_base: str = "http://127.0.0.1:8089",
+                      mix: Optional[dict] = None, series_ratio: float = 0.3,
+                      seed: int = 1) -> Path:
+    """
+    Write a synthetic M3U with `entries` entries spread over `groups` groups.
+
+    A `dup_ratio` share of entries reuse the URL and title of an earlier entry
+    under a different group (like "UK | BBC One" / "FHD | BBC One"); about
+    `series_ratio` of the unique titles are SxxEyy episodes. Stream URLs point
+    at the local fake stream server, picked by the weights in `mix`.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    paths, weights = list(mix), list(mix.values())
+    group_names: List[str] = []
+    for g in range(groups):
+        kind = "SERIES" if g % 3 == 2 else "MOVIES" if g % 3 == 1 else "LIVE"
+        group_names.append(f"{rng.choice(['UK', 'US', 'FHD', 'DE'])} | {kind} {g}")
+
+    made = []
+    lines = ["#EXTM3U"]
+    for i in range(entries):
+        if made and rng.random() < dup_ratio:
+            name, url, _ = rng.choice(made)
+            group = rng.choice(group_names)
+        else:
+            group = rng.choice(group_names)
+            name = _title(rng)
+            if "SERIES" in group or rng.random() < series_ratio / 3:
+                name += f" S{rng.randint(1, 5):02d}E{rng.randint(1, 22):02d}"
+            elif rng.random() < 0.5:
+                name += f" ({rng.randint(1960, 2024)})"
+            kind = "series" if "SERIES" in group else "movie" if "MOVIES" in group else "live"
+            url = f"{stream_base}/{kind}/{i}/{rng.choices(paths, weights)[0]}"
+            made.append((name, url, group))
+        lines.append(f'#EXTINF:-1 CUID="{i}" tvg-id="id{i}" tvg-name="{name}" '
+                     f'group-title="{group}",{name}')
+        lines.append(url)
+
+    path = Path(path)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def main():
+    p = argparse.ArgumentParser(description="Generate a synthetic benchmark playlist")
+    p.add_argument("output", help="M3U file to write")
+    p.add_argument("-n", "--entries", type=int, default=10000)
+    p.add_argument("-g", "--groups", type=int, default=20)
+    p.add_argument("--dup-ratio", type=float, default=0.2)
+    p.add_argument("--stream-base", default="http://127.0.0.1:8089")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+    generate_playlist(Path(args.output), args.entries, args.groups, args.dup_ratio,
+                      args.stream_base, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/import_time.py
+"""
+Startup benchmark. From the repository root:
+
+    python -m benchmarks.import_time --repeat 10 --budget-ms 150
+
+Times `cli.py <command> -h` and bare imports of the headless modules, each in
+a fresh interpreter, lists the slowest imports reported by
+`python -X importtime`, and reports which heavy libraries an import pulls in.
+Exits with status 1 when a command's median startup is over the budget, or
+when a headless module loads PyQt5.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks.run import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CLI_COMMANDS = ([], ["sort"], ["warmup"], ["monitor"], ["serve"], ["history"])
+# modules the CLI, monitor and API build on; none of them may need Qt
+HEADLESS_MODULES = (
+    "config", "checker", "services.parser", "services.output_writer", "services.mirrors",
+    "services.monitor", "tmdb_client", "services.playlist_sorter", "services.cache_warmer",
+)
+# libraries that are only needed once the matching feature actually runs
+HEAVY_MODULES = ("PyQt5", "aiohttp", "numpy", "requests", "multiprocessing", "http.client")
+
+
+def _python(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True,
+                          text=True, **kwargs)
+
+
+def _wall(args: List[str], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _python(*args)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def slowest_imports(code: str, top: int) -> List[Tuple[str, float, float]]:
+    """(module, self ms, cumulative ms) of the `top` slowest imports of `code` by self time."""
+    rows = []
+    for line in _python("-X", "importtime", "-c", code).stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1000, int(cum_us) / 1000))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return [(name, round(s, 2), round(c, 2)) for name, s, c in rows[:top]]
+
+
+def heavy_loaded(module: str) -> List[str]:
+    """HEAVY_MODULES present in sys.modules after importing `module`."""
+    code = (f"import sys, json, {module}\n"
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    proc = _python("-c", code)
+    if proc.returncode != 0:
+        return ["<import failed: " + (proc.stderr.strip().splitlines() or ["?"])[-1] + ">"]
+    return json.loads(proc.stdout)
+
+
+def bench_startup(repeat: int, top: int = 10) -> dict:
+    interpreter = _wall(["-c", "pass"], repeat)
+    base = statistics.median(interpreter)
+    report: Dict[str, object] = {"interpreter": summarize(interpreter), "cli": {}, "imports": {}}
+    for cmd in CLI_COMMANDS:
+        times = _wall(["cli.py", *cmd, "-h"], repeat)
+        out = summarize(times)
+        out["net_p50_ms"] = round((statistics.median(times) - base) * 1000, 3)
+        report["cli"][" ".join(cmd) or "(default)"] = out
+    for module in HEADLESS_MODULES:
+        times = _wall(["-c", f"import {module}"], repeat)
+        report["imports"][module] = {
+            "net_p50_ms": round((statistics.median(times) - base) * 1000, 3),
+            "heavy": heavy_loaded(module),
+        }
+    report["slowest"] = slowest_imports("import " + ", ".join(HEADLESS_MODULES), top)
+    return report
+
+
+def main():
+    p = argparse.ArgumentParser(description="CLI startup and import-time benchmark")
+    p.add_argument("--repeat", type=int, default=10)
+    p.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    p.add_argument("--budget-ms", type=float, default=150.0,
+                   help="Fail when a command's median startup exceeds this")
+    p.add_argument("-o", "--output", help="Write the JSON report here as well")
+    args = p.parse_args()
+
+    report = {"params": vars(args), **bench_startup(args.repeat, args.top)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+    over = [cmd for cmd, r in report["cli"].items() if r["p50_ms"] > args.budget_ms]
+    qt = [m for m, r in report["imports"].items() if "PyQt5" in r["heavy"]]
+    for cmd in over:
+        print(f"cli.py {cmd} -h: {report['cli'][cmd]['p50_ms']} ms > {args.budget_ms} ms", file=sys.stderr)
+    for m in qt:
+        print(f"{m} imports PyQt5", file=sys.stderr)
+    sys.exit(1 if over or qt else 0)
+
+
+if __name__ == "__main__":
+    main()
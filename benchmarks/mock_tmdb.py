@@ -0,0 +1,117 @@
+# benchmarks/mock_tmdb.py
+import json
+import random
+import threading
+import time
+import zlib
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = {
+    "movie": [{"id": 28, "name": "Action"}, {"id": 35, "name": "Comedy"}, {"id": 18, "name": "Drama"}],
+    "tv": [{"id": 10759, "name": "Action & Adventure"}, {"id": 35, "name": "Comedy"}, {"id": 18, "name": "Drama"}],
+}
+
+
+class MockTMDB:
+    """
+    Local stand-in for the TMDB v3 endpoints the sorter uses (search/multi,
+    movie/tv details, seasons, genre lists). Every query gets a deterministic
+    match. `throttle_ratio` of requests are answered 429 with a Retry-After
+    of `retry_after` seconds; `latency` is added to every response.
+    """
+
+    def __init__(self, latency: float = 0.0, throttle_ratio: float = 0.0,
+                 retry_after: float = 1.0, seed: int = 1, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.throttle_ratio = throttle_ratio
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.counts = {"total": 0, "throttled": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), partial(_Handler, mock=self))
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    def count(self, kind: str) -> bool:
+        """Record a request; True if it should be throttled."""
+        with self._lock:
+            self.counts["total"] += 1
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            throttle = self.rng.random() < self.throttle_ratio
+            if throttle:
+                self.counts["throttled"] += 1
+            return throttle
+
+    def respond(self, path: str, query: dict) -> dict:
+        parts = path.strip("/").split("/")[1:]  # drop the "3" version prefix
+        if parts[:1] == ["search"]:
+            title = query.get("query", [""])[0]
+            h = zlib.crc32(title.encode())
+            media = "tv" if h % 2 else "movie"
+            name_key = "name" if media == "tv" else "title"
+            date_key = "first_air_date" if media == "tv" else "release_date"
+            return {"results": [{
+                "id": h % 1_000_000, "media_type": media, name_key: title,
+                date_key: f"{1960 + h % 64}-01-01", "poster_path": f"/p{h}.jpg",
+                "genre_ids": [GENRES[media][h % 3]["id"]],
+            }]}
+        if parts[:1] == ["genre"]:
+            return {"genres": GENRES.get(parts[1], [])}
+        if len(parts) >= 4 and parts[0] == "tv" and parts[2] == "season":
+            return {"episodes": [
+                {"episode_number": n, "name": f"Episode {n}", "still_path": f"/s{parts[1]}_{n}.jpg"}
+                for n in range(1, 25)
+            ]}
+        if len(parts) == 2 and parts[0] in ("movie", "tv"):
+            _id = int(parts[1])
+            return {"id": _id, "title": f"Title {_id}", "genres": [GENRES[parts[0]][_id % 3]]}
+        return {}
+
+    def start(self) -> "MockTMDB":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args, mock: MockTMDB, **kw):
+        self.mock = mock
+        super().__init__(*args, **kw)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        kind = url.path.strip("/").split("/")[1] if url.path.count("/") > 1 else "other"
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        if self.mock.count(kind):
+            body = b'{"status_code":25,"status_message":"Your request count is over the allowed limit."}'
+            self.send_response(429)
+            self.send_header("Retry-After", f"{self.mock.retry_after:g}")
+        else:
+            body = json.dumps(self.mock.respond(url.path, parse_qs(url.query))).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
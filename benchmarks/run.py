@@ -0,0 +1,228 @@
+# benchmarks/run.py
+"""
+Benchmark runner. From the repository root:
+
+    python -m benchmarks.run --entries 20000 --check-sample 200 --workers 5 20 50 -o bench.json
+
+Generates a synthetic playlist, starts the fake stream server and mock TMDB
+endpoint, times each stage and prints throughput and p50/p95 latencies as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.gen_playlist import generate_playlist
+from benchmarks.mock_tmdb import MockTMDB
+from benchmarks.stream_server import StreamServer, make_fixtures, FIXTURE_DIR
+
+
+def summarize(samples: List[float], items: int = 0, wall: float = 0.0) -> Dict[str, float]:
+    """Throughput and latency percentiles (ms) for a list of per-item seconds."""
+    out = {"count": len(samples)}
+    if samples:
+        ordered = sorted(samples)
+        out["p50_ms"] = round(statistics.median(ordered) * 1000, 3)
+        out["p95_ms"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3)
+        out["max_ms"] = round(ordered[-1] * 1000, 3)
+    if wall:
+        out["wall_s"] = round(wall, 4)
+        out["per_s"] = round((items or len(samples)) / wall, 2)
+    return out
+
+
+def _repeat(fn: Callable[[], object], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def bench_parse(playlist: Path, repeat: int) -> dict:
+    from services.parser import parse_groups
+    groups, _ = parse_groups(str(playlist))
+    n = sum(len(v) for v in groups.values())
+    times = _repeat(lambda: parse_groups(str(playlist)), repeat)
+    return {"entries": n, **summarize(times, n * repeat, sum(times))}
+
+
+def bench_check(playlist: Path, workers: List[int], sample: int, timeout: float) -> dict:
+    from checker import check_stream
+    from services.frame_analysis import analysis_pool
+    from services.parser import parse_groups
+    groups, _ = parse_groups(str(playlist))
+    entries = [e for grp in groups.values() for e in grp][:sample]
+    analysis_pool()
+    results = {}
+    for w in workers:
+        latencies: List[float] = []
+        statuses: Dict[str, int] = {}
+
+        def one(e):
+            t0 = time.perf_counter()
+            st = check_stream(e.original_name, e.url, timeout=timeout)[0]
+            latencies.append(time.perf_counter() - t0)
+            statuses[st] = statuses.get(st, 0) + 1
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=w) as pool:
+            list(pool.map(one, entries))
+        results[str(w)] = {"statuses": statuses, **summarize(latencies, wall=time.perf_counter() - t0)}
+    return results
+
+
+def _cpu() -> float:
+    """
+    CPU seconds of this thread plus finished child processes (ffmpeg).
+    Child time is only available on POSIX.
+    """
+    try:
+        import resource
+    except ImportError:
+        return time.thread_time()
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.thread_time() + ru.ru_utime + ru.ru_stime
+
+
+def _classify_timed(data: bytes, span):
+    """classify_frames in a pool worker, with the worker CPU seconds it took."""
+    from services.frame_analysis import classify_frames
+    t0 = time.thread_time()
+    result = classify_frames(data, span)
+    return result, time.thread_time() - t0
+
+
+def bench_analysis(base_url: str, repeat: int, frames: int) -> dict:
+    """
+    CPU-seconds per channel of the picture-analysis step alone: full-rate
+    blackdetect against keyframe sampling plus frame classification, on
+    720p, 4K and black streams. Classification runs in the process pool as
+    in a check; pool workers live on, so RUSAGE_CHILDREN never sees their
+    CPU time and each worker reports its own instead.
+    """
+    from checker import blackdetect_full
+    from services.frame_analysis import analysis_pool, grab_frames
+    pool = analysis_pool()
+    worker_cpu = [0.0]
+
+    def keyframes(url):
+        data, _, span = grab_frames(url, frames, timeout=10.0)
+        result, cpu = pool.submit(_classify_timed, data, span).result()
+        worker_cpu[0] += cpu
+        return result["status"]
+
+    modes = {
+        "full": lambda url: "BLACK_SCREEN" if blackdetect_full(url, timeout=10.0) else "LIVE",
+        "keyframes": keyframes,
+    }
+    results = {}
+    for stream in ("live.ts", "uhd.ts", "black.ts"):
+        url = f"{base_url}/{stream}"
+        for mode, fn in modes.items():
+            walls, verdicts = [], set()
+            worker_cpu[0] = 0.0
+            cpu0 = _cpu()
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                verdicts.add(fn(url))
+                walls.append(time.perf_counter() - t0)
+            cpu = _cpu() - cpu0 + worker_cpu[0]
+            results[f"{stream}:{mode}"] = {"status": sorted(map(str, verdicts)),
+                                           "cpu_s_per_channel": round(cpu / repeat, 4),
+                                           **summarize(walls)}
+    return results
+
+
+def bench_write(playlist: Path, out_dir: Path, repeat: int) -> dict:
+    from services.output_writer import write_output_files, CUID_RE
+    lines = playlist.read_text(encoding="utf-8").splitlines(keepends=True)
+    entry_map, status_map = {}, {}
+    cycle = ("UP", "UP", "UP", "BLACK_SCREEN", "FROZEN", "DOWN")
+    for i, line in enumerate(l for l in lines if l.startswith("#EXTINF")):
+        uid = CUID_RE.search(line).group(1)
+        entry_map[uid] = {"resolution": "1920×1080", "fps": "25"}
+        status_map[uid] = cycle[i % len(cycle)]
+    times = _repeat(lambda: write_output_files(lines, entry_map, status_map, "bench", str(out_dir),
+                                               split=True, update_quality=True, update_fps=True,
+                                               include_untested=True), repeat)
+    return {"entries": len(entry_map), **summarize(times, len(entry_map) * repeat, sum(times))}
+
+
+def bench_sort(playlist: Path, workdir: Path, workers: int, throttle_ratio: float, latency: float) -> dict:
+    from config import SortConfig
+    from services.playlist_sorter import PlaylistSorter
+    logs = []
+    with MockTMDB(latency=latency, throttle_ratio=throttle_ratio, retry_after=0.2) as mock:
+        cfg = SortConfig(m3u_file=playlist, output_dir=workdir, selected_groups=[],
+                         tmdb_api_key="bench", max_workers=workers, update_name=True,
+                         update_banner=True, tmdb_api_base=mock.base_url)
+        cwd = os.getcwd()
+        os.chdir(workdir)  # keep the TMDB cache database out of the repo
+        try:
+            t0 = time.perf_counter()
+            PlaylistSorter(cfg, lambda lvl, msg: logs.append((lvl, msg))).start()
+            wall = time.perf_counter() - t0
+        finally:
+            os.chdir(cwd)
+        entries = sum(1 for l in playlist.open(encoding="utf-8") if l.startswith("#EXTINF"))
+        return {"entries": entries, "requests": dict(mock.counts),
+                "errors": sum(1 for lvl, _ in logs if lvl == "error"),
+                **summarize([], entries, wall)}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Checker / sorter throughput benchmarks")
+    p.add_argument("--entries", type=int, default=10000)
+    p.add_argument("--groups", type=int, default=20)
+    p.add_argument("--dup-ratio", type=float, default=0.2)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--check-sample", type=int, default=100, help="Entries to stream-check (0 = skip)")
+    p.add_argument("--workers", type=int, nargs="+", default=[5, 20, 50])
+    p.add_argument("--timeout", type=float, default=5.0)
+    p.add_argument("--sample-frames", type=int, default=5, help="Keyframes sampled by the analysis benchmark")
+    p.add_argument("--sort-workers", type=int, default=10)
+    p.add_argument("--tmdb-latency", type=float, default=0.02)
+    p.add_argument("--throttle-ratio", type=float, default=0.05)
+    p.add_argument("--skip", nargs="*", default=[], choices=["parse", "check", "analysis", "write", "sort", "startup"])
+    p.add_argument("-o", "--output", help="Write the JSON report here as well")
+    args = p.parse_args()
+
+    report = {"params": vars(args)}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        with StreamServer() as streams:
+            playlist = generate_playlist(tmp / "bench.m3u", args.entries, args.groups,
+                                         args.dup_ratio, streams.base_url)
+            if "parse" not in args.skip:
+                report["parse_groups"] = bench_parse(playlist, args.repeat)
+            if "write" not in args.skip:
+                report["write_output_files"] = bench_write(playlist, tmp, args.repeat)
+            if "check" not in args.skip and args.check_sample:
+                make_fixtures(FIXTURE_DIR)
+                report["check_stream"] = bench_check(playlist, args.workers, args.check_sample, args.timeout)
+            if "analysis" not in args.skip:
+                make_fixtures(FIXTURE_DIR)
+                report["black_detection"] = bench_analysis(streams.base_url, args.repeat, args.sample_frames)
+        if "sort" not in args.skip:
+            report["sorter"] = bench_sort(playlist, tmp, args.sort_workers,
+                                          args.throttle_ratio, args.tmdb_latency)
+
+    if "startup" not in args.skip:
+        from benchmarks.import_time import bench_startup
+        report["startup"] = bench_startup(args.repeat)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/stream_server.py
+import argparse
+import shutil
+import subprocess
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+SLOW_START = 3.0  # seconds slow.ts waits before the first byte
+
+
+def make_fixtures(out_dir: Path = FIXTURE_DIR, seconds: int = 10) -> Path:
+    """
+    Generate the test streams once with ffmpeg: a moving test pattern
+    (live.ts), the same pattern in 4K (uhd.ts), a fully black picture
+    (black.ts) and an HLS version of the test pattern (hls/index.m3u8).
+    Existing files are reused.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is required to generate benchmark streams")
+    base = ["ffmpeg", "-hide_banner", "-v", "error", "-y"]
+    enc = ["-c:v", "libx264", "-preset", "ultrafast", "-g", "25", "-pix_fmt", "yuv420p"]
+    jobs = {
+        out_dir / "live.ts": ["-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=25:duration={seconds}",
+                              *enc, "-f", "mpegts"],
+        out_dir / "uhd.ts": ["-f", "lavfi", "-i", f"testsrc2=size=3840x2160:rate=25:duration={seconds}",
+                             *enc, "-f", "mpegts"],
+        out_dir / "black.ts": ["-f", "lavfi", "-i", f"color=black:size=1280x720:rate=25:duration={seconds}",
+                               *enc, "-f", "mpegts"],
+    }
+    for path, args in jobs.items():
+        if not path.exists():
+            subprocess.run([*base, *args, str(path)], check=True)
+    hls = out_dir / "hls"
+    if not (hls / "index.m3u8").exists():
+        hls.mkdir(exist_ok=True)
+        subprocess.run([*base, "-i", str(out_dir / "live.ts"), "-c", "copy", "-f", "hls",
+                        "-hls_time", "2", "-hls_list_size", "0",
+                        str(hls / "index.m3u8")], check=True)
+    return out_dir
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Routes on the last path component so playlist URLs can carry any prefix:
+    live.ts, uhd.ts, black.ts, slow.ts (SLOW_START delay), hang.ts (never answers),
+    missing.ts (404), index.m3u8 / *.ts under hls/.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args, fixtures: Path, stopping: threading.Event, **kw):
+        self.fixtures = fixtures
+        self.stopping = stopping
+        super().__init__(*args, **kw)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        name = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        if name == "hang.ts":
+            # accept the connection but never send a response
+            while not self.stopping.wait(0.5):
+                pass
+            return
+        if name == "slow.ts":
+            time.sleep(SLOW_START)
+            name = "live.ts"
+        if name in ("live.ts", "uhd.ts", "black.ts"):
+            return self._send_file(self.fixtures / name, "video/mp2t")
+        if "/hls/" in self.path or name.endswith(".m3u8"):
+            path = self.fixtures / "hls" / name
+            ctype = "application/vnd.apple.mpegurl" if name.endswith(".m3u8") else "video/mp2t"
+            if path.is_file():
+                return self._send_file(path, ctype)
+        self.send_error(404)
+
+    def _send_file(self, path: Path, ctype: str):
+        data = path.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class StreamServer:
+    """Fake IPTV origin on a background thread; usable as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fixtures: Path = FIXTURE_DIR):
+        self.stopping = threading.Event()
+        handler = partial(_Handler, fixtures=Path(fixtures), stopping=self.stopping)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StreamServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Serve fake IPTV test streams")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--fixtures", default=str(FIXTURE_DIR))
+    args = p.parse_args()
+    make_fixtures(Path(args.fixtures))
+    with StreamServer(port=args.port, fixtures=Path(args.fixtures)) as srv:
+        print(f"Serving test streams on {srv.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,118 @@
 import subprocess
+import threading
 import time
-from typing import Tuple
-from urllib.request import urlopen
+from typing import Dict, Optional, Tuple
 
-def check_stream(name: str, url: str, timeout: float = 10.0) -> Tuple[str, str, str, str]:
+from services.frame_analysis import FROZEN_DIFF, analyze_stream
+
+# Order of the stages recorded in a check's timing breakdown
+TIMING_STAGES = ('spawn', 'dns', 'connect', 'first_byte', 'probe', 'analysis', 'throughput', 'wait')
+
+# Lines of ffprobe's debug log that end a network stage, in stage order:
+# name resolved (a connection is attempted), TCP connected, first data probed
+_PROBE_EVENTS = (
+    ('dns', 'Starting connection attempt to'),
+    ('connect', 'Successfully connected to'),
+    ('first_byte', 'probed with size='),
+)
+
+# Picture analysis modes: 'keyframes' classifies a few downscaled keyframes as
+# black/blank, frozen or live; 'full' decodes every frame of 2 seconds at full
+# resolution through blackdetect (black only)
+ANALYSIS_MODES = ('keyframes', 'full')
+SAMPLE_FRAMES = 5
+ANALYSIS_TIMEOUT = 4.0     # seconds allowed for collecting the keyframe sample
+SLOW_RATIO = 0.9           # SLOW when data arrives slower than this share of the bitrate
+
+
+def _watch_probe_log(stream, events: Dict[str, float]) -> None:
+    """
+    Drain ffprobe's stderr, stamping the first line of each _PROBE_EVENTS marker.
+    `stream` must decode with errors='replace': stream metadata in the debug
+    log is often not UTF-8, and ffprobe blocks once nobody drains the pipe.
+    """
+    try:
+        for line in stream:
+            for stage, marker in _PROBE_EVENTS:
+                if stage not in events and marker in line:
+                    events[stage] = time.monotonic()
+    except (OSError, ValueError):
+        pass  # the pipe was closed under us after a timeout
+
+
+def blackdetect_full(url: str, timeout: float = 2.0) -> bool:
+    """Run ffmpeg blackdetect over every frame of the first 2s of the stream."""
+    ff_cmd = [
+        'ffmpeg', '-hide_banner', '-v', 'error',
+        '-t', '2', '-i', url,
+        '-vf', 'blackdetect=d=2:pix_th=0.98',
+        '-an', '-f', 'null', '-'
+    ]
+    try:
+        p2 = subprocess.run(
+            ff_cmd,
+            stderr=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            text=True,
+            timeout=timeout
+        )
+    except Exception:
+        return False
+    return 'blackdetect' in (p2.stderr or '')
+
+
+def check_stream(name: str, url: str, timeout: float = 10.0,
+                 timings: Optional[Dict[str, float]] = None,
+                 analysis: str = 'keyframes', sample_frames: int = SAMPLE_FRAMES,
+                 throughput: float = 0.0, slow_ratio: float = SLOW_RATIO,
+                 stats: Optional[Dict[str, object]] = None,
+                 pad_down: bool = True,
+                 frozen_diff: float = FROZEN_DIFF) -> Tuple[str, str, str, str]:
     """
     1) Probe via ffprobe (connectivity + resolution/bitrate/fps) with network timeout.
-    2) If probe succeeds, run ffmpeg blackdetect over 2s to detect full-black.
-    3) DOWN results wait out the full timeout; UP/BLACK_SCREEN return immediately.
+    2) If probe succeeds, classify the picture: by default from `sample_frames`
+       downscaled keyframes as BLACK_SCREEN, FROZEN (below `frozen_diff`
+       motion; 0 = never) or live (see services.frame_analysis), or with
+       analysis='full' ffmpeg blackdetect over 2s of fully decoded video
+       (BLACK_SCREEN only).
+    3) If `throughput` > 0, read the stream for that many seconds and flag it
+       SLOW when it arrives at less than `slow_ratio` of its bitrate.
+    4) DOWN results wait out the full timeout (unless `pad_down` is False, as
+       for attempts that will be retried); other results return immediately.
+
+    If `timings` is given it is filled with the seconds spent in each stage of
+    TIMING_STAGES that was reached, plus 'total'; 'wait' only when a DOWN
+    result was padded. If `stats` is given it gets
+    'black_ratio', 'motion' and 'ttff' (time to first frame; None when not
+    measured) and 'frames', plus
+    'rate_bps', 'bitrate' and 'throughput_ratio' when throughput was measured.
     """
     start = time.monotonic()
+    last = [start]
+
+    def mark(stage: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        if timings is not None:
+            timings[stage] = now - last[0]
+        last[0] = now
 
     def _finish(status: str, res: str, br: str, fps: str) -> Tuple[str, str, str, str]:
         # If DOWN, block until the full timeout has elapsed
-        if status == 'DOWN':
+        if status == 'DOWN' and pad_down:
             elapsed = time.monotonic() - start
             if elapsed < timeout:
                 time.sleep(timeout - elapsed)
+                mark('wait')
+        if timings is not None:
+            timings['total'] = time.monotonic() - start
         return status, res, br, fps
 
     # --- 1) ffprobe check + metadata ---
+    # with timings, the network stages are read from ffprobe's own debug log,
+    # so they describe the connection the probe actually used
     probe_cmd = [
         'ffprobe',
-        '-v', 'error',
+        '-v', 'debug' if timings is not None else 'error',
         '-timeout', str(int(timeout * 1_000_000)),  # microseconds
         '-select_streams', 'v:0',
         '-show_entries', 'stream=width,height,avg_frame_rate,bit_rate',
@@ -30,21 +120,50 @@ def check_stream(name: str, url: str, timeout: float = 10.0) -> Tuple[str, str,
         url
     ]
     try:
-        proc = subprocess.run(
+        proc = subprocess.Popen(
             probe_cmd,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=timeout
+            encoding='utf-8',
+            errors='replace'
         )
-    except subprocess.TimeoutExpired:
-        return _finish('DOWN', '–', '–', '–')
     except Exception:
         return _finish('DOWN', '–', '–', '–')
+    with proc:  # closes both pipes
+        mark('spawn')
+        events: Dict[str, float] = {}
+        watcher = None
+        if timings is not None:
+            watcher = threading.Thread(target=_watch_probe_log, args=(proc.stderr, events), daemon=True)
+            watcher.start()
+        try:
+            if watcher is None:
+                stdout, _ = proc.communicate(timeout=timeout)
+            else:
+                proc.wait(timeout=timeout)  # stdout is four short lines; stderr goes to the watcher
+                stdout = proc.stdout.read()
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            if watcher is None:
+                proc.communicate()
+            else:
+                proc.wait()
+            stdout, timed_out = '', True
+        if watcher is not None:
+            watcher.join(1.0)
+            for stage, _ in _PROBE_EVENTS:
+                if stage in events:
+                    mark(stage, events[stage])
+        mark('probe')
+    if timed_out:
+        return _finish('DOWN', '–', '–', '–')
 
     if proc.returncode != 0:
         return _finish('DOWN', '–', '–', '–')
 
-    lines = proc.stdout.strip().splitlines()
+    lines = stdout.strip().splitlines()
     if len(lines) < 4:
         return _finish('DOWN', '–', '–', '–')
 
@@ -64,28 +183,35 @@ def check_stream(name: str, url: str, timeout: float = 10.0) -> Tuple[str, str,
     except Exception:
         fps_val = rfr or '–'
 
-    # --- 2) Black-screen detection ---
-    try:
-        ff_cmd = [
-            'ffmpeg', '-hide_banner', '-v', 'error',
-            '-t', '2', '-i', url,
-            '-vf', 'blackdetect=d=2:pix_th=0.98',
-            '-an', '-f', 'null', '-'
-        ]
-        p2 = subprocess.run(
-            ff_cmd,
-            stderr=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
-            text=True,
-            timeout=min(2, timeout)
-        )
-        stderr = p2.stderr or ''
-        if 'blackdetect' in stderr:
-            return 'BLACK_SCREEN', '–', '–', '–'
-    except subprocess.TimeoutExpired:
-        pass
-    except Exception:
-        pass
+    # --- 2) Picture analysis ---
+    if analysis == 'full':
+        black = blackdetect_full(url, timeout=min(2, timeout))
+        result = {'status': 'BLACK_SCREEN' if black else 'LIVE', 'frames': 0,
+                  'black_ratio': 1.0 if black else 0.0, 'motion': None, 'ttff': None}
+    else:
+        result = analyze_stream(url, sample_frames, min(ANALYSIS_TIMEOUT, timeout), frozen_diff)
+    mark('analysis')
+    if stats is not None:
+        stats.update((k, result[k]) for k in ('black_ratio', 'motion', 'frames', 'ttff'))
+    if result['status'] in ('BLACK_SCREEN', 'FROZEN'):
+        return _finish(result['status'], '–', '–', '–')
+
+    # --- 3) Sustained throughput ---
+    if throughput > 0:
+        # http.client (and ssl with it) only loads when throughput is measured
+        from services.throughput import measure_throughput
+        try:
+            tp = measure_throughput(url, throughput, timeout,
+                                    declared_bps=int(br) if br.isdigit() else None)
+        except Exception:
+            tp = None
+        mark('throughput')
+        if tp is not None:
+            if stats is not None:
+                stats.update(rate_bps=tp['rate_bps'], bitrate=tp['bitrate'],
+                             throughput_ratio=tp['ratio'])
+            if tp['ratio'] is not None and tp['ratio'] < slow_ratio:
+                return _finish('SLOW', res, br, fps_val)
 
-    # --- 3) UP: return immediately ---
-    return 'UP', res, br, fps_val
+    # --- 4) UP: return immediately ---
+    return _finish('UP', res, br, fps_val)
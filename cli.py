@@ -1,9 +1,35 @@
 # cli.py
 import argparse
-from config import load_config_from_args
-from services.playlist_sorter import PlaylistSorter
+import sys
+import time
+from config import (load_config_from_args, load_warmup_config_from_args,
+                    load_monitor_config_from_args, load_api_config_from_args)
 
-def main():
+def log(level, msg):
+    print(f"[{level.upper():7}] {msg}")
+
+def _add_tmdb_args(p):
+    p.add_argument("--cache-ttl-days", type=int, default=0, help="Refresh cached TMDB lookups older than this (0 = never)")
+    p.add_argument("--negative-ttl-hours", type=int, default=72, help="Retry titles with no TMDB result after this many hours")
+    p.add_argument("--full-details", action="store_true", help="Fetch full TMDB details per match (one extra request each)")
+    p.add_argument("--title-index", help="Offline TMDB title index built with `python -m services.tmdb_index`")
+
+def _add_profile_args(p):
+    p.add_argument("--profile", action="store_true", help="Profile the run with cProfile and tracemalloc")
+    p.add_argument("--profile-dir", help="Where to write profile reports (default: output dir or cwd)")
+    p.add_argument("--profile-interval", type=float, default=30.0, help="Seconds between tracemalloc snapshots")
+    p.add_argument("--profile-top", type=int, default=25, help="Entries per section of the allocation report")
+
+def _run(fn, args, name, default_dir):
+    """Call fn(), wrapped in a RunProfiler when --profile was given."""
+    if not args.profile:
+        return fn()
+    from services.profiling import RunProfiler
+    with RunProfiler(args.profile_dir or default_dir, name, args.profile_interval,
+                     args.profile_top, logger=log):
+        return fn()
+
+def sort_main(argv):
     p = argparse.ArgumentParser(description="IPTV Playlist Sorter")
     p.add_argument("-i","--input", required=True, help="Input .m3u file")
     p.add_argument("-o","--output", required=True, help="Output directory")
@@ -15,15 +41,145 @@ def main():
     p.add_argument("--update-banner", action="store_true", help="Update tvg-logo")
     p.add_argument("--export-only-sorted", action="store_true", help="Only export processed entries")
     p.add_argument("--genre-map", help="Path to JSON file with genre overrides")
-    args = p.parse_args()
+    p.add_argument("--episode-details", action="store_true", help="Use TMDB episode names/stills for SxxEyy entries (one request per season)")
+    _add_tmdb_args(p)
+    _add_profile_args(p)
+    args = p.parse_args(argv)
 
+    from services.playlist_sorter import PlaylistSorter
     cfg = load_config_from_args(args)
+    sorter = PlaylistSorter(cfg, logger=log)
+    _run(sorter.start, args, "sort", args.output)
 
-    def log(level, msg):
-        print(f"[{level.upper():7}] {msg}")
+def warmup_main(argv):
+    p = argparse.ArgumentParser(prog="cli.py warmup",
+                                description="Pre-populate the TMDB cache from one or more playlists")
+    p.add_argument("inputs", nargs="+", help="Input .m3u files")
+    p.add_argument("-g","--groups", nargs="*", help="Groups to warm (default: all)")
+    p.add_argument("--tmdb-key", required=True, help="TMDB API key")
+    p.add_argument("-w","--workers", type=int, default=2, help="Max concurrent lookups")
+    p.add_argument("--rate", type=float, default=1.0, help="Max TMDB lookups started per second")
+    _add_tmdb_args(p)
+    _add_profile_args(p)
+    args = p.parse_args(argv)
 
-    sorter = PlaylistSorter(cfg, logger=log)
-    sorter.start()
+    from services.cache_warmer import CacheWarmer
+    cfg = load_warmup_config_from_args(args)
+    warmer = CacheWarmer(cfg, logger=log)
+    try:
+        _run(warmer.start, args, "warmup", ".")
+    except KeyboardInterrupt:
+        log('info', 'Interrupted; cache saved up to the last batch')
+
+def _add_check_args(p):
+    p.add_argument("-g","--groups", nargs="*", help="Groups to check (default: all)")
+    p.add_argument("-w","--workers", type=int, default=10, help="Concurrent checks")
+    p.add_argument("--timeout", type=float, default=10.0, help="Per-check timeout in seconds")
+    p.add_argument("--analysis", choices=["keyframes", "full"], default="keyframes", help="Picture analysis mode")
+    p.add_argument("--history", default=".check_history.db", help="Append every check to this history database ('' = off)")
+
+def _add_monitor_args(p):
+    p.add_argument("--per-minute", type=int, default=120, help="Max probes per minute overall (0 = unlimited)")
+    p.add_argument("--per-host", type=int, default=20, help="Max probes per minute per host (0 = unlimited)")
+    p.add_argument("--min-interval", type=float, default=300.0, help="Seconds between checks of flapping/changed channels")
+    p.add_argument("--max-interval", type=float, default=6 * 3600.0, help="Longest back-off for stable channels, seconds")
+    p.add_argument("--dead-retry", type=float, default=30.0, help="First retry delay for a channel that just went down")
+    p.add_argument("--state", default=".monitor_state.db", help="State database (survives restarts)")
+
+def monitor_main(argv):
+    p = argparse.ArgumentParser(prog="cli.py monitor",
+                                description="Keep checking a playlist's streams and keep working/non-working playlists current")
+    p.add_argument("-i","--input", required=True, help="Input .m3u file (reloaded when it changes)")
+    p.add_argument("-o","--output", required=True, help="Output directory")
+    _add_check_args(p)
+    _add_monitor_args(p)
+    _add_profile_args(p)
+    args = p.parse_args(argv)
+
+    import signal
+    from services.monitor import ChannelMonitor
+    monitor = ChannelMonitor(load_monitor_config_from_args(args), logger=log)
+    signal.signal(signal.SIGTERM, lambda *_: monitor.stop())
+    try:
+        _run(monitor.start, args, "monitor", args.output)
+    except KeyboardInterrupt:
+        pass
+
+def serve_main(argv):
+    p = argparse.ArgumentParser(prog="cli.py serve",
+                                description="Serve check results, live events, filtered playlists and on-demand checks over HTTP")
+    p.add_argument("-i","--input", required=True, help="Input .m3u file")
+    p.add_argument("-o","--output", default=".", help="Output directory of the background monitor")
+    p.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    p.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    p.add_argument("--fresh-ttl", type=float, default=60.0, help="On-demand checks reuse results younger than this (s)")
+    p.add_argument("--allow-urls", action="store_true", help="Let POST /check probe http(s) URLs that are not in the playlist")
+    p.add_argument("--monitor", action="store_true", help="Also run the monitor in the background")
+    _add_check_args(p)
+    _add_monitor_args(p)
+    args = p.parse_args(argv)
+
+    import signal
+    from services.api_server import ApiServer
+    server = ApiServer(load_api_config_from_args(args), logger=log)
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    try:
+        server.start()
+    except KeyboardInterrupt:
+        pass
+
+def history_main(argv):
+    p = argparse.ArgumentParser(prog="cli.py history",
+                                description="Uptime, time-to-first-frame and flapping reports from the check history")
+    p.add_argument("--db", default=".check_history.db", help="History database")
+    p.add_argument("-g","--group", help="Only this group's channels")
+    p.add_argument("--worst", type=int, default=20, help="Least available channels to list")
+    p.add_argument("--channel", help="Daily uptime of this stream (its URL)")
+    p.add_argument("--days", type=int, default=30, help="Days of the daily series")
+    p.add_argument("--prune", type=float, metavar="DAYS", help="Delete raw checks older than DAYS (rollups stay)")
+    args = p.parse_args(argv)
+
+    from services.history_store import HistoryStore, FLAP_THRESHOLD, history_key
+    store = HistoryStore(args.db)
+    try:
+        if args.prune is not None:
+            log('info', f"Pruned {store.prune(args.prune)} raw checks")
+        if args.channel:
+            for d in store.daily(history_key(args.channel), args.days):
+                ttff = f"{d['mean_ttff']:.2f}s" if d['mean_ttff'] is not None else "–"
+                print(f"{time.strftime('%Y-%m-%d', time.gmtime(d['day']))}  {d['uptime']:7.1%}  "
+                      f"{d['checks']:5} checks  ttff {ttff}")
+            return
+        for grp, g in store.groups().items():
+            if args.group is not None and grp != args.group:
+                continue
+            ttff = f"{g['mean_ttff']:.2f}s" if g['mean_ttff'] is not None else "–"
+            print(f"{grp or '(no group)':30} {g['uptime']:7.1%}  {g['channels']:5} channels  "
+                  f"{g['checks']:7} checks  ttff {ttff}  {g['flapping']} flapping")
+        chans = sorted(store.channels(args.group), key=lambda c: (c.uptime, -c.checks))
+        if chans and args.worst:
+            print("\nLeast available channels:")
+            for c in chans[:args.worst]:
+                flag = "  flapping" if c.flap >= FLAP_THRESHOLD else ""
+                print(f"{c.uptime:7.1%}  {c.checks:5} checks  {c.status or '–':12} {c.name or c.key}{flag}")
+    finally:
+        store.close()
+
+# Subcommands; anything else is parsed as the original sort arguments
+COMMANDS = {
+    "sort": sort_main,
+    "warmup": warmup_main,
+    "monitor": monitor_main,
+    "serve": serve_main,
+    "history": history_main,
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        COMMANDS[argv[0]](argv[1:])
+    else:
+        sort_main(argv)
 
 if __name__ == "__main__":
     main()
@@ -16,6 +16,12 @@ class SortConfig:
     update_banner: bool = False
     export_only_sorted: bool = False
     genre_map: Dict[str, str] = field(default_factory=dict)
+    cache_ttl_days: int = 0  # 0 = cached lookups never expire
+    negative_ttl_hours: int = 72  # how long a "no result" is trusted
+    title_index: Optional[Path] = None  # offline TMDB title index (services/tmdb_index.py)
+    full_details: bool = False  # fetch /movie|/tv details instead of using search genre_ids
+    episode_details: bool = False  # resolve SxxEyy entries to episode names/stills per season
+    tmdb_api_base: str = "https://api.themoviedb.org/3"  # overridden by benchmarks' mock server
 
     @staticmethod
     def load_genre_map(path: Optional[Path]) -> Dict[str, str]:
@@ -24,6 +30,66 @@ class SortConfig:
                 return json.load(f)
         return {}
 
+@dataclass
+class WarmupConfig:
+    m3u_files: List[Path]
+    selected_groups: List[str]
+    tmdb_api_key: str
+    max_workers: int = 2
+    rate: float = 1.0  # max TMDB lookups started per second
+    cache_ttl_days: int = 0
+    negative_ttl_hours: int = 72
+    title_index: Optional[Path] = None
+    full_details: bool = False
+
+@dataclass
+class MonitorConfig:
+    m3u_file: Path
+    output_dir: Path
+    selected_groups: List[str]
+    max_workers: int = 10
+    timeout: float = 10.0
+    analysis: str = 'keyframes'  # checker picture analysis mode
+    per_minute: int = 120  # total probe budget (0 = unlimited)
+    per_host: int = 20  # probes per host per minute (0 = unlimited)
+    min_interval: float = 300.0  # seconds; flapping and just-changed channels
+    max_interval: float = 6 * 3600.0  # cap for the exponential back-off of stable channels
+    dead_retry: float = 30.0  # first retry of a channel that just went down, doubling
+    dead_retries: int = 4  # fast retries before a dead channel backs off like a stable one
+    state_db: Path = Path(".monitor_state.db")
+    write_interval: float = 10.0  # coalesce playlist rewrites after status changes
+    history_db: Optional[Path] = Path(".check_history.db")  # every check is appended here (None = off)
+
+@dataclass
+class CheckOptions:
+    """Options of services.playlist_checker.check_playlist (the library API)."""
+    selected_groups: List[str] = field(default_factory=list)  # empty = all groups
+    max_workers: int = 5  # concurrent checks, and how far checking runs ahead of the consumer
+    retries: int = 2  # extra attempts for streams that come back DOWN
+    timeout: float = 10.0
+    analysis: str = 'keyframes'  # checker picture analysis mode
+    sample_frames: int = 5
+    throughput: float = 0.0  # seconds of sustained-throughput probe (0 = off)
+    slow_ratio: float = 0.9
+    frozen_diff: float = 1.0  # FROZEN below this inter-frame difference (0 = never FROZEN)
+    dedupe_urls: bool = True  # check each unique stream once, share the result
+    volatile_params: Optional[List[str]] = None  # None = services.utils.VOLATILE_PARAMS
+
+@dataclass
+class ApiConfig:
+    m3u_file: Path
+    selected_groups: List[str]
+    host: str = "127.0.0.1"
+    port: int = 8080
+    max_workers: int = 10  # concurrent on-demand checks
+    timeout: float = 10.0
+    analysis: str = 'keyframes'
+    fresh_ttl: float = 60.0  # on-demand checks reuse results younger than this (seconds)
+    allow_urls: bool = False  # POST /check may probe http(s) URLs outside the playlist
+    state_db: Path = Path(".monitor_state.db")  # seeds results from a monitor's state
+    history_db: Optional[Path] = Path(".check_history.db")  # on-demand checks are appended here
+    monitor: Optional[MonitorConfig] = None  # run the monitor in the background too
+
 def load_config_from_args(args) -> SortConfig:
     cfg = SortConfig(
         m3u_file=Path(args.input),
@@ -35,6 +101,57 @@ def load_config_from_args(args) -> SortConfig:
         update_name=args.update_name,
         update_banner=args.update_banner,
         export_only_sorted=args.export_only_sorted,
-        genre_map=SortConfig.load_genre_map(Path(args.genre_map)) if args.genre_map else {}
+        genre_map=SortConfig.load_genre_map(Path(args.genre_map)) if args.genre_map else {},
+        cache_ttl_days=args.cache_ttl_days,
+        negative_ttl_hours=args.negative_ttl_hours,
+        title_index=Path(args.title_index) if args.title_index else None,
+        full_details=args.full_details,
+        episode_details=args.episode_details
     )
     return cfg
+
+def load_warmup_config_from_args(args) -> WarmupConfig:
+    return WarmupConfig(
+        m3u_files=[Path(p) for p in args.inputs],
+        selected_groups=args.groups or [],
+        tmdb_api_key=args.tmdb_key,
+        max_workers=args.workers,
+        rate=args.rate,
+        cache_ttl_days=args.cache_ttl_days,
+        negative_ttl_hours=args.negative_ttl_hours,
+        title_index=Path(args.title_index) if args.title_index else None,
+        full_details=args.full_details
+    )
+
+def load_monitor_config_from_args(args) -> MonitorConfig:
+    return MonitorConfig(
+        m3u_file=Path(args.input),
+        output_dir=Path(args.output),
+        selected_groups=args.groups or [],
+        max_workers=args.workers,
+        timeout=args.timeout,
+        analysis=args.analysis,
+        per_minute=args.per_minute,
+        per_host=args.per_host,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        dead_retry=args.dead_retry,
+        state_db=Path(args.state),
+        history_db=Path(args.history) if args.history else None
+    )
+
+def load_api_config_from_args(args) -> ApiConfig:
+    return ApiConfig(
+        m3u_file=Path(args.input),
+        selected_groups=args.groups or [],
+        host=args.host,
+        port=args.port,
+        max_workers=args.workers,
+        timeout=args.timeout,
+        analysis=args.analysis,
+        fresh_ttl=args.fresh_ttl,
+        allow_urls=args.allow_urls,
+        state_db=Path(args.state),
+        history_db=Path(args.history) if args.history else None,
+        monitor=load_monitor_config_from_args(args) if args.monitor else None
+    )
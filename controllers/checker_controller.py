@@ -1,41 +1,60 @@
 import os
 import threading
+import time
 import traceback
+from urllib.parse import urlsplit
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtGui import QTextCursor
+from checker import check_stream
+from services.frame_analysis import analysis_pool
+from services.history_store import HistoryStore, history_key
+from services.metrics import CheckTimings
+from services.mirrors import best_mirrors, channel_key
 from services.parser import parse_groups
+from services.profiling import RunProfiler
 from services.output_writer import write_output_files, CUID_RE
-from services.utils import clean_name, resolution_to_label, format_fps
-import requests
+from services.utils import clean_name, resolution_to_label, format_fps, normalize_url, VOLATILE_PARAMS
+
+# Per-check measurements copied to every entry that shares the checked stream
+RESULT_KEYS = ('timings', 'black_ratio', 'throughput_ratio', 'rate_bps', 'ttff')
 
 class CheckRunnable(QtCore.QObject, QtCore.QRunnable):
     """QRunnable that emits a result when done."""
     result = QtCore.pyqtSignal(dict, str, str, str)  # entry, status, resolution, fps
     log    = QtCore.pyqtSignal(str, str)             # level, message
 
-    def __init__(self, entry, retries, timeout):
+    def __init__(self, entry, retries, timeout, check_opts=None):
         super().__init__()
         QtCore.QRunnable.__init__(self)
         self.entry   = entry
         self.retries = retries
         self.timeout = timeout
+        self.check_opts = check_opts or {}
         self.setAutoDelete(True)
 
     def run(self):
         url     = self.entry['url']
         attempt = 0
-        status  = 'DOWN'
+        status, res, fps = 'DOWN', '', ''
         while attempt <= self.retries:
+            timings, stats = {}, {}
             try:
-                r = requests.get(url, timeout=self.timeout, stream=True)
-                if r.status_code == 200:
-                    status = 'UP'
-                    break
+                # only the last attempt waits out the timeout when DOWN
+                status, res, _, fps = check_stream(self.entry['name'], url, self.timeout, timings,
+                                                   stats=stats, pad_down=attempt == self.retries,
+                                                   **self.check_opts)
             except Exception as e:
                 self.log.emit('error', f"Error on {self.entry['uid']}: {e}")
+            # keep the breakdown of the last attempt with the result
+            self.entry['timings'] = timings
+            self.entry['black_ratio'] = stats.get('black_ratio')
+            self.entry['throughput_ratio'] = stats.get('throughput_ratio')
+            self.entry['rate_bps'] = stats.get('rate_bps')
+            self.entry['ttff'] = stats.get('ttff')
+            if status != 'DOWN':
+                break
             attempt += 1
-        # no resolution/fps detection
-        self.result.emit(self.entry, status, '', '')
+        self.result.emit(self.entry, status, res, fps)
 
 
 class CheckerController(QtCore.QObject):
@@ -50,6 +69,10 @@ class CheckerController(QtCore.QObject):
         self.main      = main_window
         self.pool      = QtCore.QThreadPool.globalInstance()
         self.remaining = 0
+        self.timings   = CheckTimings()
+        self._last_timing_status = 0.0
+        self.profiler  = None
+        self.history   = None
 
         # connect signals
         self.log_signal.connect(self._on_log)
@@ -85,12 +108,24 @@ class CheckerController(QtCore.QObject):
         self.workers          = opts.get('workers', 5)
         self.retries          = opts.get('retries', 2)
         self.timeout          = opts.get('timeout', 10)
+        self.check_opts       = {
+            'analysis':      opts.get('black_detect', 'keyframes'),
+            'sample_frames': opts.get('sample_frames', 5),
+            'throughput':    opts.get('throughput_seconds', 0),
+            'slow_ratio':    opts.get('slow_ratio', 0.9),
+            'frozen_diff':   opts.get('frozen_diff', 1.0),
+        }
         self.split            = opts.get('split', False)
+        self.split_slow       = opts.get('split_slow', False)
         self.update_quality   = opts.get('update_quality', False)
         self.update_fps       = opts.get('update_fps', False)
         self.include_untested = opts.get('include_untested', False)
         self.output_dir       = opts.get('output_dir', os.getcwd())
         self.selected_groups  = opts.get('selected_groups', [])
+        self.dedupe_urls      = opts.get('dedupe_urls', True)
+        self.best_source      = opts.get('best_source', False)
+        self.volatile_params  = opts.get('volatile_params', list(VOLATILE_PARAMS))
+        self.record_history   = opts.get('record_history', True)
 
         if not self.m3u_file or not self.selected_groups:
             QtWidgets.QMessageBox.warning(
@@ -99,6 +134,11 @@ class CheckerController(QtCore.QObject):
             )
             return
 
+        # profile the GUI thread (result handling, console, signals) if toggled
+        if getattr(self.main, 'profile_runs', False) and self.profiler is None:
+            self.profiler = RunProfiler(self.output_dir, 'checker',
+                                        logger=self.log_signal.emit).start()
+
         # parse groups
         with open(self.m3u_file, 'r', encoding='utf-8') as f:
             self.original_lines = f.readlines()
@@ -117,10 +157,11 @@ class CheckerController(QtCore.QObject):
                     'url':  e.url,
                     'group':grp,
                     'raw_inf': e.raw_inf,
+                    'channel_key': channel_key(e.original_name, e.raw_inf),
                 })
 
         # reset UI
-        for tbl in (self.ui.tbl_working, self.ui.tbl_black_screen, self.ui.tbl_non_working):
+        for tbl in (self.ui.tbl_working, self.ui.tbl_black_screen, self.ui.tbl_frozen, self.ui.tbl_non_working):
             tbl.setRowCount(0)
         self.log_records = []
         self._refresh_console()
@@ -151,25 +192,64 @@ class CheckerController(QtCore.QObject):
             for e   in self.group_entries[grp]
         }
         self.status_map = {}
-        self.remaining  = len(self.entry_map)
+        self.timings    = CheckTimings()
+        if self.history is not None:
+            self.history.close()
+        self.history    = HistoryStore() if self.record_history else None
+
+        # one check per unique stream; results fan out to every entry sharing it
+        self.url_groups = {}
+        for uid, e in self.entry_map.items():
+            key = normalize_url(e['url'], self.volatile_params) if self.dedupe_urls else uid
+            e['url_key'] = key
+            self.url_groups.setdefault(key, []).append(uid)
+        self.remaining = len(self.url_groups)
+        self.dedup_summary = self._dedup_summary()
+        self.log_signal.emit('info', self.dedup_summary)
 
         # launch tasks
+        if self.check_opts['analysis'] == 'keyframes':
+            analysis_pool()
         self.pool.setMaxThreadCount(self.workers)
-        for entry in self.entry_map.values():
-            task = CheckRunnable(entry, self.retries, self.timeout)
+        for uids in self.url_groups.values():
+            task = CheckRunnable(self.entry_map[uids[0]], self.retries, self.timeout, self.check_opts)
             task.log.connect(lambda lvl, m: self.log_signal.emit(lvl, m))
             task.result.connect(self.result_signal)
             self.pool.start(task)
 
-        self.status_signal.emit(f"Queued {self.remaining} tasks", 3000)
+        self.status_signal.emit(f"Queued {self.remaining} checks for {len(self.entry_map)} entries", 3000)
+
+    def _dedup_summary(self):
+        entries, checks = len(self.entry_map), len(self.url_groups)
+        saved = 1 - checks / entries if entries else 0.0
+        return f"{entries} entries, {checks} unique streams ({saved:.0%} of checks deduplicated)"
 
     def _on_result(self, entry, status, res, fps):
+        self._record_timings(entry)
+        if self.history is not None:
+            # once per check, not once per duplicate entry
+            self.history.record(history_key(entry['url']), status, entry.get('group', ''),
+                                entry['name'], entry.get('ttff'), res, fps)
+        for uid in self.url_groups.get(entry.get('url_key'), [entry['uid']]):
+            shared = self.entry_map[uid]
+            for k in RESULT_KEYS:
+                shared[k] = entry.get(k)
+            self._apply_result(shared, status, res, fps)
+
+        # when done, write outputs
+        self.remaining -= 1
+        if self.remaining == 0:
+            self._stop_profiler()
+            threading.Thread(target=self._write_output, daemon=True).start()
+
+    def _apply_result(self, entry, status, res, fps):
         uid = entry['uid']
         self.status_map[uid] = status
+        entry['resolution'], entry['fps'] = res, fps
 
         # update & annotate name
         name = entry['name']
-        if status == 'UP':
+        if status in ('UP', 'SLOW'):
             if self.update_quality and (ql := resolution_to_label(res)):
                 name += f" {ql}"
             if self.update_fps and (fl := format_fps(fps)):
@@ -180,7 +260,9 @@ class CheckerController(QtCore.QObject):
         display = clean_name(name)
         tbl = {
             'UP':           self.ui.tbl_working,
-            'BLACK_SCREEN': self.ui.tbl_black_screen
+            'SLOW':         self.ui.tbl_working,
+            'BLACK_SCREEN': self.ui.tbl_black_screen,
+            'FROZEN':       self.ui.tbl_frozen,
         }.get(status, self.ui.tbl_non_working)
         row = tbl.rowCount()
         tbl.insertRow(row)
@@ -190,15 +272,38 @@ class CheckerController(QtCore.QObject):
         if tbl is self.ui.tbl_working:
             tbl.setItem(row, 1, QtWidgets.QTableWidgetItem(res))
             tbl.setItem(row, 2, QtWidgets.QTableWidgetItem(fps))
+            tbl.setItem(row, 3, QtWidgets.QTableWidgetItem(self._quality_text(entry, status)))
 
         # log each result
         lvl = 'working' if status == 'UP' else 'error'
-        self.log_signal.emit(lvl, f"[{status}] {name}")
+        if status == 'SLOW':
+            self.log_signal.emit(lvl, f"[{status}] {name} ({self._quality_text(entry, status)})")
+        elif status == 'BLACK_SCREEN' and entry.get('black_ratio') is not None:
+            self.log_signal.emit(lvl, f"[{status}] {name} ({entry['black_ratio']:.0%} black)")
+        else:
+            self.log_signal.emit(lvl, f"[{status}] {name}")
 
-        # when done, write outputs
-        self.remaining -= 1
-        if self.remaining == 0:
-            threading.Thread(target=self._write_output, daemon=True).start()
+    @staticmethod
+    def _quality_text(entry, status):
+        """Download rate and its share of the stream bitrate, e.g. '0.62× · 3.1 Mb/s'."""
+        rate, ratio = entry.get('rate_bps'), entry.get('throughput_ratio')
+        if rate is None:
+            return '–'
+        text = f"{rate / 1e6:.1f} Mb/s"
+        if ratio is not None:
+            text = f"{ratio:.2f}× · {text}"
+        return f"SLOW {text}" if status == 'SLOW' else text
+
+    def _record_timings(self, entry):
+        timings = entry.get('timings')
+        if not timings:
+            return
+        self.timings.observe(timings, urlsplit(entry['url']).hostname or '', entry.get('group', ''))
+        # live view, at most once a second
+        now = time.monotonic()
+        if now - self._last_timing_status >= 1.0:
+            self._last_timing_status = now
+            self.status_signal.emit(f"{self.remaining - 1} left · {self.timings.summary()}", 0)
 
     def _on_log(self, level, msg):
         self.log_records.append((level, msg))
@@ -224,8 +329,17 @@ class CheckerController(QtCore.QObject):
 
     def stop_check(self):
         self.pool.clear()
+        self._stop_profiler()
+        if self.history is not None:
+            self.history.flush()
         self.log_signal.emit('info', 'Stopping...')
 
+    def _stop_profiler(self):
+        # must run on the GUI thread, the one cProfile was enabled on
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler = None
+
     def _write_output(self):
         base = os.path.splitext(os.path.basename(self.m3u_file))[0]
         files = write_output_files(
@@ -237,8 +351,14 @@ class CheckerController(QtCore.QObject):
             split=self.split,
             update_quality=self.update_quality,
             update_fps=self.update_fps,
-            include_untested=self.include_untested
+            include_untested=self.include_untested,
+            split_slow=self.split_slow,
+            best=best_mirrors(self.entry_map, self.status_map) if self.best_source else None
         )
+        files += self.timings.write(os.path.join(self.output_dir, base))
+        if self.history is not None:
+            self.history.flush()
+        self.log_signal.emit('info', f"Summary: {self.dedup_summary}")
         if files:
             for p in files:
                 self.log_signal.emit('info', f"Exported: {p}")
@@ -5,8 +5,8 @@ import threading
 from pathlib import Path
 from PyQt5 import QtWidgets, QtCore, QtGui
 from config import SortConfig
-from services.parser import parse_groups
 from services.playlist_sorter import PlaylistSorter
+from services.profiling import RunProfiler
 
 class SorterController(QtCore.QObject):
     log_signal = QtCore.pyqtSignal(str, str)  # (level, message)
@@ -37,13 +37,12 @@ class SorterController(QtCore.QObject):
             )
             return
 
-        # determine which groups
+        # determine which groups; an empty selection makes the sorter use
+        # every group once it has parsed the file on its own thread
         selected = opts.get('selected_groups', [])
         if not selected:
-            all_groups, _ = parse_groups(m3u)
-            selected = list(all_groups.keys())
             self.main_window.statusBar().showMessage(
-                f'No groups selected—using all {len(selected)}', 3000
+                'No groups selected—using all groups', 3000
             )
         else:
             self.main_window.statusBar().showMessage(
@@ -74,8 +73,14 @@ class SorterController(QtCore.QObject):
         self._logbuf.clear()
         self.ui.te_console.clear()
 
-        # run sorter in background
-        thread = threading.Thread(target=self.sorter.start, daemon=True)
+        # run sorter in background, profiled on its own thread if toggled
+        target = self.sorter.start
+        if getattr(self.main_window, 'profile_runs', False):
+            sorter = self.sorter
+            def target():
+                with RunProfiler(str(cfg.output_dir), 'sorter', logger=logger):
+                    sorter.start()
+        thread = threading.Thread(target=target, daemon=True)
         thread.start()
 
     def _on_log(self, level: str, msg: str):
@@ -0,0 +1,168 @@
+# controllers/workers.py
+
+import os
+import threading
+import queue
+import time
+
+from PyQt5 import QtCore
+from checker import check_stream
+from services.parser import iter_entries, category_for
+
+class WorkerThread(QtCore.QThread):
+    """
+    Worker thread for checking streams.
+
+    Emits:
+    - result(entry, status, resolution, fps)
+    - log(level, message)
+
+    Levels: 'working', 'error'
+    """
+    result = QtCore.pyqtSignal(object, str, str, str)
+    log = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, tasks: queue.Queue, retries: int, timeout: float, parent=None):
+        super().__init__(parent)
+        self.tasks = tasks
+        self.retries = retries
+        self.timeout = timeout
+        self._pause = threading.Event()
+        self._stop = threading.Event()
+
+    def run(self):
+        # Signal that this thread is alive
+        self.log.emit('working', '[WORKER] Thread started')
+
+        # Process tasks until none remain or stopped
+        while not self._stop.is_set():
+            try:
+                entry = self.tasks.get_nowait()
+            except queue.Empty:
+                break
+
+            name = entry.get('name', '<no-name>')
+            url  = entry.get('url', '')
+
+            # Honor pause
+            while self._pause.is_set() and not self._stop.is_set():
+                self.msleep(100)
+
+            # Try checking the stream up to `retries` times
+            for attempt in range(1, self.retries + 1):
+                self.log.emit('working', f"[WORKER] Testing {name} (try {attempt})")
+                timings = {}
+                try:
+                    st, res, bitrate, fps = check_stream(name, url, timeout=self.timeout, timings=timings,
+                                                         pad_down=attempt == self.retries)
+                    entry['timings'] = timings
+                except Exception as e:
+                    self.log.emit('error', f"[WORKER] Exception testing {name}: {e}")
+                    self.result.emit(entry, 'DOWN', '–', '–')
+                    break
+
+                if st == 'UP':
+                    fps_value = fps or '–'
+                    self.log.emit('working', f"Channel: {name} is WORKING [{res}, {fps_value} FPS]")
+                    self.result.emit(entry, st, res, fps_value)
+                    break
+
+                elif st == 'SLOW':
+                    fps_value = fps or '–'
+                    self.log.emit('error', f"Channel: {name} is SLOW [{res}, {fps_value} FPS]")
+                    self.result.emit(entry, st, res, fps_value)
+                    break
+
+                elif st == 'BLACK_SCREEN':
+                    self.log.emit('error', f"Channel: {name} has a BLACK SCREEN")
+                    self.result.emit(entry, st, '–', '–')
+                    break
+
+                elif st == 'FROZEN':
+                    self.log.emit('error', f"Channel: {name} has a FROZEN picture")
+                    self.result.emit(entry, st, '–', '–')
+                    break
+
+                else:  # DOWN
+                    if attempt < self.retries:
+                        self.log.emit('error', f"Channel: {name} is DOWN; retrying…")
+                    else:
+                        self.log.emit('error', f"Channel: {name} is DOWN after {self.retries} retries")
+                        self.result.emit(entry, 'DOWN', '–', '–')
+
+    def pause(self):
+        self._pause.set()
+
+    def resume(self):
+        self._pause.clear()
+
+    def stop(self):
+        self._stop.set()
+        self.resume()
+
+
+class PlaylistLoader(QtCore.QThread):
+    """
+    Background thread that streams an M3U file and counts entries per group.
+
+    Emits:
+    - progress(bytes_read, total_bytes, entries_parsed)
+    - groups(delta)  category → {group: count} for groups changed since the last emit
+    - loaded(cats)   full category → {group: count} map once the whole file is read
+
+    Updates are batched every EMIT_INTERVAL seconds so large playlists do not
+    flood the GUI thread with signals.
+    """
+    progress = QtCore.pyqtSignal('qint64', 'qint64', int)
+    groups = QtCore.pyqtSignal(dict)
+    loaded = QtCore.pyqtSignal(dict)
+
+    EMIT_INTERVAL = 0.1
+
+    def __init__(self, m3u_file: str, parent=None):
+        super().__init__(parent)
+        self.m3u_file = m3u_file
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._cats = {"Live Channels": {}, "Movies": {}, "Series": {}}
+        self.entries = 0
+
+    def run(self):
+        try:
+            total = os.path.getsize(self.m3u_file)
+        except OSError:
+            total = 0
+        delta = {}
+        read = 0
+        last_emit = time.monotonic()
+        try:
+            for e, read in iter_entries(self.m3u_file, self._stop.is_set):
+                cat = category_for(e.url)
+                grp = e.group or "Other"
+                with self._lock:
+                    bucket = self._cats[cat]
+                    bucket[grp] = bucket.get(grp, 0) + 1
+                    delta.setdefault(cat, {})[grp] = bucket[grp]
+                self.entries += 1
+                now = time.monotonic()
+                if now - last_emit >= self.EMIT_INTERVAL:
+                    self.groups.emit(delta)
+                    self.progress.emit(read, total, self.entries)
+                    delta = {}
+                    last_emit = now
+        except OSError:
+            pass
+        if self._stop.is_set():
+            return
+        if delta:
+            self.groups.emit(delta)
+        self.progress.emit(total or read, total, self.entries)
+        self.loaded.emit(self.snapshot())
+
+    def snapshot(self) -> dict:
+        """Copy of the category → {group: count} map discovered so far."""
+        with self._lock:
+            return {cat: dict(groups) for cat, groups in self._cats.items()}
+
+    def stop(self):
+        self._stop.set()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 import sys
-from PyQt5 import QtWidgets, QtCore
+from PyQt5 import QtWidgets, QtCore, QtGui
 
 from ui.checker_ui import CheckerUI
 from ui.sorter_ui import SorterUI
@@ -18,6 +18,8 @@ class MainWindow(QtWidgets.QMainWindow):
         super().__init__()
         self.setWindowTitle("DonTV IPTV Checker & Playlist Sorter")
         self.resize(1000, 700)
+        # hidden toggle (Ctrl+Shift+P): profile the next checker/sorter runs
+        self.profile_runs = False
 
         # Central widget & layout
         central = QtWidgets.QWidget()
@@ -108,6 +110,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_pause.clicked.connect(self._on_pause)
         self.btn_stop.clicked.connect(self._on_stop)
 
+        sc = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+P"), self)
+        sc.activated.connect(self._toggle_profiling)
+
+    def _toggle_profiling(self):
+        self.profile_runs = not self.profile_runs
+        state = "enabled" if self.profile_runs else "disabled"
+        self.statusBar().showMessage(f"Profiling {state} for the next run", 3000)
+
     def _switch_page(self, idx: int):
         self.pages.setCurrentIndex(idx)
         self.btn_iptv.setChecked(idx == 0)
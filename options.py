@@ -1,51 +1,35 @@
 # options.py
 
 import os
-import re
 import json
 from typing import Dict, List
 from PyQt5 import QtWidgets, QtCore
 
-# Regex to extract the group-title attribute
-_GROUP_RE = re.compile(r'group-title="([^\"]*)"', re.IGNORECASE)
-
-def _parse_categories(m3u_path: str) -> Dict[str, Dict[str, int]]:
-    """
-    Read the M3U and bucket entries into Live Channels, Movies, or Series.
-    Returns a dict mapping category → { group_title: count, … }.
-    """
-    cats = {"Live Channels": {}, "Movies": {}, "Series": {}}
-    with open(m3u_path, 'r', encoding='utf-8') as f:
-        lines = [l.rstrip('\n') for l in f]
-    for i, line in enumerate(lines):
-        if not line.startswith('#EXTINF'):
-            continue
-        m = _GROUP_RE.search(line)
-        group = m.group(1) if m else "Other"
-        url = lines[i+1] if i+1 < len(lines) else ''
-        lower = url.lower()
-        if 'series' in lower:
-            bucket = cats['Series']
-        elif 'movie' in lower:
-            bucket = cats['Movies']
-        else:
-            bucket = cats['Live Channels']
-        bucket.setdefault(group, 0)
-        bucket[group] += 1
-    return cats
+from controllers.workers import PlaylistLoader
+from services.utils import VOLATILE_PARAMS, SHORT_VOLATILE_PARAMS
 
 class GroupSelectionDialog(QtWidgets.QDialog):
     """
     Dialog for selecting groups from an M3U playlist.
+    Groups stream in from a PlaylistLoader while the file is still being read.
     """
-    def __init__(self, m3u_file: str, parent=None):
+    CATEGORIES = ('Live Channels','Movies','Series')
+
+    def __init__(self, loader: PlaylistLoader, selected: List[str], parent=None):
         super().__init__(parent)
         self.setWindowTitle('Select Groups')
         self.resize(900, 500)
-        self.cats = _parse_categories(m3u_file)
-        self.selected_groups: List[str] = []
+        self.loader = loader
+        self.selected_groups: List[str] = list(selected)
         self._checkboxes: Dict[str, QtWidgets.QCheckBox] = {}
+        self._columns: Dict[str, QtWidgets.QVBoxLayout] = {}
         self._build_ui()
+        self._add_groups(loader.snapshot())
+        loader.groups.connect(self._add_groups)
+        loader.progress.connect(self._on_progress)
+        loader.loaded.connect(self._on_loaded)
+        if loader.isFinished():
+            self._on_loaded(loader.snapshot())
 
     def _build_ui(self):
         main_v = QtWidgets.QVBoxLayout(self)
@@ -61,7 +45,7 @@ class GroupSelectionDialog(QtWidgets.QDialog):
             QGroupBox::title { background:#5b2fc9; color:white; subcontrol-origin:margin; left:10px; padding:0 3px; }
         '''
 
-        for cat in ('Live Channels','Movies','Series'):
+        for cat in self.CATEGORIES:
             gb = QtWidgets.QGroupBox(cat)
             gb.setStyleSheet(box_style)
             v = QtWidgets.QVBoxLayout(gb)
@@ -75,22 +59,52 @@ class GroupSelectionDialog(QtWidgets.QDialog):
             iv = QtWidgets.QVBoxLayout(inner)
             iv.setContentsMargins(0,0,0,0)
             iv.setSpacing(2)
-            for grp, cnt in self.cats[cat].items():
-                cb = QtWidgets.QCheckBox(f"{grp} ({cnt} channels)")
-                self._checkboxes[f"{cat}|{grp}"] = cb
-                iv.addWidget(cb)
             iv.addStretch()
+            self._columns[cat] = iv
             col_scroll.setWidget(inner)
             v.addWidget(col_scroll,1)
             h.addWidget(gb)
 
         scroll.setWidget(container)
         main_v.addWidget(scroll,1)
+        self.progress = QtWidgets.QProgressBar()
+        self.progress.setRange(0, 0)
+        self.progress.setFormat('Loading playlist…')
+        self.progress.setTextVisible(True)
+        main_v.addWidget(self.progress)
         bb = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
         bb.accepted.connect(self._on_accept)
         bb.rejected.connect(self.reject)
         main_v.addWidget(bb)
 
+    def _add_groups(self, delta: Dict[str, Dict[str, int]]):
+        for cat, groups in delta.items():
+            iv = self._columns.get(cat)
+            if iv is None:
+                continue
+            for grp, cnt in groups.items():
+                key = f"{cat}|{grp}"
+                cb = self._checkboxes.get(key)
+                if cb is None:
+                    cb = QtWidgets.QCheckBox()
+                    cb.setChecked(grp in self.selected_groups)
+                    self._checkboxes[key] = cb
+                    # keep the trailing stretch last
+                    iv.insertWidget(iv.count()-1, cb)
+                cb.setText(f"{grp} ({cnt} channels)")
+
+    def _on_progress(self, read: int, total: int, entries: int):
+        if total > 0:
+            self.progress.setRange(0, 1000)
+            self.progress.setValue(int(read * 1000 / total))
+        self.progress.setFormat(f"Loading playlist… {read // 1024:,} KiB, {entries:,} entries")
+
+    def _on_loaded(self, cats: Dict[str, Dict[str, int]]):
+        self._add_groups(cats)
+        self.progress.setRange(0, 1)
+        self.progress.setValue(1)
+        self.progress.setFormat(f"{self.loader.entries:,} entries loaded")
+
     def _toggle_all(self, category: str):
         any_off = any(not cb.isChecked() for k,cb in self._checkboxes.items() if k.startswith(category+'|'))
         for k,cb in self._checkboxes.items():
@@ -101,6 +115,17 @@ class GroupSelectionDialog(QtWidgets.QDialog):
         self.selected_groups = [k.split('|',1)[1] for k,cb in self._checkboxes.items() if cb.isChecked()]
         self.accept()
 
+    def done(self, result):
+        # stop receiving updates; the loader itself keeps running for reuse
+        for sig, slot in ((self.loader.groups, self._add_groups),
+                          (self.loader.progress, self._on_progress),
+                          (self.loader.loaded, self._on_loaded)):
+            try:
+                sig.disconnect(slot)
+            except TypeError:
+                pass
+        super().done(result)
+
 class OptionsDialog(QtWidgets.QDialog):
     """
     Dialog for all application options, loaded/saved from config.json.
@@ -111,6 +136,7 @@ class OptionsDialog(QtWidgets.QDialog):
         self.setWindowTitle('Options')
         self.resize(800,520)
         self.selected_groups: List[str] = []
+        self._loader: PlaylistLoader = None
         self._build_ui()
         self._load_all_settings()
 
@@ -155,14 +181,42 @@ class OptionsDialog(QtWidgets.QDialog):
         form2.addRow('Workers:',self.sp_workers)
         form2.addRow('Retries:',self.sp_retries)
         form2.addRow('Timeout (s):',self.sp_timeout)
+        self.cb_black_detect=QtWidgets.QComboBox()
+        self.cb_black_detect.addItem('Keyframes (fast)','keyframes')
+        self.cb_black_detect.addItem('Full decode','full')
+        self.sp_sample_frames=QtWidgets.QSpinBox(); self.sp_sample_frames.setRange(1,50)
+        form2.addRow('Picture analysis:',self.cb_black_detect)
+        form2.addRow('Sample frames:',self.sp_sample_frames)
+        self.sp_frozen_diff=QtWidgets.QDoubleSpinBox(); self.sp_frozen_diff.setRange(0.0,20.0); self.sp_frozen_diff.setSingleStep(0.5)
+        self.sp_frozen_diff.setSpecialValueText('Off')
+        form2.addRow('Frozen below (motion):',self.sp_frozen_diff)
+        self.sp_throughput=QtWidgets.QSpinBox(); self.sp_throughput.setRange(0,60)
+        self.sp_throughput.setSpecialValueText('Off')
+        self.sp_slow_ratio=QtWidgets.QDoubleSpinBox(); self.sp_slow_ratio.setRange(0.1,2.0); self.sp_slow_ratio.setSingleStep(0.05)
+        form2.addRow('Throughput test (s):',self.sp_throughput)
+        form2.addRow('Slow below (× bitrate):',self.sp_slow_ratio)
         self.cb_split=QtWidgets.QCheckBox('Split output')
         self.cb_update_quality=QtWidgets.QCheckBox('Update quality')
         self.cb_update_fps=QtWidgets.QCheckBox('Update FPS')
         self.cb_include_untested=QtWidgets.QCheckBox('Include untested')
+        self.cb_split_slow=QtWidgets.QCheckBox('Split slow channels')
         form2.addRow(self.cb_split)
+        form2.addRow(self.cb_split_slow)
+        self.cb_best_source=QtWidgets.QCheckBox('Export best source per channel')
+        form2.addRow(self.cb_best_source)
         form2.addRow(self.cb_update_quality)
         form2.addRow(self.cb_update_fps)
         form2.addRow(self.cb_include_untested)
+        self.cb_dedupe_urls=QtWidgets.QCheckBox('Check each unique URL once')
+        self.le_volatile_params=QtWidgets.QLineEdit()
+        self.le_volatile_params.setToolTip('Query parameters ignored when comparing URLs (comma-separated, * wildcards).\n'
+                                           'Add short names such as ' + ', '.join(SHORT_VOLATILE_PARAMS) +
+                                           ' only if your provider uses them for tokens, not to identify streams.')
+        form2.addRow(self.cb_dedupe_urls)
+        form2.addRow('Ignore URL params:',self.le_volatile_params)
+        self.cb_record_history=QtWidgets.QCheckBox('Record check history')
+        self.cb_record_history.setToolTip('Append every result to .check_history.db for uptime reports (cli.py history)')
+        form2.addRow(self.cb_record_history)
         main_v.addWidget(gb2)
 
         # Playlist Sorter
@@ -198,7 +252,9 @@ class OptionsDialog(QtWidgets.QDialog):
 
     def _browse_m3u(self):
         p,_=QtWidgets.QFileDialog.getOpenFileName(self,'Select M3U','',filter='*.m3u')
-        if p: self.le_m3u.setText(p)
+        if p:
+            self.le_m3u.setText(p)
+            self._start_loader(p)
     def _browse_out(self):
         p=QtWidgets.QFileDialog.getExistingDirectory(self,'Select Dir',options=QtWidgets.QFileDialog.ShowDirsOnly)
         if p: self.le_out.setText(p)
@@ -207,13 +263,25 @@ class OptionsDialog(QtWidgets.QDialog):
         if not m3u:
             QtWidgets.QMessageBox.warning(self,'No M3U','Select an M3U file first.')
             return
-        dlg=GroupSelectionDialog(m3u,self)
-        dlg.selected_groups=self.selected_groups
-        for key,cb in dlg._checkboxes.items():
-            grp=key.split('|',1)[1]
-            cb.setChecked(grp in self.selected_groups)
+        if not os.path.isfile(m3u):
+            QtWidgets.QMessageBox.warning(self,'Invalid M3U',f'File not found: {m3u}')
+            return
+        loader=self._start_loader(m3u)
+        dlg=GroupSelectionDialog(loader,self.selected_groups,self)
         if dlg.exec_()==QtWidgets.QDialog.Accepted:
             self.selected_groups=dlg.selected_groups
+    def _start_loader(self, m3u: str) -> PlaylistLoader:
+        """
+        Start (or reuse) the background loader for `m3u`.
+        Picking a different file cancels the loader of the previous one.
+        """
+        if self._loader is not None:
+            if self._loader.m3u_file == m3u:
+                return self._loader
+            self._loader.stop()
+        self._loader=PlaylistLoader(m3u,self)
+        self._loader.start()
+        return self._loader
     def _load_all_settings(self):
         cfg={}
         if os.path.exists(self.CONFIG_FILE):
@@ -226,10 +294,20 @@ class OptionsDialog(QtWidgets.QDialog):
         self.sp_workers.setValue(cfg.get('workers',5))
         self.sp_retries.setValue(cfg.get('retries',2))
         self.sp_timeout.setValue(cfg.get('timeout',10))
+        self.cb_black_detect.setCurrentIndex(max(0,self.cb_black_detect.findData(cfg.get('black_detect','keyframes'))))
+        self.sp_sample_frames.setValue(cfg.get('sample_frames',5))
+        self.sp_frozen_diff.setValue(cfg.get('frozen_diff',1.0))
+        self.sp_throughput.setValue(cfg.get('throughput_seconds',0))
+        self.sp_slow_ratio.setValue(cfg.get('slow_ratio',0.9))
+        self.cb_split_slow.setChecked(cfg.get('split_slow',False))
+        self.cb_best_source.setChecked(cfg.get('best_source',False))
         self.cb_split.setChecked(cfg.get('split',False))
         self.cb_update_quality.setChecked(cfg.get('update_quality',False))
         self.cb_update_fps.setChecked(cfg.get('update_fps',False))
         self.cb_include_untested.setChecked(cfg.get('include_untested',False))
+        self.cb_dedupe_urls.setChecked(cfg.get('dedupe_urls',True))
+        self.le_volatile_params.setText(', '.join(cfg.get('volatile_params',VOLATILE_PARAMS)))
+        self.cb_record_history.setChecked(cfg.get('record_history',True))
         self.le_tmdbApiKey.setText(cfg.get('tmdb_api_key',''))
         self.sp_playlist_workers.setValue(cfg.get('playlist_workers',4))
         self.cb_add_year.setChecked(cfg.get('add_year_to_name',False))
@@ -244,10 +322,20 @@ class OptionsDialog(QtWidgets.QDialog):
             'workers':self.sp_workers.value(),
             'retries':self.sp_retries.value(),
             'timeout':self.sp_timeout.value(),
+            'black_detect':self.cb_black_detect.currentData(),
+            'sample_frames':self.sp_sample_frames.value(),
+            'frozen_diff':self.sp_frozen_diff.value(),
+            'throughput_seconds':self.sp_throughput.value(),
+            'slow_ratio':self.sp_slow_ratio.value(),
+            'split_slow':self.cb_split_slow.isChecked(),
+            'best_source':self.cb_best_source.isChecked(),
             'split':self.cb_split.isChecked(),
             'update_quality':self.cb_update_quality.isChecked(),
             'update_fps':self.cb_update_fps.isChecked(),
             'include_untested':self.cb_include_untested.isChecked(),
+            'dedupe_urls':self.cb_dedupe_urls.isChecked(),
+            'volatile_params':self._volatile_params(),
+            'record_history':self.cb_record_history.isChecked(),
             'tmdb_api_key':self.le_tmdbApiKey.text().strip(),
             'playlist_workers':self.sp_playlist_workers.value(),
             'add_year_to_name':self.cb_add_year.isChecked(),
@@ -258,16 +346,28 @@ class OptionsDialog(QtWidgets.QDialog):
         with open(self.CONFIG_FILE,'w',encoding='utf-8') as f:
             json.dump(cfg,f,indent=2)
         QtWidgets.QMessageBox.information(self,'Saved','All settings saved.')
+    def _volatile_params(self):
+        return [p.strip() for p in self.le_volatile_params.text().split(',') if p.strip()]
     def get_options(self):
         return {
             'm3u_file':self.le_m3u.text().strip(),
             'workers':self.sp_workers.value(),
             'retries':self.sp_retries.value(),
             'timeout':self.sp_timeout.value(),
+            'black_detect':self.cb_black_detect.currentData(),
+            'sample_frames':self.sp_sample_frames.value(),
+            'frozen_diff':self.sp_frozen_diff.value(),
+            'throughput_seconds':self.sp_throughput.value(),
+            'slow_ratio':self.sp_slow_ratio.value(),
+            'split_slow':self.cb_split_slow.isChecked(),
+            'best_source':self.cb_best_source.isChecked(),
             'split':self.cb_split.isChecked(),
             'update_quality':self.cb_update_quality.isChecked(),
             'update_fps':self.cb_update_fps.isChecked(),
             'include_untested':self.cb_include_untested.isChecked(),
+            'dedupe_urls':self.cb_dedupe_urls.isChecked(),
+            'volatile_params':self._volatile_params(),
+            'record_history':self.cb_record_history.isChecked(),
             'output_dir':self.le_out.text().strip(),
             'selected_groups':self.selected_groups,
             'tmdb_api_key':self.le_tmdbApiKey.text().strip(),
@@ -0,0 +1,359 @@
+# services/api_server.py
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+from checker import check_stream
+from config import ApiConfig
+from services.frame_analysis import analysis_pool
+from services.history_store import HistoryStore, history_key
+from services.inflight import InflightProbes
+from services.monitor_store import MonitorStore
+from services.output_writer import CUID_RE
+from services.parser import iter_entries
+from services.utils import normalize_url
+
+LIVE_STATUSES = ('UP', 'SLOW')
+EVENT_QUEUE_SIZE = 1000  # per subscriber; slow readers lose events instead of stalling checks
+KEEPALIVE = 15.0         # seconds between keep-alive lines on idle event streams
+
+
+class ResultIndex:
+    """
+    Playlist entries plus the latest check result of every unique stream
+    (keyed by normalize_url, so duplicates share one result). Only touched
+    from the event loop.
+    """
+
+    def __init__(self):
+        self.channels: List[dict] = []          # playlist order
+        self.by_id: Dict[str, dict] = {}
+        self.by_key: Dict[str, List[dict]] = {}
+        self.results: Dict[str, dict] = {}      # url key → latest result
+
+    def load(self, m3u_file: str, selected_groups: List[str]):
+        selected = set(selected_groups)
+        for i, (e, _) in enumerate(iter_entries(m3u_file)):
+            if selected and e.group not in selected:
+                continue
+            m = CUID_RE.search(e.raw_inf)
+            ch = {
+                'id': m.group(1) if m else str(i),
+                'name': e.original_name,
+                'group': e.group,
+                'url': e.url,
+                'key': normalize_url(e.url),
+                'raw_inf': e.raw_inf,
+            }
+            self.channels.append(ch)
+            self.by_id[ch['id']] = ch
+            self.by_key.setdefault(ch['key'], []).append(ch)
+
+    def update(self, key: str, result: dict):
+        self.results[key] = result
+
+    def view(self, ch: dict) -> dict:
+        """JSON shape of one channel: its entry fields and latest result."""
+        r = self.results.get(ch['key'])
+        return {
+            'id': ch['id'], 'name': ch['name'], 'group': ch['group'], 'url': ch['url'],
+            'status': r['status'] if r else None,
+            'checked_at': r['checked_at'] if r else None,
+            'result': r,
+        }
+
+    def select(self, group: Optional[str] = None, statuses: Optional[Set[str]] = None) -> List[dict]:
+        out = []
+        for ch in self.channels:
+            if group is not None and ch['group'] != group:
+                continue
+            if statuses is not None:
+                r = self.results.get(ch['key'])
+                if (r['status'] if r else 'UNCHECKED') not in statuses:
+                    continue
+            out.append(ch)
+        return out
+
+    def groups(self) -> Dict[str, Dict[str, int]]:
+        out: Dict[str, Dict[str, int]] = {}
+        for ch in self.channels:
+            r = self.results.get(ch['key'])
+            counts = out.setdefault(ch['group'], {})
+            st = r['status'] if r else 'UNCHECKED'
+            counts[st] = counts.get(st, 0) + 1
+        return out
+
+
+class ApiServer:
+    """
+    Local HTTP API over the checker:
+
+      GET  /channels[?group=&status=UP,SLOW]   latest result per channel (JSON)
+      GET  /channels/{id}                      one channel
+      GET  /groups                             status counts per group
+      GET  /groups/{group}                     channels of one group
+      GET  /playlist.m3u[?group=&status=]      filtered M3U (default: working)
+      GET  /events[?format=sse|ndjson]         live result events
+      POST /check {"id": ...} or {"url": ...}  check now, unless a result is
+                                               younger than fresh_ttl (or ?max_age=)
+
+    Reads never probe. POST /check only takes URLs of indexed channels,
+    unless cfg.allow_urls lets it probe any http(s) URL; results of those are
+    returned but neither indexed nor recorded. Concurrent checks of one
+    stream share a single probe, also with the monitor: with cfg.monitor set,
+    a ChannelMonitor runs in the background, shares the in-flight probes and
+    its results flow into the same index and event stream.
+    """
+
+    def __init__(self, cfg: ApiConfig, logger):
+        self.cfg = cfg
+        self.logger = logger
+        self.index = ResultIndex()
+        self._probes = InflightProbes()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._executor = ThreadPoolExecutor(max_workers=cfg.max_workers)
+        # history writes: one thread, in order, never on the event loop
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._monitor = None
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._history: Optional[HistoryStore] = None
+
+    # --- results & events -------------------------------------------------
+
+    def _publish(self, key: str, result: dict):
+        self.index.update(key, result)
+        event = {
+            'key': key,
+            'ids': [ch['id'] for ch in self.index.by_key.get(key, [])],
+            **result,
+        }
+        for q in list(self._subscribers):
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    def _seed_from_state(self):
+        if not self.cfg.state_db.exists():
+            return
+        store = MonitorStore(self.cfg.state_db)
+        try:
+            for key, st in store.load().items():
+                if st.status is not None and key in self.index.by_key:
+                    self.index.update(key, {'status': st.status, 'checked_at': st.last_checked,
+                                            'source': 'monitor'})
+        finally:
+            store.close()
+
+    def _call_soon(self, callback, *args):
+        # from probe and monitor threads, possibly while the server shuts down
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass
+
+    def _on_monitor_result(self, st):
+        # called on the monitor thread
+        self._call_soon(self._publish, st.key,
+                        {'status': st.status, 'checked_at': st.last_checked, 'source': 'monitor'})
+
+    def _probe(self, key: str, url: str, fut: Future):
+        # on an executor thread; the probe may be awaited by the monitor as well
+        stats: Dict[str, object] = {}
+        try:
+            status, res, br, fps = check_stream(url, url, self.cfg.timeout,
+                                                analysis=self.cfg.analysis, stats=stats)
+        except Exception as e:
+            self._probes.finish(key, fut, error=e)
+            return
+        self._probes.finish(key, fut, {'status': status, 'checked_at': time.time(),
+                                       'source': 'on-demand', 'resolution': res, 'bitrate': br,
+                                       'fps': fps, **stats})
+
+    def _record(self, key: str, r: dict):
+        # on the writer thread; by_key does not change once the index is loaded
+        ch = self.index.by_key[key][0]
+        self._history.record(history_key(ch['url']), r['status'], ch['group'], ch['name'],
+                             r.get('ttff'), r.get('resolution', ''), r.get('fps', ''),
+                             ts=r['checked_at'])
+
+    async def check(self, key: str, url: str, max_age: float) -> dict:
+        """Latest result if fresh enough, else one shared probe per stream."""
+        r = self.index.results.get(key)
+        if r and r.get('checked_at') and time.time() - r['checked_at'] <= max_age:
+            return r
+        fut, own = self._probes.claim(key)
+        if own:
+            fut.add_done_callback(lambda f: self._call_soon(self._probe_done, key, f))
+            self._executor.submit(self._probe, key, url, fut)
+        # shielded: a client hanging up must not cancel the probe others wait on
+        return await asyncio.shield(asyncio.wrap_future(fut))
+
+    def _probe_done(self, key: str, fut: Future):
+        if fut.exception() is not None or key not in self.index.by_key:
+            return  # results of URLs outside the playlist are not kept
+        self._publish(key, fut.result())
+        if self._history is not None:
+            self._loop.run_in_executor(self._writer, self._record, key, fut.result())
+
+    # --- handlers ---------------------------------------------------------
+
+    @staticmethod
+    def _statuses(request) -> Optional[Set[str]]:
+        raw = request.query.get('status')
+        return {s.strip().upper() for s in raw.split(',') if s.strip()} if raw else None
+
+    async def _channels(self, request):
+        chans = self.index.select(request.query.get('group'), self._statuses(request))
+        return web.json_response([self.index.view(ch) for ch in chans])
+
+    async def _channel(self, request):
+        ch = self.index.by_id.get(request.match_info['id'])
+        if ch is None:
+            raise web.HTTPNotFound(text='unknown channel')
+        return web.json_response(self.index.view(ch))
+
+    async def _groups(self, request):
+        return web.json_response(self.index.groups())
+
+    async def _group(self, request):
+        group = request.match_info['group']
+        if group not in self.index.groups():
+            raise web.HTTPNotFound(text='unknown group')
+        chans = self.index.select(group, self._statuses(request))
+        return web.json_response([self.index.view(ch) for ch in chans])
+
+    async def _playlist(self, request):
+        statuses = self._statuses(request) or set(LIVE_STATUSES)
+        lines = ["#EXTM3U"]
+        for ch in self.index.select(request.query.get('group'), statuses):
+            lines += [ch['raw_inf'], ch['url']]
+        return web.Response(text="\n".join(lines) + "\n", content_type='audio/x-mpegurl')
+
+    async def _events(self, request):
+        sse = (request.query.get('format') == 'sse'
+               or 'text/event-stream' in request.headers.get('Accept', ''))
+        resp = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream' if sse else 'application/x-ndjson',
+            'Cache-Control': 'no-cache',
+        })
+        await resp.prepare(request)
+        q: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._subscribers.add(q)
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    event = await asyncio.wait_for(q.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await resp.write(b": keep-alive\n\n" if sse else b"\n")
+                    continue
+                data = json.dumps(event, ensure_ascii=False)
+                await resp.write((f"event: result\ndata: {data}\n\n" if sse else data + "\n").encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            self._subscribers.discard(q)
+        return resp
+
+    async def _check(self, request):
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text='expected a JSON body')
+        try:
+            max_age = float(request.query.get('max_age', self.cfg.fresh_ttl))
+        except ValueError:
+            raise web.HTTPBadRequest(text='max_age must be a number')
+        if 'id' in body:
+            ch = self.index.by_id.get(str(body['id']))
+            if ch is None:
+                raise web.HTTPNotFound(text='unknown channel')
+            key, url = ch['key'], ch['url']
+        elif body.get('url'):
+            url = str(body['url'])
+            key = normalize_url(url)
+            if key not in self.index.by_key:
+                if not self.cfg.allow_urls:
+                    raise web.HTTPForbidden(text='not a channel of the playlist')
+                parts = urlsplit(url)
+                if parts.scheme not in ('http', 'https') or not parts.hostname:
+                    raise web.HTTPBadRequest(text='only http(s) URLs can be checked')
+        else:
+            raise web.HTTPBadRequest(text='give "id" or "url"')
+        result = await self.check(key, url, max_age)
+        return web.json_response({'key': key, **result})
+
+    async def _health(self, request):
+        return web.json_response({'channels': len(self.index.channels),
+                                  'streams': len(self.index.by_key),
+                                  'checked': len(self.index.results),
+                                  'inflight': len(self._probes)})
+
+    # --- lifecycle --------------------------------------------------------
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get('/health', self._health),
+            web.get('/channels', self._channels),
+            web.get('/channels/{id}', self._channel),
+            web.get('/groups', self._groups),
+            web.get('/groups/{group}', self._group),
+            web.get('/playlist.m3u', self._playlist),
+            web.get('/events', self._events),
+            web.post('/check', self._check),
+        ])
+        return app
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self.index.load(str(self.cfg.m3u_file), self.cfg.selected_groups)
+        self._seed_from_state()
+        if self.cfg.history_db is not None:
+            self._history = HistoryStore(self.cfg.history_db)
+        self.logger('info', f"Indexed {len(self.index.channels)} channels, "
+                            f"{len(self.index.results)} with known results")
+
+        if self.cfg.monitor is not None:
+            from services.monitor import ChannelMonitor
+            self._monitor = ChannelMonitor(self.cfg.monitor, self.logger,
+                                           on_result=self._on_monitor_result, probes=self._probes)
+            self._monitor_thread = threading.Thread(target=self._monitor.start, daemon=True)
+            self._monitor_thread.start()
+
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, self.cfg.host, self.cfg.port)
+        await site.start()
+        self.logger('info', f"API listening on http://{self.cfg.host}:{self.cfg.port}")
+        try:
+            await self._stop_event.wait()
+        finally:
+            await runner.cleanup()
+            if self._monitor is not None:
+                # let it save its state before the interpreter shuts down
+                self._monitor.stop()
+                await self._loop.run_in_executor(None, self._monitor_thread.join, 10)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            # queued history writes finish before the store is closed
+            await self._loop.run_in_executor(None, self._writer.shutdown)
+            if self._history is not None:
+                self._history.close()
+
+    def start(self):
+        if self.cfg.analysis == 'keyframes':
+            analysis_pool()  # before the event loop, check and monitor threads exist
+        asyncio.run(self._serve())
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
@@ -0,0 +1,123 @@
+# services/cache_warmer.py
+import asyncio
+import time
+from collections import Counter
+from typing import Dict
+
+
+from config import WarmupConfig
+from services.parser import iter_entries, clean_entries, Entry
+from services.rate_limit import Pacer
+from services.tmdb_index import TMDBTitleIndex
+from tmdb_client import TMDBClient, TMDBError
+
+class CacheWarmer:
+    """
+    Pre-populates the TMDB metadata cache for one or more playlists without
+    writing any output, at a low fixed request rate, so a later sort is
+    (almost) all cache hits. Reports per-group cache coverage when done.
+    """
+    PROGRESS_INTERVAL = 10.0
+
+    def __init__(self, cfg: WarmupConfig, logger):
+        self.cfg = cfg
+        self.logger = logger
+        self._stop_event = asyncio.Event()
+        self._loop = None
+
+    def _scan(self):
+        """Unique (title, year) → entry, plus per-group counts of each key."""
+        selected = set(self.cfg.selected_groups)
+        unique: Dict[tuple, Entry] = {}
+        groups: Dict[str, Counter] = {}
+        for path in self.cfg.m3u_files:
+            n = 0
+            for e, _ in iter_entries(str(path)):
+                if selected and e.group not in selected:
+                    continue
+                clean_entries([e])
+                key = (e.base, e.year)
+                unique.setdefault(key, e)
+                groups.setdefault(e.group, Counter())[key] += 1
+                n += 1
+            self.logger('info', f"Scanned {n} entries from {path}")
+        return unique, groups
+
+    async def _warm_async(self):
+        self._loop = asyncio.get_running_loop()
+        unique, groups = self._scan()
+        self.logger('info', f"{len(unique)} unique titles across {len(groups)} groups")
+
+        import aiohttp
+        async with aiohttp.ClientSession() as session:
+            client = TMDBClient(self.cfg.tmdb_api_key, {},
+                                ttl=self.cfg.cache_ttl_days * 86400 if self.cfg.cache_ttl_days else None,
+                                max_concurrency=self.cfg.max_workers,
+                                negative_ttl=self.cfg.negative_ttl_hours * 3600,
+                                index=TMDBTitleIndex.open_existing(self.cfg.title_index),
+                                full_details=self.cfg.full_details)
+            client.session = session
+            pacer = Pacer(self.cfg.rate)
+            stats = {'fetched': 0, 'failed': 0}
+            pending = [e for e in unique.values() if not client.is_cached(e.base, e.year)]
+            self.logger('info', f"{len(unique) - len(pending)} already cached, {len(pending)} to fetch "
+                                f"at ≤{self.cfg.rate:g}/s")
+            n_workers = max(1, self.cfg.max_workers)
+            queue: asyncio.Queue = asyncio.Queue()
+            for e in pending:
+                queue.put_nowait(e)
+
+            async def worker():
+                while not self._stop_event.is_set():
+                    try:
+                        e = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    await pacer.wait()
+                    try:
+                        await client.search_and_fetch(e.base, e.year, e.media or None)
+                        stats['fetched'] += 1
+                    except TMDBError as err:
+                        stats['failed'] += 1
+                        self.logger('error', f"Lookup failed for '{e.base}': {err}")
+
+            async def reporter():
+                while True:
+                    await asyncio.sleep(self.PROGRESS_INTERVAL)
+                    self.logger('info', f"Warm-up {stats['fetched']}/{len(pending)} fetched, "
+                                        f"{stats['failed']} failed")
+
+            started = time.monotonic()
+            progress = asyncio.create_task(reporter())
+            try:
+                await asyncio.gather(*(worker() for _ in range(n_workers)))
+            finally:
+                progress.cancel()
+                client.save_cache()
+            self.logger('info', f"Looked up {stats['fetched']} titles in {time.monotonic() - started:.0f}s, "
+                                f"{stats['failed']} failed")
+            self._report_coverage(client, groups)
+        client.close()
+
+    def _report_coverage(self, client: TMDBClient, groups: Dict[str, Counter]):
+        total = covered = 0
+        for grp in sorted(groups):
+            counts = groups[grp]
+            n = sum(counts.values())
+            hit = sum(c for (base, year), c in counts.items() if client.cached(base, year))
+            total += n
+            covered += hit
+            self.logger('found' if hit == n else 'info',
+                        f"{grp or '(no group)'}: {hit}/{n} entries cached ({hit * 100 // n}%)")
+        if total:
+            self.logger('info', f"Overall coverage: {covered}/{total} entries ({covered * 100 // total}%)")
+
+    def start(self):
+        asyncio.run(self._warm_async())
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        else:
+            self._stop_event.set()
+        self.logger('info', 'Stopped')
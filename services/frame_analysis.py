@@ -0,0 +1,201 @@
+# services/frame_analysis.py
+import atexit
+import io
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+FRAME_SIZE = (64, 36)     # frames are scaled to this many grayscale pixels
+BLACK_MEAN = 32.0         # mean luma at or below this is a black frame (16-235 range)
+BLANK_VARIANCE = 4.0      # luma variance at or below this is a flat, blank frame
+BLACK_RATIO = 0.8         # BLACK_SCREEN when this share of frames is black or blank
+FROZEN_DIFF = 1.0         # FROZEN when no two consecutive frames differ by more (mean abs luma)
+FROZEN_MIN_SPAN = 2.0     # ...and the sampled frames cover at least this many seconds of stream
+SAMPLE_SECONDS = 3.0      # seconds of stream read for the keyframe sample at most
+
+_PTS_RE = re.compile(r'\bpts_time:\s*(-?[\d.]+)')
+
+_pool: Optional["ProcessPoolExecutor"] = None
+_pool_lock = threading.Lock()
+_np = False  # numpy module once looked up, None if not installed
+
+
+def _numpy():
+    """NumPy, imported on first use: pool workers need it, checking threads do not."""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:  # the pure-Python path computes the same statistics
+            numpy = None
+        _np = numpy
+    return _np
+
+
+def _read_pts(stream, out: list):
+    """Collect showinfo's frame timestamps from ffmpeg's stderr until EOF."""
+    try:
+        for line in stream:
+            m = _PTS_RE.search(line)
+            if m:
+                out.append(float(m.group(1)))
+    except (OSError, ValueError):
+        pass
+
+
+def grab_frames(url: str, frames: int, timeout: float,
+                seconds: float = SAMPLE_SECONDS) -> Tuple[bytes, Optional[float], Optional[float]]:
+    """
+    Decode up to `frames` keyframes from the first `seconds` of `url` (capped
+    at `timeout`) on one decoder thread, scaled to FRAME_SIZE grayscale.
+    Bounding the read by stream time keeps a check from waiting out `timeout`
+    for keyframes of a long GOP; fewer frames arrive instead. Returns the
+    concatenated rawvideo, the seconds from starting ffmpeg until the first
+    frame was complete (time to first frame; None if none arrived) and the
+    stream time between the first and last frame returned (from showinfo
+    timestamps; None if unknown). Whatever arrived before `timeout` is
+    returned; (b'', None, None) if ffmpeg could not be run.
+    """
+    w, h = FRAME_SIZE
+    cmd = [
+        'ffmpeg', '-hide_banner', '-nostats', '-v', 'info',
+        '-threads', '1', '-skip_frame', 'nokey',
+        '-t', f'{min(seconds, timeout):.3f}', '-i', url,
+        '-an', '-sn', '-dn',
+        '-vf', f'scale={w}:{h}:flags=neighbor,format=gray,showinfo',
+        '-vsync', 'passthrough', '-frames:v', str(frames),
+        '-f', 'rawvideo', '-'
+    ]
+    start = time.monotonic()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except Exception:
+        return b'', None, None
+    pts: list = []
+    reader = threading.Thread(
+        target=_read_pts, daemon=True,
+        args=(io.TextIOWrapper(proc.stderr, encoding='utf-8', errors='replace'), pts))
+    reader.start()
+    killer = threading.Timer(timeout, proc.kill)
+    killer.start()
+    chunks, size, first = [], 0, None
+    try:
+        while True:
+            chunk = proc.stdout.read1(w * h)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if first is None and size >= w * h:
+                first = time.monotonic() - start
+    finally:
+        killer.cancel()
+        proc.stdout.close()
+        proc.wait()
+        reader.join(1.0)
+        proc.stderr.close()
+    n = min(size // (w * h), len(pts))
+    span = pts[n - 1] - pts[0] if n else None
+    return b''.join(chunks), first, span
+
+
+def classify_frames(data: bytes, span: Optional[float] = None,
+                    frozen_diff: float = FROZEN_DIFF) -> Dict[str, object]:
+    """
+    Classify a run of FRAME_SIZE grayscale frames from per-frame mean luma,
+    luma variance and mean absolute difference to the previous frame.
+    `span` is the stream time the frames cover: a static but live picture
+    (a slide, a test card) looks frozen over a few keyframes, so FROZEN
+    needs at least FROZEN_MIN_SPAN seconds of it. frozen_diff 0 never
+    reports FROZEN.
+
+    Returns {'status': 'BLACK_SCREEN' | 'FROZEN' | 'LIVE' | None, 'frames': n,
+    'black_ratio': share of black/blank frames, 'motion': largest inter-frame
+    difference, 'span': span}. status is None when no complete frame was given.
+    """
+    w, h = FRAME_SIZE
+    px = w * h
+    n = len(data) // px
+    if not n:
+        return {'status': None, 'frames': 0, 'black_ratio': None, 'motion': None, 'span': span}
+
+    np = _numpy()
+    if np is not None:
+        f = np.frombuffer(data, dtype=np.uint8, count=n * px).reshape(n, px).astype(np.float32)
+        means = f.mean(axis=1)
+        variances = f.var(axis=1)
+        blank = (means <= BLACK_MEAN) | (variances <= BLANK_VARIANCE)
+        black_ratio = float(blank.mean())
+        motion = float(np.abs(np.diff(f, axis=0)).mean(axis=1).max()) if n > 1 else None
+    else:
+        frames = [data[i * px:(i + 1) * px] for i in range(n)]
+        blank_count = 0
+        for fr in frames:
+            mean = sum(fr) / px
+            var = sum((v - mean) ** 2 for v in fr) / px
+            if mean <= BLACK_MEAN or var <= BLANK_VARIANCE:
+                blank_count += 1
+        black_ratio = blank_count / n
+        motion = max(
+            (sum(abs(a - b) for a, b in zip(prev, cur)) / px
+             for prev, cur in zip(frames, frames[1:])),
+            default=None
+        )
+
+    if black_ratio >= BLACK_RATIO:
+        status = 'BLACK_SCREEN'
+    elif (motion is not None and motion <= frozen_diff and frozen_diff > 0
+          and span is not None and span >= FROZEN_MIN_SPAN):
+        status = 'FROZEN'
+    else:
+        status = 'LIVE'
+    return {'status': status, 'frames': n, 'black_ratio': black_ratio, 'motion': motion,
+            'span': span}
+
+
+def _ignore_sigint():
+    # Ctrl+C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def analysis_pool() -> "ProcessPoolExecutor":
+    """
+    Shared process pool for classify_frames. Callers create it up front,
+    before starting their check threads; later calls return the same pool.
+    Workers come from a fork server (spawn where there is none), never from
+    forking the multithreaded checker process itself.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1),
+                                        mp_context=multiprocessing.get_context(method),
+                                        initializer=_ignore_sigint)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def analyze_stream(url: str, frames: int, timeout: float,
+                   frozen_diff: float = FROZEN_DIFF) -> Dict[str, object]:
+    """
+    Grab frames in the calling thread (I/O bound) and classify them in the
+    process pool, so NumPy work never holds the GIL of the checking threads.
+    The result of classify_frames gains 'ttff', the time to first frame.
+    """
+    data, ttff, span = grab_frames(url, frames, timeout)
+    if len(data) < FRAME_SIZE[0] * FRAME_SIZE[1]:
+        result = classify_frames(b'', span)
+    else:
+        result = analysis_pool().submit(classify_frames, data, span, frozen_diff).result()
+    result['ttff'] = ttff
+    return result
@@ -0,0 +1,251 @@
+# services/history_store.py
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from services.utils import normalize_url
+
+HISTORY_DB = Path(".check_history.db")
+
+# status ↔ small int, as stored; append only, existing codes must not change
+STATUS_CODES = {'UP': 0, 'SLOW': 1, 'BLACK_SCREEN': 2, 'FROZEN': 3, 'DOWN': 4}
+STATUS_NAMES = {v: k for k, v in STATUS_CODES.items()}
+LIVE_CODES = (STATUS_CODES['UP'], STATUS_CODES['SLOW'])
+FLAP_DECAY = 0.7  # same scoring as the monitor: ×0.7 per check, +1 per status change
+FLAP_THRESHOLD = 1.5
+DAY = 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    id          INTEGER PRIMARY KEY,
+    key         TEXT NOT NULL UNIQUE,     -- history_key() of the stream URL
+    grp         TEXT NOT NULL DEFAULT '',
+    name        TEXT NOT NULL DEFAULT '',
+    checks      INTEGER NOT NULL DEFAULT 0,
+    up          INTEGER NOT NULL DEFAULT 0,
+    ttff_sum    INTEGER NOT NULL DEFAULT 0,   -- ms
+    ttff_n      INTEGER NOT NULL DEFAULT 0,
+    changes     INTEGER NOT NULL DEFAULT 0,
+    flap        REAL    NOT NULL DEFAULT 0,
+    status      INTEGER,
+    first_ts    INTEGER,
+    last_ts     INTEGER,
+    last_change INTEGER
+);
+CREATE INDEX IF NOT EXISTS channels_grp ON channels (grp);
+CREATE TABLE IF NOT EXISTS checks (
+    channel INTEGER NOT NULL,
+    ts      INTEGER NOT NULL,             -- unix seconds
+    status  INTEGER NOT NULL,             -- STATUS_CODES
+    ttff    INTEGER,                      -- time to first frame, ms
+    height  INTEGER NOT NULL DEFAULT 0,   -- vertical resolution, 0 = unknown
+    fps     INTEGER NOT NULL DEFAULT 0    -- frames per second × 100, 0 = unknown
+);
+CREATE INDEX IF NOT EXISTS checks_channel_ts ON checks (channel, ts);
+CREATE TABLE IF NOT EXISTS daily (
+    channel  INTEGER NOT NULL,
+    day      INTEGER NOT NULL,            -- unix day number (UTC)
+    checks   INTEGER NOT NULL,
+    up       INTEGER NOT NULL,
+    ttff_sum INTEGER NOT NULL,
+    ttff_n   INTEGER NOT NULL,
+    PRIMARY KEY (channel, day)
+) WITHOUT ROWID;
+"""
+
+_CHANGED = "(status IS NOT NULL AND status != :status)"
+_ROLLUP_SQL = f"""
+UPDATE channels SET
+    checks = checks + 1,
+    up = up + :up,
+    ttff_sum = ttff_sum + coalesce(:ttff, 0),
+    ttff_n = ttff_n + (:ttff IS NOT NULL),
+    changes = changes + {_CHANGED},
+    flap = flap * {FLAP_DECAY} + {_CHANGED},
+    last_change = CASE WHEN {_CHANGED} THEN :ts ELSE last_change END,
+    status = :status,
+    first_ts = coalesce(first_ts, :ts),
+    last_ts = :ts,
+    grp = :grp,
+    name = :name
+WHERE key = :key
+"""
+_CHECK_SQL = """
+INSERT INTO checks (channel, ts, status, ttff, height, fps)
+SELECT id, :ts, :status, :ttff, :height, :fps FROM channels WHERE key = :key
+"""
+_DAILY_SQL = """
+INSERT INTO daily (channel, day, checks, up, ttff_sum, ttff_n)
+SELECT id, :ts / 86400, 1, :up, coalesce(:ttff, 0), :ttff IS NOT NULL FROM channels WHERE key = :key
+ON CONFLICT (channel, day) DO UPDATE SET
+    checks = checks + 1,
+    up = up + excluded.up,
+    ttff_sum = ttff_sum + excluded.ttff_sum,
+    ttff_n = ttff_n + excluded.ttff_n
+"""
+
+
+@dataclass
+class ChannelStats:
+    """Rollup of every recorded check of one stream."""
+    key: str
+    group: str
+    name: str
+    checks: int
+    uptime: float               # share of checks that were UP or SLOW
+    mean_ttff: Optional[float]  # seconds, over checks that measured it
+    flap: float                 # decaying count of recent status changes
+    changes: int
+    status: Optional[str]
+    first_checked: Optional[int]
+    last_checked: Optional[int]
+    last_change: Optional[int]
+
+
+def history_key(url: str) -> str:
+    """
+    Key of a stream in the history: normalize_url with the default
+    VOLATILE_PARAMS, whatever list the writer deduplicates its checks by, so
+    the GUI, the monitor and the API add up one stream's checks under one key.
+    """
+    return normalize_url(url)
+
+
+def _height(resolution: str) -> int:
+    m = re.search(r'×(\d+)', resolution or '')
+    return int(m.group(1)) if m else 0
+
+
+def _fps_code(fps: str) -> int:
+    m = re.search(r'\d+(?:\.\d+)?', fps or '')
+    return round(float(m.group(0)) * 100) if m else 0
+
+
+def _stats(row) -> ChannelStats:
+    key, grp, name, checks, up, ttff_sum, ttff_n, changes, flap, status, first, last, change = row
+    return ChannelStats(key, grp, name, checks, up / checks if checks else 0.0,
+                        ttff_sum / ttff_n / 1000 if ttff_n else None, flap, changes,
+                        STATUS_NAMES.get(status), first, last, change)
+
+
+_STATS_COLUMNS = ("key, grp, name, checks, up, ttff_sum, ttff_n, changes, flap, "
+                  "status, first_ts, last_ts, last_change")
+
+
+class HistoryStore:
+    """
+    Append-only SQLite log of check results with rollups (uptime, mean time
+    to first frame, flapping score) per channel and per UTC day, updated
+    in the same transaction as each batch of appended rows, so reports never
+    scan the raw log. Rollups are maintained in SQL, which keeps them correct
+    with several processes (GUI, monitor, API) writing to one file.
+    """
+    BATCH_SIZE = 500
+    FLUSH_INTERVAL = 5.0  # seconds
+
+    def __init__(self, path: Path = HISTORY_DB):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending: List[dict] = []
+        self._last_flush = time.monotonic()
+
+    def record(self, key: str, status: str, group: str = '', name: str = '',
+               ttff: Optional[float] = None, resolution: str = '', fps: str = '',
+               ts: Optional[float] = None):
+        """Queue one check result of stream `key`; committed with the next flush."""
+        code = STATUS_CODES.get(status, STATUS_CODES['DOWN'])
+        row = {
+            'key': key, 'grp': group, 'name': name, 'status': code,
+            'up': int(code in LIVE_CODES),
+            'ts': int(ts if ts is not None else time.time()),
+            'ttff': round(ttff * 1000) if ttff is not None else None,
+            'height': _height(resolution), 'fps': _fps_code(fps),
+        }
+        with self._lock:
+            self._pending.append(row)
+            if (len(self._pending) >= self.BATCH_SIZE
+                    or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        rows = self._pending
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO channels (key, grp, name) VALUES (:key, :grp, :name)",
+                                   rows)
+            self._conn.executemany(_ROLLUP_SQL, rows)  # in order: each sees the previous status
+            self._conn.executemany(_CHECK_SQL, rows)
+            self._conn.executemany(_DAILY_SQL, rows)
+        self._pending = []
+
+    # --- reports ----------------------------------------------------------
+
+    def channel(self, key: str) -> Optional[ChannelStats]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_STATS_COLUMNS} FROM channels WHERE key = ?",
+                                     (key,)).fetchone()
+        return _stats(row) if row else None
+
+    def channels(self, group: Optional[str] = None) -> List[ChannelStats]:
+        sql = f"SELECT {_STATS_COLUMNS} FROM channels WHERE checks > 0"
+        args: Tuple = ()
+        if group is not None:
+            sql, args = sql + " AND grp = ?", (group,)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [_stats(r) for r in rows]
+
+    def groups(self) -> Dict[str, dict]:
+        """Per group: channels, checks, uptime, mean_ttff (s), mean flap score, flapping channels."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT grp, COUNT(*), SUM(checks), SUM(up), SUM(ttff_sum), SUM(ttff_n),
+                       AVG(flap), SUM(flap >= ?)
+                FROM channels WHERE checks > 0 GROUP BY grp ORDER BY grp
+            """, (FLAP_THRESHOLD,)).fetchall()
+        return {
+            grp: {'channels': n, 'checks': checks, 'uptime': up / checks,
+                  'mean_ttff': ttff_sum / ttff_n / 1000 if ttff_n else None,
+                  'flap': flap, 'flapping': flapping}
+            for grp, n, checks, up, ttff_sum, ttff_n, flap, flapping in rows
+        }
+
+    def daily(self, key: str, days: int = 30) -> List[dict]:
+        """Uptime time series of one stream: one point per UTC day with checks."""
+        since = int(time.time()) // DAY - days + 1
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT d.day, d.checks, d.up, d.ttff_sum, d.ttff_n
+                FROM daily d JOIN channels c ON c.id = d.channel
+                WHERE c.key = ? AND d.day >= ? ORDER BY d.day
+            """, (key, since)).fetchall()
+        return [{'day': day * DAY, 'checks': checks, 'uptime': up / checks,
+                 'mean_ttff': ttff_sum / ttff_n / 1000 if ttff_n else None}
+                for day, checks, up, ttff_sum, ttff_n in rows]
+
+    def prune(self, older_than_days: float) -> int:
+        """Delete raw check rows older than this; rollups are kept. Returns rows deleted."""
+        cutoff = int(time.time() - older_than_days * DAY)
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                return self._conn.execute("DELETE FROM checks WHERE ts < ?", (cutoff,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
@@ -0,0 +1,46 @@
+# services/inflight.py
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+
+class InflightProbes:
+    """
+    Probes running right now, one per stream key (normalize_url), shared by
+    everything that probes streams in one process: the monitor thread and the
+    API's on-demand checks. Whoever claims a key runs the probe and finishes
+    its future; everyone else waits on that future instead of probing again.
+    Futures are concurrent.futures ones, so threads wait on them directly and
+    event loops through asyncio.wrap_future.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+
+    def get(self, key: str) -> Optional[Future]:
+        with self._lock:
+            return self._futures.get(key)
+
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        """(future, True) when the caller must run the probe, else (running probe, False)."""
+        with self._lock:
+            fut = self._futures.get(key)
+            if fut is not None:
+                return fut, False
+            fut = self._futures[key] = Future()
+            return fut, True
+
+    def finish(self, key: str, fut: Future, result=None, error: Optional[BaseException] = None):
+        """Complete a claimed probe; the key is free again before its waiters run."""
+        with self._lock:
+            if self._futures.get(key) is fut:
+                del self._futures[key]
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._futures)
@@ -0,0 +1,71 @@
+# services/matcher.py
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from services.utils import normalize_title
+
+# Only these search/multi result types can be sorted into genres
+MEDIA_TYPES = ('movie', 'tv')
+
+
+@lru_cache(maxsize=65536)
+def _profile(text: str) -> Tuple[frozenset, frozenset]:
+    """Character trigrams and word tokens of a normalized title."""
+    key = normalize_title(text)[0]
+    padded = f"  {key} "
+    grams = frozenset(padded[i:i+3] for i in range(len(padded) - 2))
+    return grams, frozenset(key.split())
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _candidate_year(c: dict) -> Optional[int]:
+    date = c.get('release_date') or c.get('first_air_date') or ''
+    return int(date[:4]) if date[:4].isdigit() else None
+
+
+class TitleMatcher:
+    """
+    Ranks TMDB search candidates against a cleaned playlist title.
+
+    The score mixes trigram and token similarity of the candidate's localized
+    and original title, then adjusts for the release year and the media type
+    implied by the playlist entry. Scores are in [0, 1]; anything below
+    MIN_CONFIDENCE is reported as a low-confidence match.
+    """
+    MIN_CONFIDENCE = 0.6
+
+    def score(self, title: str, candidate: dict,
+              year: Optional[int] = None, media: Optional[str] = None) -> float:
+        grams, tokens = _profile(title)
+        sim = 0.0
+        for field in ('title', 'name', 'original_title', 'original_name'):
+            other = candidate.get(field)
+            if not other:
+                continue
+            c_grams, c_tokens = _profile(other)
+            sim = max(sim, 0.7 * _jaccard(grams, c_grams) + 0.3 * _jaccard(tokens, c_tokens))
+
+        c_year = _candidate_year(candidate)
+        if year and c_year:
+            gap = abs(year - c_year)
+            sim += 0.15 if gap == 0 else 0.05 if gap == 1 else -0.15
+        if media:
+            sim += 0.1 if candidate.get('media_type') == media else -0.1
+        return max(0.0, min(1.0, sim))
+
+    def best(self, title: str, candidates: List[dict],
+             year: Optional[int] = None, media: Optional[str] = None) -> Tuple[Optional[dict], float]:
+        """Highest-scoring movie/tv candidate and its score (None, 0.0 if none)."""
+        best, best_score = None, 0.0
+        for c in candidates:
+            if c.get('media_type') not in MEDIA_TYPES:
+                continue
+            s = self.score(title, c, year, media)
+            if best is None or s > best_score:
+                best, best_score = c, s
+        return best, best_score
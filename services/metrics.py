@@ -0,0 +1,121 @@
+# services/metrics.py
+import bisect
+import json
+import threading
+from typing import Dict, List, Tuple
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'n')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.n += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing quantile `q`."""
+        if not self.n:
+            return 0.0
+        rank = q * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float('inf')
+        return float('inf')
+
+
+class CheckTimings:
+    """
+    Per-stage timing histograms for stream checks, keyed by host and by group.
+    Thread-safe; export with to_prometheus() or to_json().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hists: Dict[Tuple[str, str, str], _Histogram] = {}  # (dimension, value, stage)
+
+    def observe(self, timings: Dict[str, float], host: str = '', group: str = ''):
+        with self._lock:
+            for stage, seconds in timings.items():
+                for dim, val in (('host', host or '-'), ('group', group or '-'), ('all', '')):
+                    key = (dim, val, stage)
+                    h = self._hists.get(key)
+                    if h is None:
+                        h = self._hists[key] = _Histogram()
+                    h.observe(seconds)
+
+    def summary(self, stages=('connect', 'probe', 'analysis', 'total')) -> str:
+        """One-line p50/p95 overview for the status bar."""
+        parts = []
+        with self._lock:
+            for stage in stages:
+                h = self._hists.get(('all', '', stage))
+                if h and h.n:
+                    parts.append(f"{stage} p50≤{_fmt(h.quantile(0.5))} p95≤{_fmt(h.quantile(0.95))}")
+        return " · ".join(parts)
+
+    def to_json(self) -> str:
+        out: Dict[str, dict] = {}
+        with self._lock:
+            for (dim, val, stage), h in sorted(self._hists.items()):
+                node = out.setdefault(dim, {}).setdefault(val or 'all', {})
+                node[stage] = {
+                    'count': h.n,
+                    'sum': round(h.total, 6),
+                    'p50_le': h.quantile(0.5),
+                    'p95_le': h.quantile(0.95),
+                    'buckets': {str(b): c for b, c in zip(list(BUCKETS) + ['+Inf'], _cumulative(h.counts))},
+                }
+        return json.dumps(out, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            '# HELP iptv_check_stage_seconds Time spent per stream-check stage.',
+            '# TYPE iptv_check_stage_seconds histogram',
+        ]
+        with self._lock:
+            for (dim, val, stage), h in sorted(self._hists.items()):
+                labels = f'stage="{stage}"' + (f',{dim}="{_escape(val)}"' if dim != 'all' else '')
+                for bound, c in zip(list(BUCKETS) + ['+Inf'], _cumulative(h.counts)):
+                    lines.append(f'iptv_check_stage_seconds_bucket{{{labels},le="{bound}"}} {c}')
+                lines.append(f'iptv_check_stage_seconds_sum{{{labels}}} {h.total:.6f}')
+                lines.append(f'iptv_check_stage_seconds_count{{{labels}}} {h.n}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, base_path: str) -> List[str]:
+        """Write <base>_timings.prom and <base>_timings.json; returns the paths."""
+        paths = []
+        for ext, text in (('prom', self.to_prometheus()), ('json', self.to_json())):
+            path = f"{base_path}_timings.{ext}"
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            paths.append(path)
+        return paths
+
+
+def _cumulative(counts: List[int]) -> List[int]:
+    out, run = [], 0
+    for c in counts:
+        run += c
+        out.append(run)
+    return out
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _fmt(seconds: float) -> str:
+    if seconds == float('inf'):
+        return '∞'
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:g}s"
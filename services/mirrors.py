@@ -0,0 +1,69 @@
+# services/mirrors.py
+import re
+from typing import Dict, Iterable, List, Optional
+
+from services.output_writer import ATTR_RE
+from services.utils import clean_name, fold_text
+
+LATENCY_BUCKET = 0.5   # mirrors this close in time-to-first-frame tie on resolution
+LIVE_STATUSES = ('UP', 'SLOW')
+
+# "UK | ", "FHD: ", "DE - " style provider prefixes
+_PREFIX_RE = re.compile(r'^\s*[A-Za-z0-9+]{1,6}\s*[|:\-]\s+')
+# quality / backup markers that differ between mirrors of one channel
+_MARKER_RE = re.compile(r'\b(?:sd|hd|fhd|uhd|4k|8k|hevc|h265|h264|\d{3,4}p|backup|bkp|alt)\b', re.IGNORECASE)
+
+
+def channel_key(name: str, raw_inf: str = '') -> str:
+    """
+    Cluster key for mirrors of one channel: its tvg-id when the entry has one,
+    else the display name without superscripts (clean_name), provider prefix
+    and quality/backup markers, folded.
+    E.g. 'UK | BBC One FHD' and 'BBC One ᴴᴰ' → 'name:bbc one'.
+    """
+    tvg_id = dict(ATTR_RE.findall(raw_inf)).get('tvg-id', '').strip()
+    if tvg_id:
+        return f"id:{tvg_id.casefold()}"
+    name = _MARKER_RE.sub(' ', _PREFIX_RE.sub('', clean_name(name)))
+    return f"name:{fold_text(name)}"
+
+
+def _pixels(resolution: str) -> int:
+    try:
+        w, h = map(int, (resolution or '').split('×'))
+    except ValueError:
+        return 0
+    return w * h
+
+
+def _rank(entry: dict, status: str):
+    ttff: Optional[float] = entry.get('ttff')
+    latency = ttff if ttff is not None else float('inf')
+    return (
+        status != 'UP',                    # healthy before SLOW
+        latency // LATENCY_BUCKET,         # then the faster start
+        -_pixels(entry.get('resolution', '')),
+        latency,
+    )
+
+
+def best_mirrors(entry_map: Dict[str, dict], status_map: Dict[str, str],
+                 uids: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    One uid per channel cluster: among its live mirrors the one with the
+    lowest time to first frame, then the highest resolution. Clusters with no
+    live mirror are left out. Returned in `uids` (default: entry_map) order.
+    """
+    order = list(uids) if uids is not None else list(entry_map)
+    best: Dict[str, tuple] = {}
+    for uid in order:
+        status = status_map.get(uid)
+        if status not in LIVE_STATUSES:
+            continue
+        e = entry_map[uid]
+        key = e.get('channel_key') or channel_key(e.get('name', ''), e.get('raw_inf', ''))
+        rank = _rank(e, status)
+        if key not in best or rank < best[key][0]:
+            best[key] = (rank, uid)
+    chosen = {uid for _, uid in best.values()}
+    return [uid for uid in order if uid in chosen]
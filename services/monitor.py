@@ -0,0 +1,340 @@
+# services/monitor.py
+import heapq
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from checker import check_stream
+from config import MonitorConfig
+from services.frame_analysis import analysis_pool
+from services.history_store import HistoryStore, history_key
+from services.inflight import InflightProbes
+from services.monitor_store import ChannelState, MonitorStore
+from services.parser import iter_entries
+from services.rate_limit import ProbeBudget
+from services.utils import normalize_url
+
+LIVE_STATUSES = ('UP', 'SLOW')
+BACKOFF = 2.0          # stable channels: interval grows by this factor per unchanged check
+FLAP_DECAY = 0.7       # flap score decay per check; +1 for every status change
+FLAP_THRESHOLD = 1.5   # at or above this a channel counts as flapping
+JITTER = 0.1           # ± share of the interval, so channels drift apart
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+class ChannelMonitor:
+    """
+    Long-running, headless checker. Every unique stream of the playlist has
+    its own schedule:
+      - stable channels back off exponentially up to max_interval,
+      - flapping or just-changed channels are checked every min_interval,
+      - channels that just went down are retried fast (dead_retry, doubling)
+        for dead_retries checks.
+    Probes are capped per minute overall and per host. Schedules and statuses
+    live in a MonitorStore, so a restart resumes where the last run stopped.
+    Every check is appended to the HistoryStore at cfg.history_db, and
+    channels new to the monitor start with the flapping score from there.
+    The working / non-working playlists are rewritten (atomically, coalesced)
+    only when a channel moves between them.
+
+    `on_result(state)` is called from the monitor thread after every check.
+    With `probes` shared with other checkers (the API), a stream they are
+    probing is not probed again: the monitor takes their result for its
+    schedule and leaves recording it to them.
+    """
+    IDLE_SLEEP = 1.0
+    PROGRESS_INTERVAL = 60.0
+    RELOAD_INTERVAL = 5.0  # seconds between checks of the playlist's mtime
+
+    def __init__(self, cfg: MonitorConfig, logger, on_result=None,
+                 probes: Optional[InflightProbes] = None):
+        self.cfg = cfg
+        self.logger = logger
+        self.on_result = on_result
+        self.probes = probes if probes is not None else InflightProbes()
+        self._stop = threading.Event()
+        self._results: "queue.Queue[Tuple[str, Future, bool]]" = queue.Queue()  # key, probe, own
+        self.channels: Dict[str, ChannelState] = {}
+        self.items: List[Tuple[str, str, str]] = []  # (key, extinf, url) in playlist order
+        self.labels: Dict[str, Tuple[str, str]] = {}  # key → (group, name) for the history
+        self.hosts: Dict[str, str] = {}               # key → host, for the per-host budget
+        # dispatch queue: heap of (time, key); an entry is current while
+        # _scheduled[key] holds its time, otherwise it is skipped when popped
+        self._due: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}
+        self.history: Optional[HistoryStore] = None
+        self.base = os.path.splitext(os.path.basename(str(cfg.m3u_file)))[0]
+        self._mtime = None
+        self._written: Dict[str, Set[str]] = {}
+        self._dirty = False
+        self._last_write = 0.0
+        self._checks = 0
+
+    # --- playlist ---------------------------------------------------------
+
+    def _reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.cfg.m3u_file).st_mtime
+        except OSError as e:
+            if self._mtime is None:
+                raise
+            self.logger('error', f"Cannot stat {self.cfg.m3u_file}: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        selected = set(self.cfg.selected_groups)
+        items = []
+        labels = {}
+        hosts = {}
+        for e, _ in iter_entries(str(self.cfg.m3u_file)):
+            if selected and e.group not in selected:
+                continue
+            key = normalize_url(e.url)
+            items.append((key, e.raw_inf, e.url))
+            labels.setdefault(key, (e.group, e.original_name))
+            if key not in hosts:
+                hosts[key] = urlsplit(e.url).hostname or ''
+        self.items = items
+        self.labels = labels
+        self.hosts = hosts
+
+        now = time.time()
+        keys = {k for k, _, _ in items}
+        new = [(key, url) for key, _, url in items if key not in self.channels]
+        # a channel known to flap from earlier runs is watched closely from the start
+        known = ({s.key: s for s in self.history.channels()}
+                 if new and self.history is not None else {})
+        for key, url in new:
+            if key not in self.channels:
+                prior = known.get(history_key(url))
+                flap = prior.flap if prior is not None else 0.0
+                self.channels[key] = ChannelState(key, url, next_due=now, flap=flap)
+                self._schedule(key, now)
+        gone = [k for k in self.channels if k not in keys]
+        for k in gone:
+            del self.channels[k]
+            self._scheduled.pop(k, None)
+        self.store.delete(gone)
+        self._dirty = True
+        self.logger('info', f"Loaded {len(items)} entries, {len(keys)} unique streams "
+                            f"({len(gone)} dropped)")
+        return True
+
+    # --- scheduling -------------------------------------------------------
+
+    def _schedule(self, key: str, when: float):
+        self._scheduled[key] = when
+        heapq.heappush(self._due, (when, key))
+
+    def _next_interval(self, ch: ChannelState) -> float:
+        cfg = self.cfg
+        if ch.flap >= FLAP_THRESHOLD:
+            return cfg.min_interval
+        if (ch.status not in LIVE_STATUSES and ch.prev_status in LIVE_STATUSES
+                and ch.streak <= cfg.dead_retries):
+            return min(cfg.dead_retry * BACKOFF ** (ch.streak - 1), cfg.max_interval)
+        if ch.streak <= 1:
+            return cfg.min_interval
+        return min(max(ch.interval, cfg.min_interval) * BACKOFF, cfg.max_interval)
+
+    def _check(self, key: str, url: str, fut: Future):
+        stats: Dict[str, object] = {}
+        try:
+            status, res, br, fps = check_stream(key, url, self.cfg.timeout,
+                                                analysis=self.cfg.analysis, stats=stats)
+        except Exception as e:
+            self.logger('error', f"Check failed for {url}: {e}")
+            status, res, br, fps = 'DOWN', '', '', ''
+        self.probes.finish(key, fut, {'status': status, 'checked_at': time.time(), 'source': 'monitor',
+                                      'resolution': res, 'bitrate': br, 'fps': fps, **stats})
+
+    def _on_probe(self, key: str, fut: Future, own: bool):
+        if fut.cancelled() or fut.exception() is not None:
+            r = {'status': 'DOWN'}  # an on-demand probe that raised
+        else:
+            r = fut.result()
+        self._on_result(key, r['status'], r.get('resolution', ''), r.get('fps', ''), r.get('ttff'),
+                        adopted=not own)
+
+    def _on_result(self, key: str, status: str, res: str = '', fps: str = '',
+                   ttff: Optional[float] = None, adopted: bool = False):
+        ch = self.channels.get(key)
+        if ch is None:  # dropped from the playlist while being checked
+            return
+        now = time.time()
+        first = ch.status is None
+        changed = not first and status != ch.status
+        if changed:
+            ch.prev_status, ch.last_change = ch.status, now
+            self._dirty |= (status in LIVE_STATUSES) != (ch.status in LIVE_STATUSES)
+        ch.streak = ch.streak + 1 if not (first or changed) else 1
+        ch.flap = ch.flap * FLAP_DECAY + (1.0 if changed else 0.0)
+        ch.status = status
+        ch.last_checked = now
+        ch.interval = self._next_interval(ch)
+        ch.next_due = now + ch.interval * random.uniform(1 - JITTER, 1 + JITTER)
+        self._schedule(key, ch.next_due)
+        self.store.put(ch)
+        self._checks += 1
+        if not adopted:  # else whoever ran the probe records and publishes it
+            if self.history is not None:
+                group, name = self.labels.get(key, ('', ''))
+                self.history.record(history_key(ch.url), status, group, name, ttff, res, fps, ts=now)
+            if self.on_result is not None:
+                self.on_result(ch)
+        self._dirty |= first
+        if changed:
+            lvl = 'found' if status in LIVE_STATUSES else 'error'
+            self.logger(lvl, f"[{ch.prev_status} → {status}] {ch.url} "
+                             f"(next check in {ch.interval:.0f}s)")
+
+    # --- output -----------------------------------------------------------
+
+    def _write_outputs(self, force: bool = False):
+        """
+        Rewrite the playlists whose membership changed since the last write.
+        `force` compares every playlist with the file on disk instead, so a
+        restart leaves files that are already current untouched.
+        """
+        if not (self._dirty or force):
+            return
+        if not force and time.monotonic() - self._last_write < self.cfg.write_interval:
+            return
+        if all(ch.status is None for ch in self.channels.values()):
+            return  # nothing checked yet; keep the previous run's files
+        self._dirty = False
+        self._last_write = time.monotonic()
+        buckets = {'working': set(), 'non_working': set()}
+        for key, ch in self.channels.items():
+            if ch.status is not None:
+                buckets['working' if ch.status in LIVE_STATUSES else 'non_working'].add(key)
+        for suffix, keys in buckets.items():
+            if not force and self._written.get(suffix) == keys:
+                continue
+            path = os.path.join(str(self.cfg.output_dir), f"{self.base}_{suffix}.m3u")
+            text = "#EXTM3U\n" + "".join(f"{extinf}\n{url}\n" for key, extinf, url in self.items
+                                          if key in keys)
+            self._written[suffix] = keys
+            if force and _read(path) == text:
+                continue
+            tmp = path + '.part'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp, path)
+            self.logger('info', f"Updated {path} ({len(keys)} streams)")
+
+    def _log_progress(self, inflight: int):
+        counts = {'live': 0, 'down': 0, 'unchecked': 0}
+        now = time.time()
+        due = 0
+        for ch in self.channels.values():
+            if ch.status is None:
+                counts['unchecked'] += 1
+            else:
+                counts['live' if ch.status in LIVE_STATUSES else 'down'] += 1
+            due += ch.next_due <= now
+        self.logger('info', f"{counts['live']} live, {counts['down']} down, "
+                            f"{counts['unchecked']} unchecked · {self._checks} checks, "
+                            f"{inflight} running, {due} due")
+
+    # --- main loop --------------------------------------------------------
+
+    def start(self):
+        cfg = self.cfg
+        os.makedirs(cfg.output_dir, exist_ok=True)
+        self.store = MonitorStore(cfg.state_db)
+        if cfg.history_db is not None:
+            self.history = HistoryStore(cfg.history_db)
+        self.channels = self.store.load()
+        for ch in self.channels.values():
+            self._schedule(ch.key, ch.next_due)
+        self._reload_if_changed()
+        self._write_outputs(force=True)  # statuses known from the last run, if the files differ
+        budget = ProbeBudget(cfg.per_minute, cfg.per_host)
+        inflight: Set[str] = set()
+        if cfg.analysis == 'keyframes':
+            analysis_pool()
+        pool = ThreadPoolExecutor(max_workers=cfg.max_workers)
+        next_report = time.monotonic() + self.PROGRESS_INTERVAL
+        next_reload = time.monotonic() + self.RELOAD_INTERVAL
+        self.logger('info', f"Monitoring {len(self.channels)} streams with {cfg.max_workers} workers, "
+                            f"≤{cfg.per_minute or '∞'} probes/min, ≤{cfg.per_host or '∞'} per host")
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_reload:
+                    next_reload = time.monotonic() + self.RELOAD_INTERVAL
+                    self._reload_if_changed()
+
+                # dispatch due channels, earliest first, within the budgets
+                now = time.time()
+                while self._due and len(inflight) < cfg.max_workers:
+                    when, key = self._due[0]
+                    if when > now:
+                        break
+                    if (self._scheduled.get(key) != when or key not in self.channels
+                            or key in inflight):
+                        heapq.heappop(self._due)  # rescheduled, dropped or running since
+                        continue
+                    own = False
+                    fut = self.probes.get(key)  # already being probed on demand
+                    if fut is None:
+                        host = self.hosts.get(key, '')
+                        if not budget.try_acquire(host):
+                            if budget.next_free():
+                                break  # overall budget spent; the channel stays first in line
+                            # this host is out of budget: retry the channel when it has room
+                            heapq.heappop(self._due)
+                            self._schedule(key, now + budget.next_free(host))
+                            continue
+                        fut, own = self.probes.claim(key)
+                        if own:
+                            pool.submit(self._check, key, self.channels[key].url, fut)
+                    heapq.heappop(self._due)
+                    del self._scheduled[key]  # _on_result schedules the next check
+                    inflight.add(key)
+                    fut.add_done_callback(lambda f, key=key, own=own: self._results.put((key, f, own)))
+
+                # sleep until a result arrives, the next channel falls due, or the
+                # overall budget frees up; with every worker busy only a result helps
+                if len(inflight) >= cfg.max_workers:
+                    wait = self.IDLE_SLEEP
+                else:
+                    upcoming = self._due[0][0] if self._due else now + self.IDLE_SLEEP
+                    wait = min(self.IDLE_SLEEP, max(0.05, upcoming - time.time(), budget.next_free()))
+                try:
+                    result = self._results.get(timeout=wait)
+                    while True:
+                        inflight.discard(result[0])
+                        self._on_probe(*result)
+                        result = self._results.get_nowait()
+                except queue.Empty:
+                    pass
+
+                self._write_outputs()
+                if time.monotonic() >= next_report:
+                    next_report = time.monotonic() + self.PROGRESS_INTERVAL
+                    self._log_progress(len(inflight))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._write_outputs(force=self._dirty)
+            self.store.close()
+            if self.history is not None:
+                self.history.close()
+            self.logger('info', 'Monitor stopped; state saved')
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,101 @@
+# services/monitor_store.py
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, astuple, fields
+from pathlib import Path
+from typing import Dict, Iterable
+
+MONITOR_DB = Path(".monitor_state.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    key          TEXT PRIMARY KEY,
+    url          TEXT NOT NULL,
+    status       TEXT,
+    prev_status  TEXT,
+    streak       INTEGER NOT NULL DEFAULT 0,
+    flap         REAL    NOT NULL DEFAULT 0,
+    interval     REAL    NOT NULL DEFAULT 0,
+    next_due     REAL    NOT NULL DEFAULT 0,
+    last_checked REAL,
+    last_change  REAL
+);
+"""
+
+
+@dataclass
+class ChannelState:
+    """Schedule and last result of one monitored stream (keyed by normalized URL)."""
+    key: str
+    url: str
+    status: str = None          # last check result, None until checked
+    prev_status: str = None     # status before the last change
+    streak: int = 0             # consecutive checks with the same status
+    flap: float = 0.0           # decaying count of recent status changes
+    interval: float = 0.0       # seconds until the next check was scheduled
+    next_due: float = 0.0       # wall-clock time of the next check
+    last_checked: float = None
+    last_change: float = None
+
+
+_COLUMNS = [f.name for f in fields(ChannelState)]
+
+
+class MonitorStore:
+    """
+    SQLite-backed monitor state, so a restarted monitor resumes its schedule
+    and knows every channel's last status. Updates are committed in batches.
+    """
+    FLUSH_INTERVAL = 5.0  # seconds
+
+    def __init__(self, path: Path = MONITOR_DB):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending: Dict[str, ChannelState] = {}
+        self._last_flush = time.monotonic()
+
+    def load(self) -> Dict[str, ChannelState]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM channels").fetchall()
+        return {r[0]: ChannelState(*r) for r in rows}
+
+    def put(self, state: ChannelState):
+        """Queue `state`; committed with the next flush."""
+        with self._lock:
+            self._pending[state.key] = state
+            if time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+                self._flush_locked()
+
+    def delete(self, keys: Iterable[str]):
+        with self._lock:
+            keys = list(keys)
+            for k in keys:
+                self._pending.pop(k, None)
+            with self._conn:
+                self._conn.executemany("DELETE FROM channels WHERE key = ?", [(k,) for k in keys])
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        marks = ', '.join('?' * len(_COLUMNS))
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO channels ({', '.join(_COLUMNS)}) VALUES ({marks})",
+                [astuple(s) for s in self._pending.values()]
+            )
+        self._pending.clear()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
@@ -59,13 +59,17 @@ def write_output_files(original_lines,
                        split: bool,
                        update_quality: bool,
                        update_fps: bool,
-                       include_untested: bool) -> list[str]:
+                       include_untested: bool,
+                       split_slow: bool = False,
+                       best=None) -> list[str]:
     """
     Writes out one or more M3U files based on the user's settings.
+    SLOW channels count as working unless `split_slow` gives them their own file.
+    `best` is a collection of uids (one mirror per channel) written to *_best.m3u.
     Returns the list of filepaths written.
     """
     # If no export option is selected, skip
-    if not (split or update_quality or update_fps or include_untested):
+    if not (split or update_quality or update_fps or include_untested or best is not None):
         return []
 
     tested = []
@@ -86,8 +90,10 @@ def write_output_files(original_lines,
             untested.append((uid, line, url))
 
     # Bucket tested entries
-    buckets = {"UP": [], "BLACK_SCREEN": [], "DOWN": []}
+    buckets = {"UP": [], "SLOW": [], "BLACK_SCREEN": [], "FROZEN": [], "DOWN": []}
     for uid, ext, url, st in tested:
+        if st == "SLOW" and not split_slow:
+            st = "UP"
         key = st if st in buckets else "DOWN"
         buckets[key].append((uid, ext, url))
 
@@ -108,17 +114,23 @@ def write_output_files(original_lines,
         # one file per status
         for st, items in buckets.items():
             if items:
-                suf = {"UP":"working","BLACK_SCREEN":"black_screen","DOWN":"non_working"}[st]
+                suf = {"UP":"working","SLOW":"slow","BLACK_SCREEN":"black_screen",
+                       "FROZEN":"frozen","DOWN":"non_working"}[st]
                 _write(suf, items)
         # optional “all” including untested
         if include_untested:
             all_items = [(u, e, u2) for u,e,u2,_ in tested] + untested
             _write("all", all_items)
-    else:
+    elif split or update_quality or update_fps or include_untested:
         # single “all” file
         items = [(u,e,u2) for u,e,u2,_ in tested]
         if include_untested:
             items += untested
         _write("all", items)
 
+    # one mirror per channel, alongside the other files
+    if best is not None:
+        best = set(best)
+        _write("best", [(u, e, u2) for u, e, u2, _ in tested if u in best])
+
     return written_files
@@ -2,7 +2,7 @@
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from services.utils import RegexRules
 
@@ -16,6 +16,68 @@ class Entry:
     base: str = ""
     ep_suffix: str = ""
     prefix: str = ""
+    year: Optional[int] = None
+    media: str = ""  # 'movie' / 'tv' hint for TMDB matching, '' if unknown
+
+def episode_numbers(ep_suffix: str) -> Optional[Tuple[int, int]]:
+    """(season, episode) from an 'SxxEyy' suffix, or None."""
+    m = re.match(r'S(\d+)E(\d+)', ep_suffix or '')
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+def category_for(url: str) -> str:
+    """Bucket an entry into Live Channels, Movies or Series from its URL."""
+    lower = url.lower()
+    if 'series' in lower:
+        return 'Series'
+    if 'movie' in lower:
+        return 'Movies'
+    return 'Live Channels'
+
+def media_hint(e: Entry) -> str:
+    """TMDB media type implied by an entry's episode suffix, URL or group name."""
+    if e.ep_suffix:
+        return 'tv'
+    cat = category_for(e.url)
+    if cat == 'Series':
+        return 'tv'
+    if cat == 'Movies':
+        return 'movie'
+    grp = e.group.lower()
+    if 'series' in grp or 'serie' in grp or 'tv show' in grp:
+        return 'tv'
+    if 'movie' in grp or 'film' in grp or 'vod' in grp:
+        return 'movie'
+    return ''
+
+def iter_entries(m3u_path: str,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[Entry, int]]:
+    """
+    Stream entries from an M3U file without reading it into memory.
+    Yields (entry, bytes_read) so callers can report progress; stops early
+    once `should_stop()` returns True.
+    """
+    rules = RegexRules()
+    read = 0
+    pending = None
+    with open(m3u_path, 'rb') as f:
+        for raw in f:
+            read += len(raw)
+            if should_stop and should_stop():
+                return
+            line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+            if pending is not None:
+                yield _make_entry(rules, pending, line.strip()), read
+                pending = None
+            if line.startswith("#EXTINF"):
+                pending = line
+    if pending is not None:
+        yield _make_entry(rules, pending, ""), read
+
+def _make_entry(rules: RegexRules, line: str, url: str) -> Entry:
+    m = rules.GROUP_RE.search(line)
+    grp_name = m.group(1) if m else ""
+    name = line.split(",", 1)[1].strip() if "," in line else ""
+    return Entry(raw_inf=line, url=url, group=grp_name, original_name=name)
 
 def parse_groups(m3u_path: str) -> Tuple[dict, List[str]]:
     rules = RegexRules()
@@ -23,12 +85,9 @@ def parse_groups(m3u_path: str) -> Tuple[dict, List[str]]:
     groups = {}
     for i, line in enumerate(lines):
         if line.startswith("#EXTINF"):
-            m = rules.GROUP_RE.search(line)
-            grp_name = m.group(1) if m else ""
             url = lines[i+1].strip() if i+1 < len(lines) else ""
-            name = line.split(",", 1)[1].strip() if "," in line else ""
-            e = Entry(raw_inf=line, url=url, group=grp_name, original_name=name)
-            groups.setdefault(grp_name, []).append(e)
+            e = _make_entry(rules, line, url)
+            groups.setdefault(e.group, []).append(e)
     return groups, lines
 
 def clean_entries(entries: List[Entry]) -> None:
@@ -40,6 +99,10 @@ def clean_entries(entries: List[Entry]) -> None:
         # episode suffix
         m = rules.EPISODE_RE.search(e.original_name)
         e.ep_suffix = m.group(0) if m else ""
+        # release year, kept as a matching hint
+        y = rules.YEAR_RE.search(e.original_name)
+        e.year = int(y.group(0)) if y else None
+        e.media = media_hint(e)
         # strip codes, years, multi, episode
         name = rules.PREFIX_RE.sub("", e.original_name)
         name = rules.YEAR_RE.sub("", name)
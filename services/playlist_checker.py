@@ -0,0 +1,207 @@
+# services/playlist_checker.py
+"""
+Library API for checking playlists from asyncio code, without Qt:
+
+    async for r in check_playlist("list.m3u", CheckOptions(max_workers=10)):
+        print(r.status, r.name, r.resolution, r.timings.get('total'))
+
+Results arrive in completion order. Wrap the generator in
+contextlib.aclosing() when breaking out of the loop early, so its workers
+are released right away instead of when it is garbage collected.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from checker import check_stream
+from config import CheckOptions
+from services.frame_analysis import analysis_pool
+from services.mirrors import best_mirrors, channel_key
+from services.output_writer import write_output_files, CUID_RE
+from services.parser import Entry, iter_entries
+from services.utils import normalize_url, VOLATILE_PARAMS
+
+# a playlist path, or entries: parser Entry objects or (name, url) pairs
+Source = Union[str, Path, Iterable[Union[Entry, Tuple[str, str]]]]
+
+
+@dataclass
+class CheckResult:
+    """Outcome of one playlist entry; fields as returned by check_stream."""
+    uid: str                    # CUID attribute of the entry, else "<group>_<index>"
+    name: str
+    group: str
+    url: str
+    raw_inf: str
+    status: str                 # UP, SLOW, BLACK_SCREEN, FROZEN or DOWN
+    resolution: str = ''
+    bitrate: str = ''
+    fps: str = ''
+    timings: Dict[str, float] = field(default_factory=dict)  # TIMING_STAGES of the last attempt
+    stats: Dict[str, object] = field(default_factory=dict)   # black_ratio, ttff, rate_bps, ...
+    attempts: int = 1
+    shared: bool = False        # taken from another entry's check of the same stream
+    error: Optional[str] = None  # exception of the last attempt, if it raised
+
+
+@dataclass
+class _Outcome:
+    status: str
+    resolution: str
+    bitrate: str
+    fps: str
+    timings: Dict[str, float]
+    stats: Dict[str, object]
+    attempts: int
+    error: Optional[str]
+
+
+def _entries(source: Source, selected_groups: List[str]) -> Iterator[dict]:
+    """Entry dicts with uids numbered per group, like the GUI checker."""
+    if isinstance(source, (str, Path)):
+        items = (e for e, _ in iter_entries(str(source)))
+    else:
+        items = source
+    selected = set(selected_groups)
+    counts: Dict[str, int] = {}
+    for item in items:
+        if isinstance(item, Entry):
+            name, url, group, raw_inf = item.original_name, item.url, item.group, item.raw_inf
+        else:
+            (name, url), group, raw_inf = item, '', ''
+        idx = counts.get(group, 0)
+        counts[group] = idx + 1
+        if selected and group not in selected:
+            continue
+        m = CUID_RE.search(raw_inf)
+        yield {'uid': m.group(1) if m else f"{group}_{idx}",
+               'name': name, 'url': url, 'group': group, 'raw_inf': raw_inf}
+
+
+def _check(name: str, url: str, opts: CheckOptions) -> _Outcome:
+    """check_stream with the GUI's retry policy: DOWN is retried `retries` times."""
+    status, res, br, fps, error = 'DOWN', '', '', '', None
+    attempt = 0
+    while True:
+        attempt += 1
+        timings: Dict[str, float] = {}
+        stats: Dict[str, object] = {}
+        try:
+            status, res, br, fps = check_stream(
+                name, url, opts.timeout, timings,
+                analysis=opts.analysis, sample_frames=opts.sample_frames,
+                throughput=opts.throughput, slow_ratio=opts.slow_ratio, stats=stats,
+                pad_down=attempt > opts.retries, frozen_diff=opts.frozen_diff)
+            error = None
+        except Exception as e:
+            status, error = 'DOWN', str(e) or type(e).__name__
+        if status != 'DOWN' or attempt > opts.retries:
+            return _Outcome(status, res, br, fps, timings, stats, attempt, error)
+
+
+def _result(entry: dict, outcome: _Outcome, shared: bool) -> CheckResult:
+    return CheckResult(
+        uid=entry['uid'], name=entry['name'], group=entry['group'], url=entry['url'],
+        raw_inf=entry['raw_inf'], status=outcome.status, resolution=outcome.resolution,
+        bitrate=outcome.bitrate, fps=outcome.fps, timings=dict(outcome.timings),
+        stats=dict(outcome.stats), attempts=outcome.attempts, shared=shared, error=outcome.error,
+    )
+
+
+async def check_playlist(source: Source,
+                         options: Optional[CheckOptions] = None) -> AsyncIterator[CheckResult]:
+    """
+    Check every entry of `source` and yield a CheckResult per entry as soon as
+    its check completes.
+
+    Backpressure: at most options.max_workers checks run at a time, and new
+    ones only start while the consumer keeps pulling results, so a slow
+    consumer slows the checking down instead of buffering results.
+    With dedupe_urls, entries whose URLs normalize to the same stream share
+    one check (later ones are yielded with shared=True).
+
+    Cancellation: cancelling the consuming task or closing the generator
+    stops dispatching at once. Checks already running cannot be interrupted;
+    they end in their worker threads within the check timeout and their
+    results are dropped.
+    """
+    opts = options or CheckOptions()
+    volatile = opts.volatile_params if opts.volatile_params is not None else VOLATILE_PARAMS
+    loop = asyncio.get_running_loop()
+    if opts.analysis == 'keyframes':
+        analysis_pool()
+    pool = ThreadPoolExecutor(max_workers=opts.max_workers, thread_name_prefix='check')
+    entries = _entries(source, opts.selected_groups)
+    waiting: Dict[str, List[dict]] = {}       # stream key → entries waiting on its check
+    finished: Dict[str, _Outcome] = {}        # stream key → outcome, when deduplicating
+    inflight: Dict[asyncio.Future, str] = {}
+    ready: List[CheckResult] = []
+    exhausted = False
+    n = 0
+    try:
+        while True:
+            while not exhausted and not ready and len(inflight) < opts.max_workers:
+                entry = next(entries, None)
+                if entry is None:
+                    exhausted = True
+                    break
+                n += 1
+                key = normalize_url(entry['url'], volatile) if opts.dedupe_urls else str(n)
+                if key in finished:
+                    ready.append(_result(entry, finished[key], shared=True))
+                elif key in waiting:
+                    waiting[key].append(entry)
+                else:
+                    waiting[key] = [entry]
+                    fut = loop.run_in_executor(pool, _check, entry['name'], entry['url'], opts)
+                    inflight[fut] = key
+
+            if ready:
+                yield ready.pop(0)
+                continue  # the consumer wants more: refill free slots first
+            if not inflight:
+                return  # nothing running, nothing ready: the source is exhausted
+
+            done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                key = inflight.pop(fut)
+                outcome = fut.result()
+                if opts.dedupe_urls:
+                    finished[key] = outcome
+                for i, entry in enumerate(waiting.pop(key)):
+                    ready.append(_result(entry, outcome, shared=i > 0))
+    finally:
+        for fut in inflight:
+            fut.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def write_results(m3u_file: Union[str, Path], results: Iterable[CheckResult], output_dir,
+                  split: bool = True, update_quality: bool = False, update_fps: bool = False,
+                  include_untested: bool = False, split_slow: bool = False,
+                  best_source: bool = False) -> List[str]:
+    """
+    Write the playlists the GUI writes after a check, via write_output_files,
+    from collected results. As there, only entries with a CUID attribute are
+    written. Returns the paths written.
+    """
+    entry_map: Dict[str, dict] = {}
+    status_map: Dict[str, str] = {}
+    for r in results:
+        entry_map[r.uid] = {'name': r.name, 'raw_inf': r.raw_inf, 'resolution': r.resolution,
+                            'fps': r.fps, 'ttff': r.stats.get('ttff'),
+                            'channel_key': channel_key(r.name, r.raw_inf)}
+        status_map[r.uid] = r.status
+    with open(m3u_file, 'r', encoding='utf-8') as f:
+        original_lines = f.readlines()
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(str(m3u_file)))[0]
+    return write_output_files(
+        original_lines, entry_map, status_map, base, str(output_dir),
+        split=split, update_quality=update_quality, update_fps=update_fps,
+        include_untested=include_untested, split_slow=split_slow,
+        best=best_mirrors(entry_map, status_map) if best_source else None,
+    )
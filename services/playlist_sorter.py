@@ -1,12 +1,14 @@
 # services/playlist_sorter.py
 import asyncio
+import os
+import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Optional, Set
 import re
-import aiohttp
 
-from services.parser import parse_groups, clean_entries, Entry
-from tmdb_client import TMDBClient
+from services.parser import iter_entries, clean_entries, episode_numbers, Entry
+from services.tmdb_index import TMDBTitleIndex
+from tmdb_client import TMDBClient, TMDBError
 from config import SortConfig
 
 # Regex to extract key="value" pairs
@@ -17,12 +19,28 @@ class PlaylistSorter:
     """
     Sorts M3U playlists using TMDB lookups. Ensures single EXTINF output with controlled attributes.
     """
+    PROGRESS_INTERVAL = 2.0  # seconds between aggregated lookup progress lines
+    WINDOW = 2000  # max entries read ahead of the writer
+
     def __init__(self, cfg: SortConfig, logger):
         self.cfg = cfg
         self.logger = logger
         self._pause_event = asyncio.Event()
         self._pause_event.set()
         self._stop_event = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _log_progress(self, stats: Dict[str, int], client: TMDBClient, started: float):
+        done = stats['done']
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = done / elapsed
+        frac = stats['read'] / stats['size'] if stats['size'] else 1.0
+        eta = elapsed * (1 - frac) / frac if frac > 0 else 0
+        self.logger('info',
+                    f"Lookups {done}/{stats['queued']} · {int(frac * 100)}% of playlist read · "
+                    f"{rate:.1f}/s · ETA {int(eta) // 60}m{int(eta) % 60:02d}s · "
+                    f"{stats['found']} found, {stats['missing']} no result · "
+                    f"{client.cache_hits} cache hits, {done - client.cache_hits} misses")
 
     def _parse_extinf(self, line: str) -> (Dict[str,str], str):
         # Remove leading tag
@@ -35,79 +53,237 @@ class PlaylistSorter:
         attrs = {m.group(1): m.group(2) for m in _ATTR_REGEX.finditer(attr_part)}
         return attrs, name.strip()
 
-    async def _lookup_all(self, titles: List[str], client: TMDBClient):
-        sem = asyncio.Semaphore(self.cfg.max_workers)
-        async def lookup(title: str):
-            await self._pause_event.wait()
-            if self._stop_event.is_set(): return
-            async with sem:
-                self.logger('info', f"Looking up '{title}' …")
-                detail = await client.search_and_fetch(title)
-                if detail:
-                    self.logger('found', f"Found '{title}'")
+    def _format_entry(self, e: Entry, detail: dict, client: TMDBClient) -> str:
+        attrs, orig_name = self._parse_extinf(e.raw_inf)
+        episode = detail.get('episode') or {}
+        # Display name
+        if self.cfg.update_name and detail:
+            name = detail.get('title') or detail.get('name') or e.base
+            date = detail.get('release_date') or detail.get('first_air_date') or ''
+            if self.cfg.add_year and date[:4]:
+                name += f" ({date[:4]})"
+            if e.ep_suffix: name += f" {e.ep_suffix}"
+            if episode.get('name'): name += f" - {episode['name']}"
+        else:
+            name = orig_name
+        # Attributes
+        new_attrs = {}
+        new_attrs['tvg-id'] = attrs.get('tvg-id', '')
+        new_attrs['tvg-name'] = name
+        # Logo
+        if self.cfg.update_banner and episode.get('still_path'):
+            new_attrs['tvg-logo'] = TMDB_IMAGE_BASE + episode['still_path']
+        elif self.cfg.update_banner and detail.get('poster_path'):
+            new_attrs['tvg-logo'] = TMDB_IMAGE_BASE + detail['poster_path']
+        else:
+            new_attrs['tvg-logo'] = attrs.get('tvg-logo', attrs.get('logo', ''))
+        # Group
+        genre = client.genre_for(detail)
+        new_attrs['group-title'] = f"{e.prefix}{genre}"
+        # Build line
+        attr_str = ' '.join(f'{k}="{v}"' for k,v in new_attrs.items())
+        return f"#EXTINF:-1 {attr_str},{name}\n{e.url}\n"
+
+    async def _episode_detail(self, e: Entry, show: asyncio.Future, client: TMDBClient,
+                              seasons: Dict[tuple, asyncio.Task]) -> Optional[dict]:
+        """
+        Show detail for an SxxEyy entry, extended with its episode's name and
+        still. Each (show, season) is fetched once and fanned out to every
+        episode entry that needs it.
+        """
+        detail = await show
+        nums = episode_numbers(e.ep_suffix)
+        if not detail or not nums or not detail.get('id'):
+            return detail
+        if (detail.get('media_type') or ('tv' if 'first_air_date' in detail else 'movie')) != 'tv':
+            return detail
+        key = (detail['id'], nums[0])
+        task = seasons.get(key)
+        if task is None:
+            task = seasons[key] = asyncio.ensure_future(client.season(*key))
+        try:
+            episodes = await asyncio.shield(task)
+        except TMDBError:
+            return detail
+        episode = episodes.get(str(nums[1]))
+        return {**detail, 'episode': episode} if episode else detail
+
+    async def _stream(self, client: TMDBClient, out_file: Path) -> bool:
+        """
+        Read, look up and write the playlist as one pipeline. Entries are
+        written in their original order as soon as they and every earlier
+        entry are resolved, into `<out_file>.part`, which is renamed over
+        `out_file` only when the whole playlist has been written.
+        Returns False if the run was stopped.
+        """
+        selected = set(self.cfg.selected_groups)
+        # identical titles (e.g. every episode of a series) are looked up once;
+        # the first entry's year/media type serve as matching hints. A lookup is
+        # dropped once the writer is past every entry read so far that uses it,
+        # so only titles inside the window stay in memory; a title seen again
+        # later is answered from the store. Failed lookups are kept, so they
+        # are not retried within the run.
+        lookups: Dict[tuple, asyncio.Future] = {}
+        users: Dict[tuple, int] = {}  # title key → entries in the window using its lookup
+        seasons: Dict[tuple, asyncio.Task] = {}
+        failed: Set[tuple] = set()
+        stats = {'done': 0, 'found': 0, 'missing': 0, 'queued': 0, 'processed': 0,
+                 'read': 0, 'size': os.path.getsize(self.cfg.m3u_file)}
+
+        # a fixed pool of workers pulls from a bounded queue and a bounded
+        # window sits between reader and writer, so memory does not grow
+        # with the size of the playlist
+        n_workers = max(1, self.cfg.max_workers)
+        todo: asyncio.Queue = asyncio.Queue(maxsize=n_workers * 2)
+        window: asyncio.Queue = asyncio.Queue(maxsize=self.WINDOW)
+
+        async def reader():
+            try:
+                await read_all()
+            except Exception as err:
+                # hand the failure to the writer so it does not wait forever
+                await window.put(err)
+                raise
+            await window.put(None)
+
+        async def read_all():
+            for e, read in iter_entries(str(self.cfg.m3u_file), self._stop_event.is_set):
+                stats['read'] = read
+                fut = key = None
+                if not selected or e.group in selected:
+                    e.processed = True
+                    clean_entries([e])
+                    stats['processed'] += 1
+                    key = (e.base, e.year)
+                    fut = lookups.get(key)
+                    if fut is None:
+                        fut = lookups[key] = asyncio.get_running_loop().create_future()
+                        stats['queued'] += 1
+                        await todo.put((e, fut))
+                    users[key] = users.get(key, 0) + 1
+                    if self.cfg.episode_details and e.ep_suffix:
+                        fut = asyncio.ensure_future(self._episode_detail(e, fut, client, seasons))
+                elif self.cfg.export_only_sorted:
+                    continue
+                await window.put((e, fut, key))
+
+        def release(key: tuple):
+            users[key] -= 1
+            if not users[key]:
+                del users[key]
+                if key not in failed:
+                    del lookups[key]
+
+        async def worker():
+            while True:
+                e, fut = await todo.get()
+                await self._pause_event.wait()
+                try:
+                    detail = await client.search_and_fetch(e.base, e.year, e.media or None)
+                except TMDBError as err:
+                    failed.add((e.base, e.year))
+                    self.logger('error', f"Lookup failed for '{e.base}': {err}")
+                    detail = None
+                except Exception as err:
+                    fut.set_exception(err)
+                    raise
                 else:
-                    self.logger('error', f"No result for '{title}'")
-        await asyncio.gather(*(lookup(t) for t in titles))
+                    stats['found' if detail else 'missing'] += 1
+                stats['done'] += 1
+                fut.set_result(detail)
 
-    async def _sort_async(self):
-        # Read and parse
-        groups, _ = parse_groups(str(self.cfg.m3u_file))
-        entries = [e for grp in groups.values() for e in grp]
+        async def reporter():
+            while True:
+                await asyncio.sleep(self.PROGRESS_INTERVAL)
+                self._log_progress(stats, client, started)
+
+        part = out_file.with_name(out_file.name + '.part')
+        started = time.monotonic()
+        stopped = asyncio.ensure_future(self._stop_event.wait())
+        tasks = [asyncio.create_task(reader()), asyncio.create_task(reporter())]
+        tasks += [asyncio.create_task(worker()) for _ in range(n_workers)]
+        complete = False
+        try:
+            with open(part, 'w', encoding='utf-8') as fw:
+                fw.write("#EXTM3U\n")
+                while True:
+                    item = await window.get()
+                    if item is None:
+                        complete = not self._stop_event.is_set()
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    e, fut, key = item
+                    if fut is None:
+                        # unprocessed entries pass through untouched
+                        fw.write(f"{e.raw_inf}\n{e.url}\n")
+                        continue
+                    if not fut.done():
+                        await asyncio.wait({fut, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                        if not fut.done():
+                            break
+                    fw.write(self._format_entry(e, fut.result() or {}, client))
+                    release(key)
+        finally:
+            for t in tasks + [stopped]:
+                t.cancel()
+            await asyncio.gather(*tasks, stopped, return_exceptions=True)
+
+        self._log_progress(stats, client, started)
+        deduped = stats['processed'] - stats['queued']
+        self.logger('info',
+                    f"Looked up {stats['queued']} unique titles for {stats['processed']} entries; "
+                    f"saved {deduped + client.coalesced} API lookups "
+                    f"({deduped} duplicates, {client.coalesced} coalesced)")
+        if seasons:
+            self.logger('info', f"Fetched {len(seasons)} seasons for episode details")
+        if client.index is not None:
+            self.logger('info', f"Resolved {client.local_hits} titles from the offline index")
+        for title, match, score in client.low_confidence:
+            self.logger('error', f"Low-confidence match for '{title}': '{match}' (score {score:.2f})")
+        if client.governor.throttled or failed:
+            self.logger('error',
+                        f"TMDB throttled {client.governor.throttled} requests; "
+                        f"{len(failed)} lookups failed and will be retried next run")
 
-        # Mark processing
-        selected = set(self.cfg.selected_groups) or set(groups.keys())
-        for e in entries: e.processed = (e.group in selected)
+        if complete:
+            os.replace(part, out_file)
+        return complete
 
-        clean_entries(entries)
-        titles = [e.base for e in entries if e.processed]
+    async def _sort_async(self):
+        self._loop = asyncio.get_running_loop()
+        out_file = Path(self.cfg.output_dir) / f"{self.cfg.m3u_file.stem}_sorted.m3u"
 
         # TMDB client
+        import aiohttp  # deferred: importing it costs more than the rest of the CLI
         async with aiohttp.ClientSession() as session:
-            client = TMDBClient(self.cfg.tmdb_api_key, self.cfg.genre_map)
+            client = TMDBClient(self.cfg.tmdb_api_key, self.cfg.genre_map,
+                                ttl=self.cfg.cache_ttl_days * 86400 if self.cfg.cache_ttl_days else None,
+                                max_concurrency=self.cfg.max_workers,
+                                negative_ttl=self.cfg.negative_ttl_hours * 3600,
+                                index=TMDBTitleIndex.open_existing(self.cfg.title_index),
+                                full_details=self.cfg.full_details,
+                                api_base=self.cfg.tmdb_api_base)
             client.session = session
-            await self._lookup_all(titles, client)
-            client.save_cache()
+            try:
+                complete = await self._stream(client, out_file)
+            finally:
+                client.save_cache()
+        client.close()
+        if complete:
+            self.logger('info', f"Wrote sorted playlist to {out_file}")
+        else:
+            self.logger('info', f"Stopped; partial playlist left in {out_file}.part")
 
-        # Write output
-        out_file = Path(self.cfg.output_dir) / f"{self.cfg.m3u_file.stem}_sorted.m3u"
-        with open(out_file, 'w', encoding='utf-8') as fw:
-            fw.write("#EXTM3U\n")
-            for e in entries:
-                attrs, orig_name = self._parse_extinf(e.raw_inf)
-                # Skip unprocessed if only sorted
-                if not e.processed:
-                    if self.cfg.export_only_sorted: continue
-                    fw.write(f"{e.raw_inf}\n{e.url}\n")
-                    continue
-                # Build new
-                detail = client._cache.get(e.base, {}) or {}
-                # Display name
-                if self.cfg.update_name and detail:
-                    name = detail.get('title') or detail.get('name') or e.base
-                    if self.cfg.add_year and 'release_date' in detail:
-                        name += f" ({detail['release_date'][:4]})"
-                    if e.ep_suffix: name += f" {e.ep_suffix}"
-                else:
-                    name = orig_name
-                # Attributes
-                new_attrs = {}
-                new_attrs['tvg-id'] = attrs.get('tvg-id', '')
-                new_attrs['tvg-name'] = name
-                # Logo
-                if self.cfg.update_banner and detail.get('poster_path'):
-                    new_attrs['tvg-logo'] = TMDB_IMAGE_BASE + detail['poster_path']
-                else:
-                    new_attrs['tvg-logo'] = attrs.get('tvg-logo', attrs.get('logo', ''))
-                # Group
-                genre = client.genre_for(detail)
-                new_attrs['group-title'] = f"{e.prefix}{genre}"
-                # Build line
-                attr_str = ' '.join(f'{k}="{v}"' for k,v in new_attrs.items())
-                fw.write(f"#EXTINF:-1 {attr_str},{name}\n{e.url}\n")
-        self.logger('info', f"Wrote sorted playlist to {out_file}")
+    def _call(self, fn):
+        # pause/resume/stop come from the GUI thread; hand them to the loop
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(fn)
+        else:
+            fn()
 
     def start(self):
         asyncio.run(self._sort_async())
-    def pause(self): self._pause_event.clear(); self.logger('info', 'Paused')
-    def resume(self): self._pause_event.set(); self.logger('info', 'Resumed')
-    def stop(self): self._stop_event.set(); self.logger('info', 'Stopped')
+    def pause(self): self._call(self._pause_event.clear); self.logger('info', 'Paused')
+    def resume(self): self._call(self._pause_event.set); self.logger('info', 'Resumed')
+    def stop(self): self._call(self._stop_event.set); self.logger('info', 'Stopped')
@@ -0,0 +1,146 @@
+# services/profiling.py
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Deque, List, Optional, Sequence
+
+# Modules whose allocations get their own section in the report
+DEFAULT_MODULES = (
+    'services/parser.py',
+    'services/output_writer.py',
+    'controllers/checker_controller.py',
+    'services/playlist_sorter.py',
+)
+KEEP_SUMMARIES = 20  # per-interval allocation summaries kept for the report
+
+
+class RunProfiler:
+    """
+    Wraps a checker or sorter run with cProfile and periodic tracemalloc
+    snapshots.
+
+    cProfile only sees the thread that calls start()/stop(), so both must run
+    on the thread doing the work (the GUI thread for the checker, the sorter
+    thread for the sorter). On stop() it writes `<name>_<stamp>.prof`
+    (load with pstats or snakeviz) and `<name>_<stamp>_alloc.txt` with the
+    top-N allocation sites overall and per module in DEFAULT_MODULES.
+
+    Only the first and the latest snapshot are kept; every other interval is
+    reduced to its top-N summary when taken, and the last `keep` summaries
+    make it into the report, so memory stays flat over long runs.
+    """
+
+    def __init__(self, out_dir: str, name: str, interval: float = 30.0, top_n: int = 25,
+                 modules: Sequence[str] = DEFAULT_MODULES, logger=None,
+                 keep: int = KEEP_SUMMARIES):
+        self.out_dir = out_dir
+        self.name = name
+        self.interval = interval
+        self.top_n = top_n
+        self.modules = tuple(modules)
+        self.logger = logger
+        self._profile = cProfile.Profile()
+        self._first: Optional[tracemalloc.Snapshot] = None
+        self._last: Optional[tracemalloc.Snapshot] = None
+        self._summaries: Deque[List[str]] = deque(maxlen=max(1, keep))
+        self._taken = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._tracing = False
+
+    def start(self) -> "RunProfiler":
+        self._started = time.monotonic()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._tracing = True
+        self._snapshot()
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._snapshot_loop, daemon=True)
+            self._thread.start()
+        self._profile.enable()
+        return self
+
+    def stop(self) -> List[str]:
+        """Stop profiling and write the reports; returns the files written."""
+        self._profile.disable()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._snapshot()
+        if self._tracing:
+            tracemalloc.stop()
+        paths = self._write()
+        if self.logger:
+            for p in paths:
+                self.logger('info', f"Profile written: {p}")
+        return paths
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.interval):
+            self._snapshot()
+
+    def _snapshot(self):
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        t = time.monotonic() - self._started
+        current = sum(s.size for s in snap.statistics('filename'))
+        lines = [f"=== Allocations at +{t:.0f}s: {current / 1024:.0f} KiB traced ==="]
+        lines.extend(f"  {stat}" for stat in snap.statistics('lineno')[:self.top_n])
+        self._summaries.append(lines)
+        self._taken += 1
+        if self._first is None:
+            self._first = snap
+        self._last = snap
+
+    def _write(self) -> List[str]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(self.out_dir, f"{self.name}_{stamp}")
+        prof_path = base + '.prof'
+        self._profile.dump_stats(prof_path)
+        alloc_path = base + '_alloc.txt'
+        with open(alloc_path, 'w', encoding='utf-8') as f:
+            f.write(self._cpu_report())
+            f.write(self._alloc_report())
+        return [prof_path, alloc_path]
+
+    def _cpu_report(self) -> str:
+        buf = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=buf)
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        return f"=== CPU: top {self.top_n} by cumulative time ===\n{buf.getvalue()}\n"
+
+    def _alloc_report(self) -> str:
+        lines = []
+        dropped = self._taken - len(self._summaries)
+        if dropped:
+            lines.extend([f"({dropped} earlier interval summaries not kept)", ''])
+        for summary in self._summaries:
+            lines.extend(summary)
+            lines.append('')
+        first, last = self._first, self._last
+        for module in self.modules:
+            pattern = '*' + module.replace('/', os.sep)
+            only = (tracemalloc.Filter(True, pattern),)
+            diff = last.filter_traces(only).compare_to(first.filter_traces(only), 'lineno')
+            lines.append(f"=== {module}: top {self.top_n} growth over the run ===")
+            shown = [d for d in diff if d.size_diff or d.size][:self.top_n]
+            lines.extend(f"  {d}" for d in shown)
+            if not shown:
+                lines.append('  (no allocations traced)')
+            lines.append('')
+        return "\n".join(lines) + "\n"
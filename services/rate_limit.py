@@ -0,0 +1,161 @@
+# services/rate_limit.py
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = 0.5, cap: float = 30.0) -> float:
+    """
+    Delay before retry number `attempt` (0-based). Honors Retry-After when the
+    server sent one, otherwise exponential backoff with full jitter.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class RateGovernor:
+    """
+    AIMD concurrency governor for requests against one API.
+
+    The number of concurrent requests starts at `max_concurrency`, grows by one
+    after each window of successful requests and is halved when the server
+    throttles us. A throttle response also blocks new requests until its
+    Retry-After has elapsed.
+    """
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = self.max_concurrency
+        self.throttled = 0
+        self._active = 0
+        self._successes = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one request slot for the duration of the block."""
+        cond = self._condition()
+        async with cond:
+            while self._active >= self.limit:
+                await cond.wait()
+            self._active += 1
+        try:
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            async with cond:
+                self._active -= 1
+                cond.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.limit:
+            self._successes = 0
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        self.throttled += 1
+        self._successes = 0
+        pause = retry_after if retry_after is not None else 1.0
+        self._resume_at = max(self._resume_at, now + pause)
+        # a burst of 429s from requests already in flight counts as one signal
+        if now - self._last_decrease >= pause:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self._last_decrease = now
+
+
+class Pacer:
+    """Spaces out callers so at most `rate` of them proceed per second."""
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        # reserve the next slot before sleeping so concurrent callers queue up
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class ProbeBudget:
+    """
+    Sliding one-minute budget: at most `per_minute` acquisitions in total and
+    `per_host` per host within any 60 seconds. 0 disables a limit. Not
+    thread-safe; meant for a single scheduling loop.
+    """
+    WINDOW = 60.0
+
+    def __init__(self, per_minute: int, per_host: int = 0):
+        self.per_minute = per_minute
+        self.per_host = per_host
+        self._all: Deque[float] = deque()
+        self._hosts: Dict[str, Deque[float]] = {}
+
+    def _expire(self, q: Deque[float], now: float):
+        while q and now - q[0] >= self.WINDOW:
+            q.popleft()
+
+    def try_acquire(self, host: str = '') -> bool:
+        now = time.monotonic()
+        self._expire(self._all, now)
+        if self.per_minute and len(self._all) >= self.per_minute:
+            return False
+        hq = self._hosts.get(host)
+        if hq is not None:
+            self._expire(hq, now)
+            if not hq:
+                del self._hosts[host]
+                hq = None
+        if self.per_host and hq is not None and len(hq) >= self.per_host:
+            return False
+        self._all.append(now)
+        if self.per_host:
+            self._hosts.setdefault(host, deque()).append(now)
+        return True
+
+    def next_free(self, host: Optional[str] = None) -> float:
+        """
+        Seconds until the overall budget has room again, or until both it and
+        `host`'s budget have, when a host is given (0 if they have now).
+        """
+        now = time.monotonic()
+        self._expire(self._all, now)
+        wait = 0.0
+        if self.per_minute and len(self._all) >= self.per_minute:
+            wait = self.WINDOW - (now - self._all[0])
+        hq = self._hosts.get(host) if host is not None and self.per_host else None
+        if hq:
+            self._expire(hq, now)
+            if len(hq) >= self.per_host:
+                wait = max(wait, self.WINDOW - (now - hq[0]))
+        return wait
@@ -0,0 +1,233 @@
+# services/throughput.py
+import http.client
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+CHUNK = 64 * 1024
+TS_PACKET = 188
+PCR_CLOCK = 90000         # PCR base ticks per second
+BANDWIDTH_RE = re.compile(r'BANDWIDTH=(\d+)')
+
+_local = threading.local()
+
+
+def _connection(scheme: str, netloc: str, timeout: float) -> http.client.HTTPConnection:
+    """Keep-alive connection per worker thread and host, reused across checks."""
+    pool = getattr(_local, 'pool', None)
+    if pool is None:
+        pool = _local.pool = {}
+    key = (scheme, netloc)
+    conn = pool.get(key)
+    if conn is None:
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = pool[key] = cls(netloc, timeout=timeout)
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn
+
+
+def _discard(url: str):
+    """Close the pooled connection for `url`'s host, e.g. after abandoning a body."""
+    parts = urlsplit(url)
+    conn = getattr(_local, 'pool', {}).pop((parts.scheme, parts.netloc), None)
+    if conn is not None:
+        conn.close()
+
+
+def _get(url: str, timeout: float) -> http.client.HTTPResponse:
+    """GET over the pooled connection, reconnecting once if the server dropped it."""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    for attempt in (0, 1):
+        conn = _connection(parts.scheme, parts.netloc, timeout)
+        try:
+            conn.request('GET', path, headers={'User-Agent': 'Lavf', 'Connection': 'keep-alive'})
+            return conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if attempt:
+                raise
+
+
+def _open(url: str, timeout: float, redirects: int = 5) -> Tuple[str, http.client.HTTPResponse]:
+    """GET following redirects; returns the final URL and its 200 response."""
+    for _ in range(redirects + 1):
+        resp = _get(url, timeout)
+        if resp.status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+            resp.read()
+            url = urljoin(url, resp.getheader('Location'))
+            continue
+        if resp.status != 200:
+            resp.read()
+            raise http.client.HTTPException(f"HTTP {resp.status}")
+        return url, resp
+    raise http.client.HTTPException("Too many redirects")
+
+
+class _PCRClock:
+    """
+    Media duration of an MPEG-TS byte stream from the PCRs of the first PID
+    that carries them. Fed chunk by chunk; partial packets are carried over.
+    """
+
+    def __init__(self):
+        self.buf = b''
+        self.pid = None
+        self.first = None
+        self.last = None
+
+    def feed(self, data: bytes):
+        buf = self.buf + data
+        start = buf.find(b'\x47')
+        # resync on a position where the next packet starts with a sync byte too
+        while start != -1 and start + TS_PACKET < len(buf) and buf[start + TS_PACKET] != 0x47:
+            start = buf.find(b'\x47', start + 1)
+        if start == -1:
+            self.buf = b''
+            return
+        end = start + (len(buf) - start) // TS_PACKET * TS_PACKET
+        for off in range(start, end, TS_PACKET):
+            pkt = buf[off:off + TS_PACKET]
+            if pkt[0] != 0x47 or not (pkt[3] & 0x20) or pkt[4] < 7 or not (pkt[5] & 0x10):
+                continue
+            pid = ((pkt[1] & 0x1F) << 8) | pkt[2]
+            if self.pid is None:
+                self.pid = pid
+            elif pid != self.pid:
+                continue
+            pcr = (pkt[6] << 25) | (pkt[7] << 17) | (pkt[8] << 9) | (pkt[9] << 1) | (pkt[10] >> 7)
+            if self.first is None:
+                self.first = pcr
+            self.last = pcr
+        self.buf = buf[end:]
+
+    @property
+    def seconds(self) -> float:
+        if self.first is None or self.last is None or self.last <= self.first:
+            return 0.0
+        return (self.last - self.first) / PCR_CLOCK
+
+
+def _read_for(resp: http.client.HTTPResponse, deadline: float,
+              clock: Optional[_PCRClock]) -> Tuple[int, bool]:
+    """Read `resp` until EOF or `deadline`; returns (bytes read, finished)."""
+    n = 0
+    while time.monotonic() < deadline:
+        chunk = resp.read1(CHUNK)
+        if not chunk:
+            return n, True
+        n += len(chunk)
+        if clock is not None:
+            clock.feed(chunk)
+    return n, False
+
+
+def _parse_playlist(text: str, base: str) -> Tuple[List[Tuple[str, int]], List[Tuple[str, float]], bool]:
+    """(variants as (url, bandwidth), segments as (url, duration), ended)."""
+    variants, segments = [], []
+    bandwidth = duration = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF'):
+            m = BANDWIDTH_RE.search(line)
+            bandwidth = int(m.group(1)) if m else 0
+        elif line.startswith('#EXTINF:'):
+            try:
+                duration = float(line[8:].split(',', 1)[0])
+            except ValueError:
+                duration = 0.0
+        elif line and not line.startswith('#'):
+            if bandwidth is not None:
+                variants.append((urljoin(base, line), bandwidth))
+                bandwidth = None
+            else:
+                segments.append((urljoin(base, line), duration or 0.0))
+                duration = None
+    return variants, segments, '#EXT-X-ENDLIST' in text
+
+
+def _measure_hls(url: str, text: str, deadline: float, timeout: float) -> Dict[str, float]:
+    variants, segments, ended = _parse_playlist(text, url)
+    declared = 0
+    if variants:
+        url, resp = _open(variants[0][0], timeout)
+        declared = variants[0][1]
+        text = resp.read().decode('utf-8', 'replace')
+        _, segments, ended = _parse_playlist(text, url)
+
+    # start near the live edge, like a player would
+    if not ended:
+        segments = segments[-3:]
+    seen = set()
+    total = media = busy = 0.0
+    while time.monotonic() < deadline:
+        todo = [s for s in segments if s[0] not in seen]
+        if not todo:
+            if ended:
+                break
+            time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+            _, resp = _open(url, timeout)
+            _, segments, ended = _parse_playlist(resp.read().decode('utf-8', 'replace'), url)
+            continue
+        seg_url, duration = todo[0]
+        seen.add(seg_url)
+        started = time.monotonic()
+        seg_url, resp = _open(seg_url, timeout)
+        n, finished = _read_for(resp, deadline, None)
+        busy += time.monotonic() - started
+        total += n
+        if not finished:
+            _discard(seg_url)
+            break
+        media += duration
+    # bits per second of the content itself, from whole segments and their EXTINF
+    estimated = total * 8 / media if media and total else 0
+    # only time spent downloading counts: waiting for the next playlist
+    # refresh is the player idling, not the server being slow
+    return {'bytes': total, 'seconds': busy, 'media_seconds': media,
+            'declared_bps': declared, 'estimated_bps': estimated}
+
+
+def measure_throughput(url: str, seconds: float, timeout: float = 10.0,
+                       declared_bps: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """
+    Read `url` for `seconds` (successive segments for HLS) over a pooled
+    keep-alive connection and return:
+      rate_bps   achieved download rate in bits/s
+      bitrate    reference bitrate in bits/s: `declared_bps` (from ffprobe),
+                 else the HLS variant BANDWIDTH, else estimated from segment
+                 durations or MPEG-TS PCRs; None if unknown
+      ratio      rate_bps / bitrate, None without a reference
+    Raises OSError / http.client.HTTPException on connection failures.
+    """
+    deadline = time.monotonic() + seconds
+    url, resp = _open(url, timeout)
+
+    ctype = (resp.getheader('Content-Type') or '').lower()
+    if 'mpegurl' in ctype or urlsplit(url).path.endswith('.m3u8'):
+        text = resp.read().decode('utf-8', 'replace')
+        r = _measure_hls(url, text, deadline, timeout)
+        nbytes, elapsed = r['bytes'], r['seconds']
+        reference = declared_bps or r['declared_bps'] or r['estimated_bps']
+    else:
+        clock = _PCRClock()
+        started = time.monotonic()
+        nbytes, finished = _read_for(resp, deadline, clock)
+        elapsed = time.monotonic() - started
+        if not finished:
+            # a live body never ends; drop the connection instead of draining it
+            _discard(url)
+        reference = declared_bps or (nbytes * 8 / clock.seconds if clock.seconds else 0)
+
+    rate = nbytes * 8 / elapsed if elapsed > 0 else 0.0
+    return {
+        'rate_bps': rate,
+        'bitrate': reference or None,
+        'ratio': rate / reference if reference else None,
+    }
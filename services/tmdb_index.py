@@ -0,0 +1,127 @@
+# services/tmdb_index.py
+import argparse
+import gzip
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from services.utils import normalize_title
+
+INDEX_DB = Path(".tmdb_index.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS titles (
+    key        TEXT NOT NULL,
+    media      TEXT NOT NULL,  -- 'movie' or 'tv'
+    id         INTEGER NOT NULL,
+    popularity REAL NOT NULL,
+    PRIMARY KEY (key, media, id)
+) WITHOUT ROWID;
+"""
+
+class TMDBTitleIndex:
+    """
+    Offline title → TMDB id index built from TMDB's daily ID exports
+    (movie_ids_MM_DD_YYYY.json.gz, tv_series_ids_MM_DD_YYYY.json.gz).
+    Titles are stored under their normalize_title() key; when several ids
+    share a key the most popular one wins.
+    """
+    BATCH_SIZE = 5000
+
+    def __init__(self, path: Path = INDEX_DB):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def open_existing(cls, path: Optional[Path]) -> Optional["TMDBTitleIndex"]:
+        """The index at `path`, or None when no index has been built there."""
+        if path and Path(path).exists():
+            return cls(path)
+        return None
+
+    def build(self, exports: Iterable[Path], logger=None) -> int:
+        """Ingest gzipped JSON-lines export files; returns the number of titles indexed."""
+        total = 0
+        for export in exports:
+            count = 0
+            batch = []
+            for row in _read_export(Path(export)):
+                batch.append(row)
+                if len(batch) >= self.BATCH_SIZE:
+                    count += self._insert(batch)
+                    batch = []
+            count += self._insert(batch)
+            total += count
+            if logger:
+                logger('info', f"Indexed {count} titles from {export}")
+        return total
+
+    def _insert(self, rows) -> int:
+        if not rows:
+            return 0
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO titles (key, media, id, popularity) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def resolve(self, title: str, media: Optional[str] = None) -> Optional[Tuple[str, int]]:
+        """(media, id) of the most popular title matching `title`, or None."""
+        key = normalize_title(title)[0]
+        if media:
+            row = self._conn.execute(
+                "SELECT media, id FROM titles WHERE key = ? AND media = ? "
+                "ORDER BY popularity DESC LIMIT 1", (key, media)
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT media, id FROM titles WHERE key = ? "
+                "ORDER BY popularity DESC LIMIT 1", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+def _read_export(path: Path) -> Iterator[Tuple[str, str, int, float]]:
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get('adult') or rec.get('video'):
+                continue
+            if 'original_title' in rec:
+                media, title = 'movie', rec['original_title']
+            elif 'original_name' in rec:
+                media, title = 'tv', rec['original_name']
+            else:
+                continue
+            key = normalize_title(title or '')[0]
+            if key and 'id' in rec:
+                yield key, media, int(rec['id']), float(rec.get('popularity') or 0)
+
+def main():
+    p = argparse.ArgumentParser(description="Build the offline TMDB title index")
+    p.add_argument("exports", nargs="+", help="TMDB daily ID export files (.json.gz)")
+    p.add_argument("-o", "--output", default=str(INDEX_DB), help="Index database to create or update")
+    args = p.parse_args()
+
+    def log(level, msg):
+        print(f"[{level.upper():7}] {msg}")
+
+    index = TMDBTitleIndex(Path(args.output))
+    total = index.build([Path(e) for e in args.exports], logger=log)
+    log('info', f"{total} titles indexed, {len(index)} in {args.output}")
+    index.close()
+
+if __name__ == "__main__":
+    main()
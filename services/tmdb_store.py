@@ -0,0 +1,190 @@
+# services/tmdb_store.py
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+CACHE_DB = Path(".tmdb_cache.db")
+LEGACY_CACHE_FILE = Path(".tmdb_cache.pkl")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key        TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS misses (
+    key        TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_info (
+    name  TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class TMDBStore:
+    """
+    SQLite-backed TMDB metadata cache.
+
+    Reads are lazy and per key (the MEMO_SIZE most recently used are kept in
+    memory); writes are buffered and committed in batches so a crash loses
+    at most one batch.
+    WAL mode lets several sorters share the same file.
+    """
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 5.0  # seconds
+    MEMO_SIZE = 4096  # decoded entries kept in memory, least recently used dropped first
+
+    def __init__(self, path: Path = CACHE_DB, legacy_pickle: Optional[Path] = LEGACY_CACHE_FILE):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._memo: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._pending_misses: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        if legacy_pickle is not None:
+            self.import_pickle(Path(legacy_pickle))
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[dict]:
+        """Cached value for `key`, or None if missing or older than `ttl` seconds."""
+        row = self.get_with_time(key)
+        if row is None:
+            return None
+        data, fetched_at = row
+        if ttl is not None and time.time() - fetched_at > ttl:
+            return None
+        return data
+
+    def get_with_time(self, key: str) -> Optional[Tuple[dict, float]]:
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+            row = self._pending.get(key)  # queued, but dropped from the memo
+            if row is None:
+                row = self._conn.execute(
+                    "SELECT data, fetched_at FROM metadata WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            value = (json.loads(row[0]), row[1])
+            self._remember(key, value)
+            return value
+
+    def _remember(self, key: str, value: Tuple[dict, float]):
+        self._memo[key] = value
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.MEMO_SIZE:
+            self._memo.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_with_time(key) is not None
+
+    def put(self, key: str, data: dict, fetched_at: Optional[float] = None):
+        """Queue `data` for `key`; committed with the next batch."""
+        ts = time.time() if fetched_at is None else fetched_at
+        with self._lock:
+            self._remember(key, (data, ts))
+            self._pending[key] = (json.dumps(data, ensure_ascii=False), ts)
+            self._pending_misses.pop(key, None)
+            self._maybe_flush()
+
+    def is_miss(self, key: str, ttl: float) -> bool:
+        """True if `key` had no TMDB match less than `ttl` seconds ago."""
+        with self._lock:
+            ts = self._pending_misses.get(key)
+            if ts is None:
+                row = self._conn.execute(
+                    "SELECT fetched_at FROM misses WHERE key = ?", (key,)
+                ).fetchone()
+                ts = row[0] if row is not None else None
+        return ts is not None and time.time() - ts <= ttl
+
+    def put_miss(self, key: str):
+        """
+        Queue a failed lookup for the next batch, like put(); misses expire
+        instead of being cached forever.
+        """
+        with self._lock:
+            self._pending_misses[key] = time.time()
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (len(self._pending) + len(self._pending_misses) >= self.BATCH_SIZE
+                or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL):
+            self.flush()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memo.pop(key, None)
+            self._pending.pop(key, None)
+            with self._conn:
+                self._conn.execute("DELETE FROM metadata WHERE key = ?", (key,))
+
+    def flush(self):
+        """Commit all buffered writes in one transaction."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._pending_misses:
+                return
+            rows = [(k, d, ts) for k, (d, ts) in self._pending.items()]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO metadata (key, data, fetched_at) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._conn.executemany(
+                    "DELETE FROM misses WHERE key = ?", [(r[0],) for r in rows]
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO misses (key, fetched_at) VALUES (?, ?)",
+                    self._pending_misses.items()
+                )
+            self._pending.clear()
+            self._pending_misses.clear()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def import_pickle(self, path: Path) -> int:
+        """
+        One-time import of the old whole-file pickle cache.
+        Entries already in the store win; returns the number of rows imported.
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM store_info WHERE name = 'imported_pickle'"
+            ).fetchone()
+            if done or not path.exists():
+                return 0
+            try:
+                with open(path, "rb") as f:
+                    legacy = pickle.load(f)
+            except Exception:
+                legacy = {}
+            ts = path.stat().st_mtime
+            rows = [
+                (k, json.dumps(v or {}, ensure_ascii=False), ts)
+                for k, v in legacy.items() if isinstance(k, str)
+            ]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO metadata (key, data, fetched_at) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO store_info (name, value) VALUES ('imported_pickle', ?)",
+                    (str(path),)
+                )
+            return len(rows)
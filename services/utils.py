@@ -1,4 +1,8 @@
 import re
+import unicodedata
+from fnmatch import fnmatchcase
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 # Superscript quality labels
 QUALITY_LABELS = {
@@ -75,3 +79,68 @@ class RegexRules:
     YEAR_RE    = re.compile(r'\b(19|20)\d{2}\b')
     MULTI_RE   = re.compile(r'\(MULTI\)', re.IGNORECASE)
     EPISODE_RE = re.compile(r'\bS\d{2}E\d{2}\b')
+
+
+_BRACKETS_RE = re.compile(r'(?:\s*(?:\([^)]*\)|\[[^\]]*\]))+\s*$')
+_APOSTROPHE_RE = re.compile(r"['’`´]")
+_PUNCT_RE = re.compile(r'[^\w\s]|_')
+
+
+def normalize_title(title: str) -> Tuple[str, Optional[int]]:
+    """
+    Fold a title into a lookup key and split out its release year.
+    Case, diacritics, punctuation and trailing bracketed qualifiers are dropped, so
+    "The Office", "the office" and "The Office (US)" share one key.
+    E.g. "Amélie (2001)" → ("amelie", 2001).
+    """
+    m = RegexRules.YEAR_RE.search(title)
+    year = int(m.group(0)) if m else None
+    key = fold_text(_BRACKETS_RE.sub(' ', RegexRules.YEAR_RE.sub(' ', title)))
+    if not key:
+        # titles like "1917" are nothing but a year
+        key = fold_text(title)
+        year = None if key == str(year) else year
+    return key, year
+
+
+def fold_text(text: str) -> str:
+    """Casefold, drop diacritics, apostrophes and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold().replace('&', ' and ')
+    text = _APOSTROPHE_RE.sub('', text)
+    text = _PUNCT_RE.sub(' ', text)
+    return ' '.join(text.split())
+
+
+# Query parameters that change per request/session without changing the stream.
+# Only names that are unambiguous; ignoring a parameter that identifies the
+# stream would merge different channels into one check.
+VOLATILE_PARAMS = ('token', 'auth*', 'signature', 'wmsauthsign', 'expires', 'nonce', 'session*')
+# Short or generic names some providers use for tokens and others for the
+# stream itself (e.g. sid=<service id>); opt-in, per provider
+SHORT_VOLATILE_PARAMS = ('sig', 'hash', 'exp', 'e', 'st', 'ts', 't', 'timestamp', 'sid', '_')
+
+
+def normalize_url(url: str, volatile: Iterable[str] = VOLATILE_PARAMS) -> str:
+    """
+    Key identifying the stream behind a URL: scheme and host lowercased,
+    default port, fragment and query parameters matching any `volatile`
+    glob pattern (case-insensitive) dropped, remaining parameters sorted.
+    E.g. "HTTP://Host:80/live/1.ts?b=2&token=x&a=1" → "http://host/live/1.ts?a=1&b=2".
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    if '@' in parts.netloc:
+        host = f"{parts.netloc.rsplit('@', 1)[0]}@{host}"
+    patterns = [p.lower() for p in volatile]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not any(fnmatchcase(k.lower(), p) for p in patterns))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
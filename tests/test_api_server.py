@@ -0,0 +1,155 @@
+# tests/test_api_server.py
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer
+
+import services.api_server as api_server
+from config import ApiConfig
+from services.api_server import ApiServer
+from services.history_store import HistoryStore
+from services.utils import normalize_url
+
+URL = "http://h/one.ts"
+
+
+class FakeProbe:
+    """Stands in for check_stream; records the URLs and blocks while `gate` is clear."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, name, url, timeout, timings=None, **kwargs):
+        self.calls.append(url)
+        self.gate.wait(5)
+        return 'UP', '1920×1080', '', '25 fps'
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    fake = FakeProbe()
+    monkeypatch.setattr(api_server, 'check_stream', fake)
+    return fake
+
+
+def _run(tmp_path, scenario, **cfg_args):
+    playlist = tmp_path / "in.m3u"
+    playlist.write_text(f'#EXTM3U\n#EXTINF:-1 CUID="7" group-title="G",One\n{URL}\n', encoding='utf-8')
+    cfg = ApiConfig(playlist, [], state_db=tmp_path / "state.db",
+                    history_db=tmp_path / "history.db", **cfg_args)
+
+    async def main():
+        server = ApiServer(cfg, logger=lambda level, msg: None)
+        server._loop = asyncio.get_running_loop()
+        server._stop_event = asyncio.Event()
+        server.index.load(str(cfg.m3u_file), cfg.selected_groups)
+        server._history = HistoryStore(cfg.history_db)
+        client = TestClient(TestServer(server.make_app()))
+        await client.start_server()
+        try:
+            return await scenario(server, client)
+        finally:
+            await client.close()
+            server._executor.shutdown(wait=True)
+            server._writer.shutdown(wait=True)
+            server._history.close()
+
+    return asyncio.run(main())
+
+
+def test_check_by_id_is_indexed_and_recorded(tmp_path, probes):
+    async def scenario(server, client):
+        resp = await client.post('/check', json={'id': '7'})
+        assert resp.status == 200
+        assert (await resp.json())['status'] == 'UP'
+        await asyncio.sleep(0)  # _probe_done runs via call_soon_threadsafe
+        return server
+
+    server = _run(tmp_path, scenario)
+    assert probes.calls == [URL]
+    assert server.index.results[normalize_url(URL)]['source'] == 'on-demand'
+    assert HistoryStore(tmp_path / "history.db").channel(normalize_url(URL)).checks == 1
+
+
+def test_history_is_written_off_the_event_loop(tmp_path, probes, monkeypatch):
+    writers = []
+    record = HistoryStore.record
+
+    def spy(self, *args, **kwargs):
+        writers.append(threading.current_thread())
+        return record(self, *args, **kwargs)
+
+    monkeypatch.setattr(HistoryStore, 'record', spy)
+
+    async def scenario(server, client):
+        assert (await client.post('/check', json={'id': '7'})).status == 200
+        return threading.current_thread()
+
+    loop_thread = _run(tmp_path, scenario)
+    assert len(writers) == 1 and writers[0] is not loop_thread
+
+
+@pytest.mark.parametrize('url', ["http://10.0.0.1/admin", "file:///etc/passwd",
+                                 "concat:/etc/passwd|/etc/hosts"])
+def test_urls_outside_the_playlist_are_refused(tmp_path, probes, url):
+    async def scenario(server, client):
+        return (await client.post('/check', json={'url': url})).status
+
+    assert _run(tmp_path, scenario) == 403
+    assert probes.calls == []
+
+
+def test_url_of_an_indexed_channel_is_accepted(tmp_path, probes):
+    async def scenario(server, client):
+        return (await client.post('/check', json={'url': URL})).status
+
+    assert _run(tmp_path, scenario) == 200
+    assert probes.calls == [URL]
+
+
+def test_allow_urls_probes_only_http_and_keeps_nothing(tmp_path, probes):
+    async def scenario(server, client):
+        refused = (await client.post('/check', json={'url': "file:///etc/passwd"})).status
+        resp = await client.post('/check', json={'url': "https://other/two.ts"})
+        await asyncio.sleep(0)
+        return server, refused, resp.status
+
+    server, refused, status = _run(tmp_path, scenario, allow_urls=True)
+    assert refused == 400 and status == 200
+    assert probes.calls == ["https://other/two.ts"]
+    assert server.index.results == {}
+    assert HistoryStore(tmp_path / "history.db").channels() == []
+
+
+def test_concurrent_checks_share_one_probe(tmp_path, probes):
+    probes.gate.clear()
+
+    async def scenario(server, client):
+        pending = [asyncio.ensure_future(client.post('/check', json={'id': '7'})) for _ in range(3)]
+        await asyncio.sleep(0.2)
+        probes.gate.set()
+        return [r.status for r in await asyncio.gather(*pending)]
+
+    assert _run(tmp_path, scenario) == [200, 200, 200]
+    assert probes.calls == [URL]
+
+
+def test_check_waits_for_a_probe_the_monitor_is_running(tmp_path, probes):
+    async def scenario(server, client):
+        key = normalize_url(URL)
+        fut, own = server._probes.claim(key)  # as the monitor thread does on dispatch
+        assert own
+        pending = asyncio.ensure_future(client.post('/check', json={'id': '7'}))
+        await asyncio.sleep(0.1)
+        assert not pending.done()
+        server._probes.finish(key, fut, {'status': 'FROZEN', 'checked_at': 1.0, 'source': 'monitor'})
+        return await (await pending).json()
+
+    body = _run(tmp_path, scenario)
+    assert body['status'] == 'FROZEN' and body['source'] == 'monitor'
+    assert probes.calls == []
@@ -0,0 +1,63 @@
+# tests/test_checker.py
+import io
+import os
+import sys
+import time
+
+import pytest
+
+from checker import _watch_probe_log, check_stream
+
+# a debug log line with metadata that is not UTF-8, as IPTV services send them
+BAD_LINE = b"    service_name    : Caf\xe9 \xff\xfe TV\n"
+MARKERS = (b"[tcp @ 0x1] Starting connection attempt to 10.0.0.1 port 80\n"
+           b"[tcp @ 0x1] Successfully connected to 10.0.0.1 port 80\n"
+           b"[mpegts @ 0x2] probed with size=2048\n")
+PROBE_OUT = "1920\n1080\n25/1\n4000000\n"
+
+
+def _fake_tools(tmp_path, monkeypatch, probe_body: str):
+    """Put fake ffprobe/ffmpeg executables first on PATH."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffprobe").write_text(f"#!{sys.executable}\nimport sys\n{probe_body}\n")
+    (bin_dir / "ffmpeg").write_text(f"#!{sys.executable}\n")  # blackdetect finds nothing
+    for tool in ("ffprobe", "ffmpeg"):
+        os.chmod(bin_dir / tool, 0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_watcher_survives_invalid_bytes_and_drains_a_large_log():
+    log = BAD_LINE * 20000 + MARKERS + BAD_LINE * 20000
+    events = {}
+    _watch_probe_log(io.TextIOWrapper(io.BytesIO(log), encoding='utf-8', errors='replace'), events)
+    assert set(events) == {'dns', 'connect', 'first_byte'}
+
+
+def test_probe_with_a_large_non_utf8_debug_log_is_up(tmp_path, monkeypatch):
+    # far more stderr than a pipe buffer holds, so ffprobe blocks unless it is drained
+    _fake_tools(tmp_path, monkeypatch,
+                f"sys.stderr.buffer.write({BAD_LINE * 50000 + MARKERS!r})\n"
+                f"sys.stdout.write({PROBE_OUT!r})")
+    timings = {}
+    t0 = time.monotonic()
+    status, res, br, fps = check_stream("x", "http://h/x.ts", timeout=5.0, timings=timings,
+                                        analysis='full')
+    assert (status, res, br, fps) == ('UP', '1920×1080', '4000000', '25')
+    assert time.monotonic() - t0 < 4.0
+    assert {'spawn', 'dns', 'connect', 'first_byte', 'probe', 'analysis'} <= set(timings)
+    assert 'wait' not in timings
+
+
+@pytest.mark.parametrize('pad_down', [True, False])
+def test_down_is_padded_only_when_asked(tmp_path, monkeypatch, pad_down):
+    _fake_tools(tmp_path, monkeypatch, "sys.exit(1)")
+    timings = {}
+    t0 = time.monotonic()
+    assert check_stream("x", "http://h/x.ts", timeout=1.0, timings=timings,
+                        pad_down=pad_down)[0] == 'DOWN'
+    elapsed = time.monotonic() - t0
+    if pad_down:
+        assert elapsed >= 1.0 and 'wait' in timings
+    else:
+        assert elapsed < 1.0 and 'wait' not in timings
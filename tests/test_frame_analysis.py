@@ -0,0 +1,77 @@
+# tests/test_frame_analysis.py
+import os
+import sys
+
+import pytest
+
+from services.frame_analysis import (FRAME_SIZE, FROZEN_DIFF, FROZEN_MIN_SPAN, SAMPLE_SECONDS,
+                                     classify_frames, grab_frames)
+
+PX = FRAME_SIZE[0] * FRAME_SIZE[1]
+
+
+def _fake_ffmpeg(tmp_path, monkeypatch, body: str):
+    """Put a fake ffmpeg first on PATH; it writes its arguments to args.txt."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffmpeg").write_text(
+        f"#!{sys.executable}\nimport sys\n"
+        f"open({str(tmp_path / 'args.txt')!r}, 'w').write('\\n'.join(sys.argv[1:]))\n{body}\n")
+    os.chmod(bin_dir / "ffmpeg", 0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return tmp_path / "args.txt"
+
+
+def test_keyframe_read_is_bounded_by_stream_time(tmp_path, monkeypatch):
+    args = _fake_ffmpeg(tmp_path, monkeypatch, f"sys.stdout.buffer.write(bytes(range(64)) * {2 * PX // 64})")
+    data, ttff, _ = grab_frames("http://h/x.ts", 5, timeout=4.0)
+    assert len(data) == 2 * PX and ttff is not None
+    argv = args.read_text().split('\n')
+    assert argv.index('-t') < argv.index('-i')  # an input option: stop reading the stream
+    assert float(argv[argv.index('-t') + 1]) == SAMPLE_SECONDS
+
+    grab_frames("http://h/x.ts", 5, timeout=1.5)
+    argv = args.read_text().split('\n')
+    assert float(argv[argv.index('-t') + 1]) == 1.5
+
+
+def _frames(*pixels: int) -> bytes:
+    """Flat-ish frames: a mid-grey gradient shifted by each value in `pixels`."""
+    return b''.join(bytes((i % 64 + 100 + p) % 256 for i in range(PX)) for p in pixels)
+
+
+def test_static_but_live_sample_within_a_short_span_is_live():
+    # a slide or test card: keyframes barely differ, but only 1.2 s of stream was seen
+    result = classify_frames(_frames(0, 0, 0, 0, 0), span=1.2)
+    assert result['motion'] == 0.0 and result['status'] == 'LIVE'
+    assert classify_frames(_frames(0, 0, 0, 0, 0), span=FROZEN_MIN_SPAN)['status'] == 'FROZEN'
+
+
+def test_two_frame_sample_needs_the_minimum_span():
+    data = _frames(0, 0)
+    assert classify_frames(data)['status'] == 'LIVE'  # span unknown
+    assert classify_frames(data, span=0.5)['status'] == 'LIVE'
+    assert classify_frames(data, span=2.5)['status'] == 'FROZEN'
+    assert classify_frames(_frames(0, 30), span=2.5)['status'] == 'LIVE'
+
+
+def test_frozen_threshold_is_configurable():
+    data = _frames(0, 1, 0, 1)
+    assert classify_frames(data, span=3.0, frozen_diff=0.5)['status'] == 'LIVE'
+    assert classify_frames(data, span=3.0, frozen_diff=FROZEN_DIFF)['status'] == 'FROZEN'
+    assert classify_frames(_frames(0, 0), span=3.0, frozen_diff=0)['status'] == 'LIVE'
+
+
+def test_black_sample_is_black_screen_whatever_the_span():
+    assert classify_frames(bytes(3 * PX))['status'] == 'BLACK_SCREEN'
+
+
+def test_span_comes_from_showinfo_timestamps(tmp_path, monkeypatch):
+    showinfo = ''.join(f"[Parsed_showinfo_2 @ 0x1] n:{i} pts:{i} pts_time:{1.5 + i * 0.8} pos:0\n"
+                       for i in range(4))
+    _fake_ffmpeg(tmp_path, monkeypatch,
+                 f"sys.stderr.buffer.write(b'\\xff\\xfe garbage\\n' + {showinfo!r}.encode())\n"
+                 f"sys.stdout.buffer.write(bytes(3 * {PX}))")
+    data, _, span = grab_frames("http://h/x.ts", 5, timeout=4.0)
+    assert len(data) == 3 * PX
+    assert span == pytest.approx(1.6)  # frames 0-2; the fourth timestamp has no frame
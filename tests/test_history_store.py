@@ -0,0 +1,31 @@
+# tests/test_history_store.py
+import pytest
+
+from services.history_store import HistoryStore, history_key
+from services.utils import SHORT_VOLATILE_PARAMS, normalize_url
+
+URL = "http://h/live/one.m3u8?token=abc&t=5"
+
+
+def test_history_key_ignores_the_writers_volatile_list():
+    assert history_key(URL) == normalize_url(URL)
+    assert history_key(URL) == history_key("http://h/live/one.m3u8?t=5&token=xyz")
+    # a GUI deduplicating with the short names still records under the default key
+    assert normalize_url(URL, SHORT_VOLATILE_PARAMS) != history_key(URL)
+
+
+def test_checks_of_one_stream_roll_up_under_one_key(tmp_path):
+    store = HistoryStore(tmp_path / "history.db")
+    for ts, (token, status, ttff) in enumerate([("a", 'UP', 1.0), ("b", 'DOWN', None),
+                                                ("c", 'UP', 3.0)]):
+        url = f"http://h/live/one.m3u8?token={token}&t=5"
+        store.record(history_key(url), status, 'G', 'One', ttff, '1920×1080', '25', ts=ts * 60)
+    store.flush()
+    [ch] = store.channels()
+    assert ch.key == history_key(URL)
+    assert ch.checks == 3 and ch.changes == 2 and ch.status == 'UP'
+    assert ch.uptime == pytest.approx(2 / 3)
+    assert ch.mean_ttff == pytest.approx(2.0)
+    assert ch.flap == pytest.approx(0.7 + 1)
+    assert store.groups()['G']['channels'] == 1
+    store.close()
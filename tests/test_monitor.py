@@ -0,0 +1,187 @@
+# tests/test_monitor.py
+import threading
+import time
+
+import pytest
+
+import services.monitor as monitor_module
+import services.rate_limit as rate_limit
+from config import MonitorConfig
+from services.monitor import ChannelMonitor, FLAP_THRESHOLD
+from services.monitor_store import ChannelState, MonitorStore
+from services.rate_limit import ProbeBudget
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', c)
+    return c
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    playlist = tmp_path / "in.m3u"
+    playlist.write_text('#EXTM3U\n#EXTINF:-1 group-title="G",One\nhttp://h/one.ts\n', encoding='utf-8')
+    cfg = MonitorConfig(playlist, tmp_path, [], min_interval=300.0, max_interval=3600.0,
+                        dead_retry=30.0, dead_retries=4, state_db=tmp_path / "state.db",
+                        history_db=None)
+    mon = ChannelMonitor(cfg, logger=lambda level, msg: None)
+    mon.store = MonitorStore(cfg.state_db)
+    mon.channels = {'k': ChannelState('k', 'http://h/one.ts')}
+    yield mon
+    mon.store.close()
+
+
+def _feed(mon, statuses):
+    intervals = []
+    for st in statuses:
+        mon._on_result('k', st)
+        intervals.append(mon.channels['k'].interval)
+    return intervals
+
+
+# --- ProbeBudget --------------------------------------------------------------
+
+def test_budget_caps_total_per_minute(clock):
+    budget = ProbeBudget(per_minute=2)
+    assert budget.try_acquire('a') and budget.try_acquire('b')
+    assert not budget.try_acquire('c')
+    clock.now += 20
+    assert budget.next_free() == pytest.approx(40)
+    clock.now += 40
+    assert budget.next_free() == 0.0
+    assert budget.try_acquire('c')
+
+
+def test_budget_caps_each_host_separately(clock):
+    budget = ProbeBudget(per_minute=0, per_host=1)
+    assert budget.try_acquire('a')
+    assert not budget.try_acquire('a')
+    assert budget.try_acquire('b')
+    assert budget.next_free() == 0.0  # overall budget unlimited
+
+
+def test_budget_next_free_reports_host_room(clock):
+    budget = ProbeBudget(per_minute=100, per_host=2)
+    budget.try_acquire('a')
+    clock.now += 10
+    budget.try_acquire('a')
+    clock.now += 5
+    assert budget.next_free('a') == pytest.approx(45)
+    assert budget.next_free('b') == 0.0
+    clock.now += 45
+    assert budget.next_free('a') == 0.0
+    assert budget.try_acquire('a')
+
+
+# --- scheduling ---------------------------------------------------------------
+
+def test_stable_channel_backs_off_to_max_interval(monitor):
+    assert _feed(monitor, ['UP'] * 6) == [300, 600, 1200, 2400, 3600, 3600]
+
+
+def test_channel_that_goes_down_is_retried_fast(monitor):
+    intervals = _feed(monitor, ['UP', 'UP', 'UP'] + ['DOWN'] * 6)
+    assert intervals[3:7] == [30, 60, 120, 240]
+    # after dead_retries the channel backs off like any stable one
+    assert intervals[7:] == [600, 1200]
+
+
+def test_status_change_resets_streak_and_scores_flapping(monitor):
+    _feed(monitor, ['UP', 'UP'])
+    ch = monitor.channels['k']
+    assert ch.streak == 2 and ch.flap == 0.0
+    _feed(monitor, ['SLOW'])
+    assert ch.streak == 1 and ch.prev_status == 'UP' and ch.flap == pytest.approx(1.0)
+    assert ch.interval == 300  # still live: back to min_interval, no fast retries
+
+
+def test_flapping_channel_stays_at_min_interval(monitor):
+    _feed(monitor, ['UP', 'DOWN', 'UP', 'DOWN'])
+    ch = monitor.channels['k']
+    assert ch.flap >= FLAP_THRESHOLD
+    # no dead-channel retries and no backoff while the score stays high
+    assert _feed(monitor, ['DOWN', 'UP']) == [300, 300]
+
+
+def test_flap_score_decays_while_stable(monitor):
+    _feed(monitor, ['UP', 'DOWN', 'UP', 'DOWN', 'UP'])
+    peak = monitor.channels['k'].flap
+    _feed(monitor, ['UP'] * 5)
+    assert monitor.channels['k'].flap < min(peak, FLAP_THRESHOLD)
+
+
+# --- outputs ------------------------------------------------------------------
+
+def test_forced_write_leaves_current_files_untouched(monitor, tmp_path):
+    monitor._reload_if_changed()
+    key = next(iter(monitor.channels))
+    monitor._on_result(key, 'UP')
+    monitor._write_outputs(force=True)
+    working = tmp_path / "in_working.m3u"
+    assert "http://h/one.ts" in working.read_text(encoding='utf-8')
+    mtime = working.stat().st_mtime_ns
+
+    written = []
+    restarted = ChannelMonitor(monitor.cfg, logger=lambda level, msg: written.append(msg))
+    restarted.store = monitor.store
+    restarted.channels = dict(monitor.channels)
+    restarted._reload_if_changed()
+    restarted._write_outputs(force=True)
+    assert not [m for m in written if m.startswith("Updated")]
+    assert working.stat().st_mtime_ns == mtime
+
+
+def test_probe_run_by_someone_else_only_updates_the_schedule(monitor):
+    seen = []
+    monitor.on_result = seen.append
+    fut, own = monitor.probes.claim('k')  # e.g. an on-demand check of the API
+    monitor.probes.finish('k', fut, {'status': 'DOWN', 'checked_at': 1.0, 'source': 'on-demand'})
+    monitor._on_probe('k', fut, own=False)
+    ch = monitor.channels['k']
+    assert ch.status == 'DOWN' and ch.interval == 300
+    assert seen == []  # the API publishes and records its own probes
+    assert monitor.probes.get('k') is None
+
+
+def test_saturated_monitor_waits_for_results_instead_of_spinning(tmp_path, monkeypatch):
+    release = threading.Event()
+    checked = []
+
+    def slow_check_stream(name, url, timeout, **kwargs):
+        checked.append(url)
+        release.wait(5)
+        return 'UP', '1280×720', '', '25'
+
+    monkeypatch.setattr(monitor_module, 'check_stream', slow_check_stream)
+    playlist = tmp_path / "in.m3u"
+    playlist.write_text("#EXTM3U\n" + "".join(
+        f'#EXTINF:-1 group-title="G",Ch {i}\nhttp://h{i}/s.ts\n' for i in range(5)), encoding='utf-8')
+    cfg = MonitorConfig(playlist, tmp_path, [], max_workers=2, analysis='full',
+                        state_db=tmp_path / "state.db", history_db=None)
+    mon = ChannelMonitor(cfg, logger=lambda level, msg: None)
+    passes = []
+    write_outputs = mon._write_outputs
+    monkeypatch.setattr(mon, '_write_outputs', lambda force=False: (passes.append(force),
+                                                                    write_outputs(force)))
+    thread = threading.Thread(target=mon.start)
+    thread.start()
+    time.sleep(1.5)
+    busy_passes = len(passes)
+    release.set()
+    time.sleep(0.5)
+    mon.stop()
+    thread.join(5)
+
+    assert len(checked) == 5  # three waited for a free worker, none was probed twice
+    assert busy_passes <= 4   # one wake-up per IDLE_SLEEP, not every 50 ms
+    assert all(ch.status == 'UP' for ch in mon.channels.values())
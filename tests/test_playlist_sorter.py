@@ -0,0 +1,33 @@
+# tests/test_playlist_sorter.py
+import asyncio
+
+from config import SortConfig
+from services.playlist_sorter import PlaylistSorter
+from services.tmdb_store import TMDBStore
+from tmdb_client import TMDBClient
+
+TITLES = ["Alpha", "Beta", "Gamma", "Delta", "Alpha", "Alpha"]
+
+
+def test_lookups_are_dropped_once_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(PlaylistSorter, 'WINDOW', 1)
+    playlist = tmp_path / "in.m3u"
+    playlist.write_text("#EXTM3U\n" + "".join(
+        f'#EXTINF:-1 group-title="Movies",{t}\nhttp://h/{i}.mp4\n' for i, t in enumerate(TITLES)),
+        encoding='utf-8')
+    store = TMDBStore(tmp_path / "cache.db", legacy_pickle=None)
+    for t in set(TITLES):
+        store.put(TMDBClient._key(t), {"title": t, "genres": [{"id": 18, "name": "Drama"}]})
+    cfg = SortConfig(playlist, tmp_path, [], tmdb_api_key="unused", max_workers=1)
+    client = TMDBClient(cfg.tmdb_api_key, cfg.genre_map, store=store)
+    out = tmp_path / "in_sorted.m3u"
+
+    assert asyncio.run(PlaylistSorter(cfg, logger=lambda level, msg: None)._stream(client, out))
+    client.close()
+
+    # the first "Alpha" was written before the second was read: it is looked
+    # up again (from the store); the third still shares the second's lookup
+    assert client.cache_hits == 5
+    lines = out.read_text(encoding='utf-8').splitlines()
+    assert [line.rsplit(',', 1)[1] for line in lines[1::2]] == TITLES
+    assert all('group-title="Drama"' in line for line in lines[1::2])
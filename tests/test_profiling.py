@@ -0,0 +1,22 @@
+# tests/test_profiling.py
+import time
+
+from services.profiling import RunProfiler
+
+
+def test_long_runs_keep_two_snapshots_and_a_bounded_summary_ring(tmp_path):
+    profiler = RunProfiler(str(tmp_path), 'run', interval=0.01, top_n=5, keep=3)
+    with profiler:
+        held = []
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            held.append(bytearray(1024))
+            time.sleep(0.001)
+
+    assert profiler._taken > 5
+    assert len(profiler._summaries) == 3
+    assert profiler._first is not profiler._last
+    report = next(tmp_path.glob('run_*_alloc.txt')).read_text(encoding='utf-8')
+    assert f"({profiler._taken - 3} earlier interval summaries not kept)" in report
+    assert report.count('=== Allocations at') == 3
+    assert '=== services/parser.py: top 5 growth over the run ===' in report
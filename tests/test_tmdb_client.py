@@ -0,0 +1,81 @@
+# tests/test_tmdb_client.py
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from benchmarks.mock_tmdb import MockTMDB
+from services.tmdb_store import TMDBStore
+from tmdb_client import TMDBClient, TMDBError
+
+RETRY_AFTER = 0.2
+
+
+class ThrottleFirst(MockTMDB):
+    """MockTMDB that throttles the first `n` requests, then none."""
+
+    def __init__(self, n: int, **kwargs):
+        super().__init__(throttle_ratio=1.0, **kwargs)
+        self.remaining = n
+
+    def count(self, kind: str) -> bool:
+        with self._lock:
+            if self.remaining == 0:
+                self.throttle_ratio = 0.0
+            self.remaining -= 1
+        return super().count(kind)
+
+
+def _lookup(mock: MockTMDB, db, title: str):
+    """(detail or raised exception, seconds taken, client) of one lookup against `mock`."""
+    async def main():
+        store = TMDBStore(db, legacy_pickle=None)
+        client = TMDBClient("key", {}, store=store, api_base=mock.base_url)
+        async with aiohttp.ClientSession() as session:
+            client.session = session
+            t0 = time.monotonic()
+            try:
+                out = await client.search_and_fetch(title)
+            except TMDBError as e:
+                out = e
+            elapsed = time.monotonic() - t0
+        client.close()
+        return out, elapsed, client
+
+    return asyncio.run(main())
+
+
+def _stored(db):
+    with sqlite3.connect(str(db)) as conn:
+        return ({k for k, in conn.execute("SELECT key FROM metadata")},
+                {k for k, in conn.execute("SELECT key FROM misses")})
+
+
+def test_throttled_requests_are_retried_after_retry_after(tmp_path):
+    with ThrottleFirst(2, retry_after=RETRY_AFTER) as mock:
+        detail, elapsed, client = _lookup(mock, tmp_path / "cache.db", "Heat")
+    assert detail and detail["id"]
+    # search throttled twice, then search and the genre table succeed
+    assert mock.counts["throttled"] == 2 and mock.counts["total"] == 4
+    assert client.governor.throttled == 2
+    assert elapsed >= 2 * RETRY_AFTER
+    metadata, misses = _stored(tmp_path / "cache.db")
+    assert "heat" in metadata and misses == set()
+
+
+def test_lookup_that_stays_throttled_is_never_cached(tmp_path):
+    db = tmp_path / "cache.db"
+    with MockTMDB(throttle_ratio=1.0, retry_after=RETRY_AFTER) as mock:
+        error, elapsed, client = _lookup(mock, db, "Heat")
+    assert isinstance(error, TMDBError) and "429" in str(error)
+    assert mock.counts["total"] == TMDBClient.MAX_RETRIES + 1
+    assert elapsed >= TMDBClient.MAX_RETRIES * RETRY_AFTER
+    # neither the 429 bodies nor a "no result" marker were stored
+    assert _stored(db) == (set(), set())
+
+    with MockTMDB(retry_after=RETRY_AFTER) as mock:
+        detail, _, _ = _lookup(mock, db, "Heat")
+    assert detail and mock.counts["total"] == 2  # looked up afresh once the API answers
@@ -0,0 +1,99 @@
+# tests/test_tmdb_index.py
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from config import SortConfig
+from services.playlist_sorter import PlaylistSorter
+from services.tmdb_index import TMDBTitleIndex
+from services.tmdb_store import TMDBStore
+from tmdb_client import TMDBClient
+
+FIXTURES = Path(__file__).parent / "fixtures"
+EXPORTS = [FIXTURES / "movie_ids_sample.json.gz", FIXTURES / "tv_series_ids_sample.json.gz"]
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = TMDBTitleIndex(tmp_path / "index.db")
+    idx.build(EXPORTS)
+    yield idx
+    idx.close()
+
+
+def test_build_skips_adult_video_and_broken_lines(tmp_path):
+    idx = TMDBTitleIndex(tmp_path / "index.db")
+    assert idx.build(EXPORTS) == 7
+    assert len(idx) == 7
+    assert idx.resolve("Skipped Adult Title") is None
+    assert idx.resolve("Skipped Video") is None
+    # rebuilding from the same exports replaces rows instead of duplicating them
+    assert idx.build(EXPORTS) == 7 and len(idx) == 7
+    idx.close()
+
+
+def test_lookup_prefers_the_most_popular_title(index):
+    assert index.resolve("The Matrix") == ("movie", 603)
+    assert index.resolve("The Matrix", "tv") == ("tv", 9003)
+    assert index.resolve("Breaking Bad", "movie") is None
+
+
+def test_lookup_uses_the_normalized_title(index):
+    assert index.resolve("the matrix (1999)") == ("movie", 603)
+    assert index.resolve("AMELIE") == ("movie", 194)
+    assert index.resolve("The Office (US)") == ("tv", 2316)
+    assert index.resolve("1917") == ("movie", 530915)
+    assert index.resolve("Unknown Title") is None
+
+
+def test_open_existing_needs_a_built_index(tmp_path, index):
+    assert TMDBTitleIndex.open_existing(tmp_path / "missing.db") is None
+    assert TMDBTitleIndex.open_existing(None) is None
+    found = TMDBTitleIndex.open_existing(index.path)
+    assert found.resolve("Breaking Bad") == ("tv", 1396)
+    found.close()
+
+
+def test_sorter_resolves_indexed_titles_without_the_api(tmp_path, index):
+    playlist = tmp_path / "in.m3u"
+    playlist.write_text(
+        '#EXTM3U\n'
+        '#EXTINF:-1 tvg-logo="old.png" group-title="VOD – Movies",The Matrix (1999)\n'
+        'http://h/matrix.mp4\n'
+        '#EXTINF:-1 group-title="VOD – Series",Breaking Bad S01E02\n'
+        'http://h/bb102.mp4\n'
+        '#EXTINF:-1 group-title="VOD – Series",Breaking Bad S01E03\n'
+        'http://h/bb103.mp4\n'
+        '#EXTINF:-1 group-title="Live",News 24\n'
+        'http://h/news.ts\n', encoding='utf-8')
+    store = TMDBStore(tmp_path / "cache.db", legacy_pickle=None)
+    # details cached per id by an earlier run: with the index no request is needed
+    store.put("movie:603", {"id": 603, "title": "The Matrix", "release_date": "1999-03-30",
+                            "poster_path": "/matrix.jpg", "genres": [{"id": 878, "name": "Science Fiction"}]})
+    store.put("tv:1396", {"id": 1396, "name": "Breaking Bad", "first_air_date": "2008-01-20",
+                          "genres": [{"id": 18, "name": "Drama"}]})
+    cfg = SortConfig(playlist, tmp_path, ["VOD – Movies", "VOD – Series"], tmdb_api_key="unused",
+                     max_workers=2, add_year=True, update_name=True, update_banner=True)
+    client = TMDBClient(cfg.tmdb_api_key, cfg.genre_map, store=store, index=index)
+    client.session = None  # any request would fail the lookup
+    out = tmp_path / "in_sorted.m3u"
+
+    assert asyncio.run(PlaylistSorter(cfg, logger=lambda level, msg: None)._stream(client, out))
+    client.close()
+
+    assert client.local_hits == 2 and client.governor.throttled == 0
+    assert out.read_text(encoding='utf-8') == (
+        '#EXTM3U\n'
+        '#EXTINF:-1 tvg-id="" tvg-name="The Matrix (1999)" '
+        'tvg-logo="https://image.tmdb.org/t/p/w500/matrix.jpg" '
+        'group-title="VOD – Science Fiction",The Matrix (1999)\n'
+        'http://h/matrix.mp4\n'
+        '#EXTINF:-1 tvg-id="" tvg-name="Breaking Bad (2008) S01E02" tvg-logo="" '
+        'group-title="VOD – Drama",Breaking Bad (2008) S01E02\n'
+        'http://h/bb102.mp4\n'
+        '#EXTINF:-1 tvg-id="" tvg-name="Breaking Bad (2008) S01E03" tvg-logo="" '
+        'group-title="VOD – Drama",Breaking Bad (2008) S01E03\n'
+        'http://h/bb103.mp4\n'
+        '#EXTINF:-1 group-title="Live",News 24\n'
+        'http://h/news.ts\n')
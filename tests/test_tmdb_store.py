@@ -0,0 +1,50 @@
+# tests/test_tmdb_store.py
+import sqlite3
+
+from services.tmdb_store import TMDBStore
+
+
+def _misses(db):
+    with sqlite3.connect(str(db)) as conn:
+        return {k for k, in conn.execute("SELECT key FROM misses")}
+
+
+def test_misses_are_batched_with_the_metadata_writes(tmp_path):
+    db = tmp_path / "cache.db"
+    store = TMDBStore(db, legacy_pickle=None)
+    store.put_miss("nothing")
+    store.put_miss("gone")
+    assert store.is_miss("nothing", ttl=60) and not store.is_miss("other", ttl=60)
+    assert _misses(db) == set()  # still queued
+
+    store.put("gone", {"id": 1})  # a later match replaces the queued miss
+    assert not store.is_miss("gone", ttl=60)
+    store.flush()
+    assert _misses(db) == {"nothing"}
+    assert store.is_miss("nothing", ttl=60) and not store.is_miss("nothing", ttl=-1)
+    store.close()
+
+
+def test_a_full_batch_of_misses_is_committed(tmp_path):
+    db = tmp_path / "cache.db"
+    store = TMDBStore(db, legacy_pickle=None)
+    for i in range(TMDBStore.BATCH_SIZE):
+        store.put_miss(f"k{i}")
+    assert len(_misses(db)) == TMDBStore.BATCH_SIZE
+    store.close()
+
+
+def test_memo_keeps_only_the_most_recently_used_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(TMDBStore, "MEMO_SIZE", 2)
+    store = TMDBStore(tmp_path / "cache.db", legacy_pickle=None)
+    store.put("a", {"id": 1})
+    store.put("b", {"id": 2})
+    assert store.get("a") == {"id": 1}  # a is now more recent than b
+    store.put("c", {"id": 3})
+    assert list(store._memo) == ["a", "c"]
+    # evicted entries are read back, whether still queued or committed
+    assert store.get("b") == {"id": 2}
+    store.flush()
+    assert store.get("a") == {"id": 1} and store.get("c") == {"id": 3}
+    assert len(store._memo) == 2
+    store.close()
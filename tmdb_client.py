@@ -1,58 +1,261 @@
 # tmdb_client.py
-import pickle
-from pathlib import Path
-from typing import Dict, Optional
+import asyncio
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-import aiohttp
+from services.rate_limit import RateGovernor, backoff_delay, parse_retry_after
+from services.matcher import TitleMatcher
+from services.tmdb_index import TMDBTitleIndex
+from services.tmdb_store import TMDBStore
+from services.utils import normalize_title
 
-CACHE_FILE = Path(".tmdb_cache.pkl")
+if TYPE_CHECKING:
+    import aiohttp
+
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+DEFAULT_NEGATIVE_TTL = 3 * 86400  # seconds a "no result" is trusted
+GENRE_TABLE_TTL = 7 * 86400
+# search/multi fields carried over into a lean detail
+_LEAN_FIELDS = ("id", "media_type", "title", "name", "original_title", "original_name",
+                "release_date", "first_air_date", "poster_path", "backdrop_path", "overview")
+
+class TMDBError(Exception):
+    """A TMDB request failed or stayed throttled after all retries."""
 
 class TMDBClient:
-    def __init__(self, api_key: str, genre_map: Dict[str,str]):
+    MAX_RETRIES = 4
+
+    def __init__(self, api_key: str, genre_map: Dict[str,str],
+                 store: Optional[TMDBStore] = None, ttl: Optional[float] = None,
+                 max_concurrency: int = 10, negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 index: Optional[TMDBTitleIndex] = None, full_details: bool = False,
+                 api_base: str = TMDB_API_BASE):
         self.api_key = api_key
+        self.api_base = api_base.rstrip("/")
         self.genre_map = genre_map
-        self.session: Optional[aiohttp.ClientSession] = None
-        self._cache: Dict[str, dict] = self._load_cache()
-
-    def _load_cache(self) -> Dict[str, dict]:
-        if CACHE_FILE.exists():
-            try:
-                with open(CACHE_FILE, "rb") as f:
-                    return pickle.load(f)
-            except Exception:
-                return {}
-        return {}
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self.store = store if store is not None else TMDBStore()
+        self.ttl = ttl  # seconds before a cached lookup is refreshed; None = never
+        self.negative_ttl = negative_ttl
+        self.index = index  # optional offline title → id matcher
+        self.local_hits = 0  # titles resolved without a search request
+        self.matcher = TitleMatcher()
+        # lean mode builds details from the search result + cached genre table;
+        # full_details fetches /movie/{id} or /tv/{id} for every match
+        self.full_details = full_details
+        self._genres: Dict[str, Dict[int, str]] = {}
+        self._genre_lock: Optional[asyncio.Lock] = None
+        self.low_confidence: List[Tuple[str, str, float]] = []  # (title, match, score)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0  # lookups served by another caller's in-flight request
+        self.cache_hits = 0
+        self.governor = RateGovernor(max_concurrency)
+
+    @staticmethod
+    def _key(title: str, year: Optional[int] = None) -> str:
+        norm, found = normalize_title(title)
+        year = year or found
+        return f"{norm} ({year})" if year else norm
+
+    def _row(self, title: str, key: str) -> Optional[Tuple[dict, float]]:
+        row = self.store.get_with_time(key)
+        if row is None:
+            # entries written before keys were normalized
+            legacy = " ".join(title.split())
+            if legacy != key:
+                row = self.store.get_with_time(legacy)
+                if row is not None and row[0]:
+                    self.store.put(key, row[0], fetched_at=row[1])
+        return row
+
+    def _lookup_cached(self, title: str, key: str) -> Tuple[bool, Optional[dict]]:
+        """
+        (hit, detail) from the cache. A hit with no detail is a recent miss;
+        misses older than negative_ttl and stale details count as no hit.
+        """
+        now = time.time()
+        row = self._row(title, key)
+        if row is not None:
+            data, fetched_at = row
+            if data:
+                if self.ttl is None or now - fetched_at <= self.ttl:
+                    return True, data
+            elif now - fetched_at <= self.negative_ttl:
+                # "{}" rows are misses stored by older versions
+                return True, None
+        if self.store.is_miss(key, self.negative_ttl):
+            return True, None
+        return False, None
+
+    def is_cached(self, title: str, year: Optional[int] = None) -> bool:
+        """True if search_and_fetch would be answered without an API request."""
+        return self._lookup_cached(title, self._key(title, year))[0]
+
+    def cached(self, title: str, year: Optional[int] = None) -> Optional[dict]:
+        """Cached detail for `title` (may be stale), or None if never found."""
+        row = self._row(title, self._key(title, year))
+        return row[0] or None if row is not None else None
 
     def save_cache(self):
-        with open(CACHE_FILE, "wb") as f:
-            pickle.dump(self._cache, f)
+        self.store.flush()
+
+    def close(self):
+        self.store.close()
 
-    async def search_and_fetch(self, title: str) -> Optional[dict]:
-        if title in self._cache:
-            return self._cache[title]
+    async def search_and_fetch(self, title: str, year: Optional[int] = None,
+                               media: Optional[str] = None) -> Optional[dict]:
+        """
+        Cached lookup of `title`. Concurrent callers for the same key share a
+        single in-flight request instead of each hitting the API. `year` and
+        `media` ('movie'/'tv') are hints for picking the best search result.
+        """
+        key = self._key(title, year)
+        hit, detail = self._lookup_cached(title, key)
+        if hit:
+            self.cache_hits += 1
+            return detail
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            detail = await self._search(title, key, year, media)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            fut.set_result(detail)
+            return detail
+        finally:
+            del self._inflight[key]
+
+    async def _search(self, title: str, key: str,
+                      year: Optional[int] = None, media: Optional[str] = None) -> Optional[dict]:
+        # 0) Resolve the id offline; only the details request remains
+        if self.index is not None:
+            local = (media and self.index.resolve(title, media)) or self.index.resolve(title)
+            if local:
+                self.local_hits += 1
+                detail = await self._fetch_details(*local)
+                self.store.put(key, detail)
+                return detail
 
         # 1) Search multi
-        url_search = "https://api.themoviedb.org/3/search/multi"
+        url_search = f"{self.api_base}/search/multi"
         params = {"api_key": self.api_key, "query": title}
-        async with self.session.get(url_search, params=params) as resp:
-            data = await resp.json()
+        data = await self._get_json(url_search, params)
         results = data.get("results", [])
         detail = None
-        if results:
-            first = results[0]
-            media = first["media_type"]
-            _id = first["id"]
-            detail = await self._fetch_details(media, _id)
+        # 2) Rank every candidate locally; fetch details for the best only
+        best, score = self.matcher.best(title, results, year, media)
+        if best is not None:
+            if score < self.matcher.MIN_CONFIDENCE:
+                match = best.get("title") or best.get("name") or ""
+                self.low_confidence.append((title, match, score))
+            if self.full_details:
+                detail = await self._fetch_details(best["media_type"], best["id"])
+            else:
+                detail = await self._lean_detail(best)
 
-        self._cache[title] = detail or {}
+        if detail:
+            self.store.put(key, detail)
+        else:
+            self.store.put_miss(key)
         return detail
 
     async def _fetch_details(self, media: str, _id: int) -> dict:
         kind = "movie" if media == "movie" else "tv"
-        url = f"https://api.themoviedb.org/3/{kind}/{_id}"
+        # details are also cached per id so titles sharing a match cost nothing
+        id_key = f"{kind}:{_id}"
+        cached = self.store.get(id_key, ttl=self.ttl)
+        if cached:
+            return cached
+        url = f"{self.api_base}/{kind}/{_id}"
         params = {"api_key": self.api_key}
-        async with self.session.get(url, params=params) as resp:
-            return await resp.json()
+        detail = await self._get_json(url, params)
+        if detail:
+            self.store.put(id_key, detail)
+        return detail
+
+    async def season(self, tv_id: int, number: int) -> Dict[str, dict]:
+        """Episode number → {name, still_path, air_date} for one season of a show."""
+        key = f"tv:{tv_id}:season:{number}"
+        cached = self.store.get(key, ttl=self.ttl)
+        if cached is not None:
+            return cached
+        url = f"{self.api_base}/tv/{tv_id}/season/{number}"
+        data = await self._get_json(url, {"api_key": self.api_key})
+        episodes = {
+            str(ep["episode_number"]): {k: ep.get(k) for k in ("name", "still_path", "air_date")}
+            for ep in data.get("episodes", []) if "episode_number" in ep
+        }
+        self.store.put(key, episodes)
+        return episodes
+
+    async def _lean_detail(self, result: dict) -> dict:
+        """Detail dict built from a search result, with genre_ids resolved locally."""
+        kind = "movie" if result["media_type"] == "movie" else "tv"
+        table = await self._genre_table(kind)
+        detail = {k: result[k] for k in _LEAN_FIELDS if k in result}
+        detail["genres"] = [
+            {"id": gid, "name": table[gid]}
+            for gid in result.get("genre_ids", []) if gid in table
+        ]
+        return detail
+
+    async def _genre_table(self, kind: str) -> Dict[int, str]:
+        """Genre id → name for 'movie' or 'tv', fetched at most once per run."""
+        if kind in self._genres:
+            return self._genres[kind]
+        if self._genre_lock is None:
+            self._genre_lock = asyncio.Lock()
+        async with self._genre_lock:
+            if kind not in self._genres:
+                store_key = f"genres:{kind}"
+                genres = self.store.get(store_key, ttl=GENRE_TABLE_TTL)
+                if not genres:
+                    url = f"{self.api_base}/genre/{kind}/list"
+                    genres = await self._get_json(url, {"api_key": self.api_key})
+                    self.store.put(store_key, genres)
+                self._genres[kind] = {g["id"]: g["name"] for g in genres.get("genres", [])}
+        return self._genres[kind]
+
+    async def _get_json(self, url: str, params: dict) -> dict:
+        """
+        GET `url` through the rate governor. Throttled (429) and server-error
+        responses are retried with backoff; anything still failing raises
+        TMDBError so the caller never caches it.
+        """
+        import aiohttp
+        error = ""
+        for attempt in range(self.MAX_RETRIES + 1):
+            retry_after = None
+            async with self.governor.slot():
+                try:
+                    async with self.session.get(url, params=params) as resp:
+                        if resp.status == 200:
+                            data = await resp.json()
+                            self.governor.on_success()
+                            return data
+                        if resp.status != 429 and resp.status < 500:
+                            raise TMDBError(f"HTTP {resp.status} for {url}")
+                        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                        if resp.status == 429:
+                            self.governor.on_throttle(retry_after)
+                        error = f"HTTP {resp.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = str(e) or type(e).__name__
+            if attempt < self.MAX_RETRIES:
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+        raise TMDBError(f"{error} for {url} after {self.MAX_RETRIES + 1} attempts")
 
     def genre_for(self, detail: dict) -> str:
         if not detail:
@@ -43,13 +43,12 @@ class CheckerUI(QtWidgets.QWidget):
 
         # ─── Results Tables ────────────────────────────────────────────────
         pan_h = QtWidgets.QHBoxLayout()
-        for status in ("working","black_screen","non_working"):
+        for status in ("working","black_screen","frozen","non_working"):
             title = status.replace("_"," ").title()
             box = QtWidgets.QGroupBox(title)
             v = QtWidgets.QVBoxLayout(box)
-            cols = 3 if status=="working" else 1
-            tbl = QtWidgets.QTableWidget(0, cols)
-            headers = ["Channel","Res","FPS"] if status=="working" else ["Channel"]
+            headers = ["Channel","Res","FPS","Quality"] if status=="working" else ["Channel"]
+            tbl = QtWidgets.QTableWidget(0, len(headers))
             tbl.setHorizontalHeaderLabels(headers)
             tbl.horizontalHeader().setStretchLastSection(True)
             tbl.verticalHeader().setVisible(False)